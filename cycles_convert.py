@@ -52,6 +52,8 @@ def convert_cycles_node(nt, node, location=None):
     elif node_type in node_map.keys():
         rman_name, convert_func = node_map[node_type]
         node_name = rman_name + 'PatternNode'
+        from .nodes import ensure_node_type
+        ensure_node_type(node_name)
         rman_node = nt.nodes.new(node_name)
         if location:
             rman_node.location = location
@@ -51,6 +51,8 @@ from .nodes_sg import get_mat_name
 from .nodes_sg import replace_frame_num
 
 from . import nodes_sg
+from .rman_utils import object_utils
+from .rman_utils import transform_utils
 from . import engine
 
 from. import chatserver
@@ -129,19 +131,7 @@ def convert_ob_bounds(ob_bb):
             ob_bb[7][1], ob_bb[0][2], ob_bb[1][2])    
 
 def transform_points(transform_mtx, P):
-    transform_pts = []
-    mtx = convert_matrix( transform_mtx )
-    m = rman.Types.RtMatrix4x4( mtx[0],mtx[1],mtx[2],mtx[3],
-                                mtx[4],mtx[5],mtx[6],mtx[7],
-                                mtx[8],mtx[9],mtx[10],mtx[11],
-                                mtx[12],mtx[13],mtx[14],mtx[15])
-    for i in range(0, len(P), 3):
-        pt = m.pTransform( rman.Types.RtFloat3(P[i], P[i+1], P[i+2]) )
-        transform_pts.append(pt.x)
-        transform_pts.append(pt.y)
-        transform_pts.append(pt.z)
-
-    return transform_pts
+    return transform_utils.transform_points(transform_mtx, P)
 
 def __is_prman_running__():
     global is_running
@@ -4104,63 +4094,27 @@ def get_mesh(mesh, get_normals=False):
 
 # requires facevertex interpolation
 def get_mesh_uv(mesh, name="", flipvmode='NONE'):
-    uvs = []
-    if not name:
-        uv_loop_layer = mesh.uv_layers.active
-    else:
-        # assuming uv loop layers and uv textures share identical indices
-        idx = mesh.uv_textures.keys().index(name)
-        uv_loop_layer = mesh.uv_layers[idx]
-
-    if uv_loop_layer is None:
+    uvs = object_utils._get_mesh_uv_(mesh, name, flipvmode=flipvmode)
+    if uvs is None:
         return None
-
-    for uvloop in uv_loop_layer.data:
-        uvs.append(uvloop.uv.x)
-        # renderman expects UVs flipped vertically from blender
-        # best to do this in pattern, provided here as additional option
-        if flipvmode == 'UV':
-            uvs.append(1.0-uvloop.uv.y)
-        elif flipvmode == 'TILE':
-            uvs.append(math.ceil(uvloop.uv.y) - uvloop.uv.y + math.floor(uvloop.uv.y))
-        elif flipvmode == 'NONE':
-            uvs.append(uvloop.uv.y)
-
-    return uvs
+    return uvs.tolist()
 
 
 # requires facevertex interpolation
 def get_mesh_vcol(mesh, name=""):
-    vcol_layer = mesh.vertex_colors[name] if name != "" \
-        else mesh.vertex_colors.active
-    cols = []
-
-    if vcol_layer is None:
+    cols = object_utils._get_mesh_vcol_(mesh, name)
+    if cols is None:
         return None
-
-    for vcloop in vcol_layer.data:
-        cols.extend(vcloop.color)
-
-    return cols
+    return cols.ravel().tolist()
 
 # requires per-vertex interpolation
 
 
 def get_mesh_vgroup(ob, mesh, name=""):
-    vgroup = ob.vertex_groups[name] if name != "" else ob.vertex_groups.active
-    weights = []
-
-    if vgroup is None:
+    weights = object_utils._get_mesh_vgroup_(ob, mesh, name)
+    if weights is None:
         return None
-
-    for v in mesh.vertices:
-        if len(v.groups) == 0:
-            weights.append(0.0)
-        else:
-            weights.extend([g.weight for g in v.groups
-                            if g.group == vgroup.index])
-
-    return weights
+    return weights.tolist()
 
 # if a mesh has more than one material
 
@@ -4190,37 +4144,16 @@ def get_primvars(ob, geo, rixparams, interpolation=""):
         material_ids["uniform float material_id"] = material_id
         #rixparams.SetFloatDetail("material_id", material_id, "uniform")
 
-    if rm.export_default_uv:
-        uvs = get_mesh_uv(geo, flipvmode=rm.export_flipv)
-        if uvs and len(uvs) > 0:
-            #primvars["%s float[2] st" % interpolation] = uvs
-            rixparams.SetFloatArrayDetail("st", uvs, 2, interpolation)
-
-    if rm.export_default_vcol:
-        vcols = get_mesh_vcol(geo)
-        if vcols and len(vcols) > 0:
-            #primvars["%s color Cs" % interpolation] = rib(vcols)
-            rixparams.SetColorDetail("Cs", rib(vcols, type_hint="color"), interpolation)
-
-    # custom prim vars
-    for p in rm.prim_vars:
-        if p.data_source == 'VERTEX_COLOR':
-            vcols = get_mesh_vcol(geo, p.data_name)
-            if vcols and len(vcols) > 0:
-                #primvars["%s color %s" % (interpolation, p.name)] = rib(vcols)
-                rixparams.SetColorDetail(p.name, rib(vcols, type_hint="color"), interpolation)
-
-        elif p.data_source == 'UV_TEXTURE':
-            uvs = get_mesh_uv(geo, p.data_name, flipvmode=rm.export_flipv)
-            if uvs and len(uvs) > 0:
-                #primvars["%s float[2] %s" % (interpolation, p.name)] = uvs
-                rixparams.SetFloatArrayDetail(p.name, uvs, 2, interpolation)
-
-        elif p.data_source == 'VERTEX_GROUP':
-            weights = get_mesh_vgroup(ob, geo, p.data_name)
-            if weights and len(weights) > 0:
-                #primvars["vertex float %s" % p.name] = weights
-                rixparams.SetFloatDetail(p.name, weights, "vertex")
+    for primvar_type, name, values in object_utils._get_mesh_primvars_(ob, geo):
+        if primvar_type == 'UV':
+            #primvars["%s float[2] %s" % (interpolation, name)] = uvs
+            rixparams.SetFloatArrayDetail(name, values.tolist(), 2, interpolation)
+        elif primvar_type == 'COLOR':
+            #primvars["%s color %s" % (interpolation, name)] = rib(vcols)
+            rixparams.SetColorDetail(name, values.tolist(), interpolation)
+        elif primvar_type == 'VERTEX_GROUP':
+            #primvars["vertex float %s" % name] = weights
+            rixparams.SetFloatDetail(name, values.tolist(), "vertex")
 
     return material_ids
 
@@ -36,6 +36,7 @@ import subprocess
 
 from bpy.props import *
 from nodeitems_utils import NodeCategory, NodeItem
+from bl_operators.node import NodeAddOperator
 
 from .shader_parameters import class_generate_properties
 from .shader_parameters import node_add_inputs
@@ -52,6 +53,7 @@ from .util import readOSO
 from .cycles_convert import *
 from .rman_utils import texture_utils
 from .rman_utils import filepath_utils
+from .rman_utils import args_cache_utils
 from .rman_utils import prefs_utils
 from .rfb_logger import rfb_log
 
@@ -719,6 +721,116 @@ def generate_node_type(prefs, name, args):
     return typename, ntype
 
 
+def generate_node_stub(name, args):
+    ''' Register a lightweight stand-in for a pattern node type. The full
+        node type, with all its properties, is generated by ensure_node_type()
+        the first time a node of this type is created or loaded. '''
+
+    typename = '%sPatternNode' % name
+    ntype = type(typename, (RendermanPatternNode,), {})
+    ntype.bl_label = name
+    ntype.typename = typename
+
+    def init(self, context):
+        # created by a script calling nodes.new() before the full type was
+        # generated. A class can't be swapped from inside its own init, so the
+        # node is upgraded by a timer, once Blender is done creating it.
+        # Scripts that set properties on new nodes should call
+        # ensure_node_type() before nodes.new().
+        rfb_log().debug("%s created from a stub, upgrading it later" % typename)
+        _pending_stub_nodes.add(typename)
+        if not bpy.app.timers.is_registered(_upgrade_stub_nodes):
+            bpy.app.timers.register(_upgrade_stub_nodes, first_interval=0.0)
+
+    ntype.init = init
+    setattr(ntype, "__annotations__", {})
+    ntype.__annotations__['plugin_name'] = StringProperty(name='Plugin Name',
+                                       default=name, options={'HIDDEN'})
+    bpy.utils.register_class(ntype)
+    lazy_node_types[typename] = (name, args)
+
+    return typename, ntype
+
+
+def ensure_node_type(typename):
+    ''' Make sure the full node type is registered, replacing its stub
+        if needed. Call this before creating a node by type name and
+        setting its properties.
+
+    Returns:
+        (class) - the node type or None if unknown
+    '''
+    entry = lazy_node_types.pop(typename, None)
+    if entry is None:
+        return nodetypes.get(typename, None)
+    name, args = entry
+    stub = nodetypes[typename]
+    bpy.utils.unregister_class(stub)
+    vals = generate_node_type(None, name, args)
+    if not vals:
+        return None
+    typename, ntype = vals
+    nodetypes[typename] = ntype
+    pattern_cat = GetPatternCategory(name).capitalize()
+    if name in pattern_categories.get(pattern_cat, {}):
+        pattern_categories[pattern_cat][name] = ntype
+    rfb_log().debug("Generated node type %s" % typename)
+    return ntype
+
+
+def _iter_node_trees():
+    for collection in [bpy.data.materials, bpy.data.lights, bpy.data.worlds]:
+        for idblock in collection:
+            if getattr(idblock, 'node_tree', None):
+                yield idblock.node_tree
+    for node_tree in bpy.data.node_groups:
+        yield node_tree
+
+
+def _upgrade_stub_nodes():
+    typenames = set(_pending_stub_nodes)
+    _pending_stub_nodes.clear()
+    for typename in typenames:
+        ensure_node_type(typename)
+    # run the full init on the nodes that were created as stubs
+    for nt in _iter_node_trees():
+        for node in nt.nodes:
+            if node.bl_idname in typenames and not node.outputs and not node.inputs:
+                node.init(bpy.context)
+    return None
+
+
+def _get_node_tree_counts():
+    return (len(bpy.data.materials), len(bpy.data.lights),
+            len(bpy.data.worlds), len(bpy.data.node_groups))
+
+
+def ensure_node_types_in_file():
+    ''' Generate the node types of the stub nodes in the current file. '''
+    global __NODE_TREE_COUNTS__
+    __NODE_TREE_COUNTS__ = _get_node_tree_counts()
+    for nt in _iter_node_trees():
+        for node in nt.nodes:
+            if node.bl_idname in lazy_node_types:
+                ensure_node_type(node.bl_idname)
+    return None
+
+
+@persistent
+def ensure_node_types_load_cb(bl_scene):
+    ''' Generate the node types used in the file that was just loaded. '''
+    ensure_node_types_in_file()
+
+
+@persistent
+def ensure_node_types_depsgraph_cb(bl_scene):
+    ''' Generate the node types used by materials, lights, worlds or node groups
+        appended or linked from other files. There is no handler for append/link,
+        so the file is only checked again when the number of these changes. '''
+    if _get_node_tree_counts() != __NODE_TREE_COUNTS__:
+        ensure_node_types_in_file()
+
+
 # UI
 def find_node_input(node, name):
     for input in node.inputs:
@@ -1155,6 +1267,8 @@ class Add_Node:
             nt.links.remove(link)
             return {'FINISHED'}
 
+        ensure_node_type(new_type)
+
         # add a new node to existing socket
         if input_node is None:
             newnode = nt.nodes.new(new_type)
@@ -1269,6 +1383,35 @@ class NODE_OT_add_bump(bpy.types.Operator, Add_Node):
     bl_description = 'Connect a bump node'
     input_type: StringProperty(default='Bump')
 
+
+class NODE_OT_rman_add_node(NodeAddOperator, bpy.types.Operator):
+    '''
+    Add node operator used by the RenderMan add menu. Generates the node type
+    first, in case it is still a stub.
+    '''
+
+    bl_idname = 'node.rman_add_node'
+    bl_label = 'Add RenderMan Node'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        if self.properties.is_property_set("type"):
+            ensure_node_type(self.type)
+            self.deselect_nodes(context)
+            self.create_node(context)
+            return {'FINISHED'}
+        else:
+            return {'CANCELLED'}
+
+
+class RendermanNodeItem(NodeItem):
+
+    @staticmethod
+    def draw(self, layout, context):
+        props = layout.operator("node.rman_add_node", text=self.label)
+        props.type = self.nodetype
+        props.use_transform = True
+
 # return if this param has a vstuct connection or linked independently
 
 
@@ -2300,22 +2443,40 @@ classes = [
     NODE_OT_add_layer,
     NODE_OT_add_manifold,
     NODE_OT_add_bump,
+    NODE_OT_rman_add_node,
 ]
 
 nodetypes = {}
 pattern_categories = {}
 
-def _call_osltoargs(oslfile, args_file):
-    process_args = []
-    process_args.append( os.path.join(filepath_utils.guess_rmantree(), 'bin', 'osltoargs') )
-    process_args.append(oslfile)
-    process_args.append('-o')
-    process_args.append(args_file)
-    try:
-        subprocess.check_output(process_args)
-        return True
-    except:
-        return False
+# pattern node types registered as stubs: typename -> (name, args)
+lazy_node_types = {}
+# stub types of the nodes created by scripts, waiting for their upgrade
+_pending_stub_nodes = set()
+# number of materials, lights, worlds and node groups when the file was last checked
+__NODE_TREE_COUNTS__ = None
+
+# patterns created and edited by name in the add-on. These
+# are always generated at startup.
+EAGER_PATTERNS = ['PxrLayer', 'PxrLayerMixer', 'PxrBump', 'PxrOSL', 'PxrSeExpr']
+
+def _get_args_cache_file():
+    cache_dir = bpy.utils.user_resource('CONFIG', path='renderman', create=True)
+    return os.path.join(cache_dir, 'node_args_cache.pickle')
+
+def get_args_roots(args_files):
+    '''
+    Return the parsed root element of each .args and .oso file, using the
+    node args cache in the Blender config directory. See args_cache_utils.get_args_roots.
+
+    Args:
+        args_files (dict) - node name to .args or .oso file path
+
+    Returns:
+        (dict) - node name to its root element, in the same order as args_files
+    '''
+    return args_cache_utils.get_args_roots(args_files, _get_args_cache_file(),
+                                           filepath_utils.guess_rmantree())
 
 
 def register():
@@ -2328,23 +2489,16 @@ def register():
 
     categories = {}
 
-    for name, arg_file in args_files_in_path(prefs, None).items():
+    for name, root in get_args_roots(args_files_in_path(prefs, None)).items():
         try:
-            f,ext = os.path.splitext(arg_file)
-            if ext == '.args':
-                vals = generate_node_type(prefs, name, ET.parse(arg_file).getroot())
-                if vals:
-                    typename, nodetype = vals
-                    nodetypes[typename] = nodetype
-            elif ext == '.oso':
-                # this is an OSL file. Use osltoargs to convert to an args file.
-                f = os.path.basename(f) + '.args'
-                osltoargs = os.path.join( prefs_utils.get_bl_temp_dir(), f)
-                _call_osltoargs(arg_file, osltoargs)
-                vals = generate_node_type(prefs, name, ET.parse(osltoargs).getroot())
-                if vals:
-                    typename, nodetype = vals
-                    nodetypes[typename] = nodetype                
+            tag = root.find("shaderType/tag")
+            if tag is not None and tag.attrib['value'] == 'pattern' and name not in EAGER_PATTERNS:
+                vals = generate_node_stub(name, root)
+            else:
+                vals = generate_node_type(prefs, name, root)
+            if vals:
+                typename, nodetype = vals
+                nodetypes[typename] = nodetype
         except Exception:
             print("Error parsing " + name)
             traceback.print_exc()
@@ -2368,7 +2522,7 @@ def register():
     rfb_log().debug("Registering RenderMan Shading Nodes:")
 
     for name, node_type in nodetypes.items():
-        node_item = NodeItem(name, label=node_type.bl_label)
+        node_item = RendermanNodeItem(name, label=node_type.bl_label)
 
         if node_type.renderman_node_type == 'pattern':
             # insert pxr layer in bxdf
@@ -2410,8 +2564,20 @@ def register():
     nodeitems_utils.register_node_categories("RENDERMANSHADERNODES",
                                              node_categories)
 
+    if ensure_node_types_load_cb not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(ensure_node_types_load_cb)
+    if ensure_node_types_depsgraph_cb not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(ensure_node_types_depsgraph_cb)
+    # bpy.data isn't available while registering, so check the current file
+    # for stubs once the add-on is enabled.
+    bpy.app.timers.register(ensure_node_types_in_file, first_interval=0.0)
+
 
 def unregister():
+    if ensure_node_types_load_cb in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(ensure_node_types_load_cb)
+    if ensure_node_types_depsgraph_cb in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(ensure_node_types_depsgraph_cb)
     nodeitems_utils.unregister_node_categories("RENDERMANSHADERNODES")
     # bpy.utils.unregister_module(__name__)
 
@@ -27,8 +27,8 @@ import bpy
 import sys
 import os
 from bpy.types import AddonPreferences
-from bpy.props import CollectionProperty, BoolProperty, StringProperty
-from bpy.props import IntProperty, PointerProperty, EnumProperty
+from bpy.props import CollectionProperty, BoolProperty, StringProperty, IntProperty
+from bpy.props import PointerProperty, EnumProperty
 
 from .rman_utils import filepath_utils
 from . import rfb_logger
@@ -187,6 +187,18 @@ class RendermanPreferences(AddonPreferences):
         subtype='FILE_PATH',
         default=os.path.join('{OUT}', 'textures'))        
 
+    path_texture_cache: StringProperty(
+        name="Texture Cache Path",
+        description="Optional shared directory where converted textures are cached by content, so that the same image is only converted once across scenes and machines",
+        subtype='DIR_PATH',
+        default='')
+
+    texture_cache_size: IntProperty(
+        name="Texture Cache Size (GB)",
+        description="Maximum size of the texture cache. The least recently used textures are removed when the cache grows past it. 0 means no limit",
+        min=0,
+        default=0)
+
     env_vars: PointerProperty(
         type=RendermanEnvVarSettings,
         name="Environment Variable Settings")
@@ -250,6 +262,8 @@ class RendermanPreferences(AddonPreferences):
         layout.prop(self, 'path_display_driver_image')
         layout.prop(self, 'path_aov_image')
         layout.prop(self, 'path_fallback_textures_path')        
+        layout.prop(self, 'path_texture_cache')
+        layout.prop(self, 'texture_cache_size')
         layout.prop(self, 'draw_ipr_text')
         layout.prop(self, 'draw_panel_icon')
         #layout.prop(self, 'active_presets_path')
@@ -49,8 +49,8 @@ def load_previews(lib):
         path = asset.path
         
         if path not in asset_previews:
-            thumb_path = os.path.join(asset.path, 'asset_100.png')
-            
+            thumb_path = asset.thumb_path or os.path.join(asset.path, 'asset_100.png')
+
             thumb = asset_previews.load(path, thumb_path, 'IMAGE', force_reload=True)
         else:
             thumb = asset_previews[path]
@@ -0,0 +1,238 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# Copyright (c) 2015 - 2017 Pixar
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import os
+import json
+import threading
+from ..rfb_logger import rfb_log
+
+# the index lives at the root of the library, next to the categories
+INDEX_FILE = '.rfb_library_index.json'
+INDEX_VERSION = 2
+THUMBNAIL_FILE = 'asset_100.png'
+
+class LibraryIndex(object):
+    '''
+    A persistent index of the directories and assets of a preset library.
+
+    Each directory is stored with its mtime, the names of its sub directories and the
+    label, type, thumbnail and metadata of its assets. A directory is only listed again
+    when its mtime has changed, and an asset.json is only read again when it, or its
+    asset directory, has changed. Refreshing an unchanged library costs one stat call
+    per directory and two per asset.
+
+    Attributes:
+        root (str) - the root directory of the library
+        dirs (dict) - directory path, relative to root, to its entry
+    '''
+
+    def __init__(self, root):
+        self.root = root
+        self.index_file = os.path.join(root, INDEX_FILE)
+        self.lock = threading.RLock()
+        self.dirs = dict()
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_file, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version', 0) != INDEX_VERSION:
+            return
+        self.dirs = data.get('dirs', dict())
+
+    def save(self):
+        '''
+        Write the index, if it has changed. Libraries on read-only locations simply
+        keep their index in memory.
+        '''
+        with self.lock:
+            if not self._dirty:
+                return
+            tmp_file = '%s.%d.tmp' % (self.index_file, os.getpid())
+            try:
+                with open(tmp_file, 'w') as f:
+                    json.dump({'version': INDEX_VERSION, 'dirs': self.dirs}, f)
+                os.replace(tmp_file, self.index_file)
+            except OSError as e:
+                rfb_log().debug("Could not write preset library index %s: %s" % (self.index_file, str(e)))
+            else:
+                self._dirty = False
+
+    def _relpath(self, path):
+        rel_path = os.path.relpath(path, self.root)
+        return '' if rel_path == '.' else rel_path
+
+    def _read_asset(self, path):
+        info = dict()
+        info['label'] = os.path.splitext(os.path.basename(path))[0]
+        info['type'] = ''
+        info['metadata'] = dict()
+        info['thumb_path'] = THUMBNAIL_FILE if os.path.isfile(os.path.join(path, THUMBNAIL_FILE)) else ''
+        json_path = os.path.join(path, 'asset.json')
+        try:
+            with open(json_path, 'r') as f:
+                data = json.load(f)['RenderManAsset']
+        except (OSError, ValueError, KeyError) as e:
+            rfb_log().warning("Could not read preset %s: %s" % (json_path, str(e)))
+            return info
+        info['label'] = data.get('label', info['label'])
+        asset = data.get('asset', dict())
+        if asset:
+            atype = list(asset)[0]
+            info['type'] = atype
+            info['metadata'] = asset[atype].get('metadata', dict())
+        return info
+
+    def _get_asset_mtime(self, path):
+        # saving over an asset rewrites asset.json in place, which doesn't touch
+        # the directory mtimes. The asset directory mtime still catches an added
+        # or removed thumbnail.
+        try:
+            asset_mtime = [os.stat(path).st_mtime, -1]
+        except OSError:
+            return None
+        try:
+            asset_mtime[1] = os.stat(os.path.join(path, 'asset.json')).st_mtime
+        except OSError:
+            pass
+        return asset_mtime
+
+    def scan_dir(self, path):
+        '''
+        Get the entry of a directory, listing it again only if it has changed
+        since it was indexed, and reading again the assets that have changed.
+
+        Args:
+            path (str) - absolute path to a directory of the library
+
+        Returns:
+            (dict) - the entry, with 'sub_dirs' and 'presets' keys, or None if the
+                     directory doesn't exist
+        '''
+        rel_path = self._relpath(path)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            with self.lock:
+                if self.dirs.pop(rel_path, None) is not None:
+                    self._dirty = True
+            return None
+
+        with self.lock:
+            old_entry = self.dirs.get(rel_path, None)
+
+        changed = not old_entry or old_entry['mtime'] != mtime
+        old_presets = old_entry['presets'] if old_entry else dict()
+        if not changed:
+            sub_dirs = old_entry['sub_dirs']
+            asset_names = list(old_presets)
+        else:
+            sub_dirs = []
+            asset_names = []
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        try:
+                            if not entry.is_dir():
+                                continue
+                        except OSError:
+                            continue
+                        if '.rma' in entry.name:
+                            asset_names.append(entry.name)
+                        else:
+                            sub_dirs.append(entry.name)
+            except OSError as e:
+                rfb_log().warning("Could not scan preset library %s: %s" % (path, str(e)))
+                return old_entry
+
+        presets = dict()
+        for name in asset_names:
+            asset_path = os.path.join(path, name)
+            asset_mtime = self._get_asset_mtime(asset_path)
+            if asset_mtime is None:
+                changed = True
+                continue
+            info = old_presets.get(name, None)
+            if not info or info.get('mtime', None) != asset_mtime:
+                info = self._read_asset(asset_path)
+                info['mtime'] = asset_mtime
+                changed = True
+            presets[name] = info
+
+        if not changed:
+            return old_entry
+
+        new_entry = {'mtime': mtime, 'sub_dirs': sorted(sub_dirs), 'presets': presets}
+        with self.lock:
+            self.dirs[rel_path] = new_entry
+            self._dirty = True
+        return new_entry
+
+    def walk(self, path=None):
+        '''
+        Scan a directory and all of its sub directories, top down.
+
+        Args:
+            path (str) - absolute path to the directory. Defaults to the root.
+
+        Yields:
+            (str, dict) - the absolute path and entry of each directory
+        '''
+        path = path or self.root
+        visited = set()
+        stack = [path]
+        while stack:
+            dir_path = stack.pop()
+            entry = self.scan_dir(dir_path)
+            if entry is None:
+                continue
+            visited.add(self._relpath(dir_path))
+            yield dir_path, entry
+            for sub_dir in reversed(entry['sub_dirs']):
+                stack.append(os.path.join(dir_path, sub_dir))
+
+        # forget directories that were removed from under this one
+        rel_path = self._relpath(path)
+        prefix = rel_path + os.sep if rel_path else ''
+        with self.lock:
+            for stale in [d for d in self.dirs if d.startswith(prefix) and d not in visited]:
+                del self.dirs[stale]
+                self._dirty = True
+
+__indices__ = dict()
+
+def get_library_index(root):
+    '''
+    Get the index for the library at root, loading it from disk the first time.
+    '''
+    index = __indices__.get(root, None)
+    if index is None:
+        index = LibraryIndex(root)
+        __indices__[root] = index
+    return index
@@ -28,7 +28,7 @@ import os
 import shutil
 import bpy
 from bpy.props import StringProperty, EnumProperty, BoolProperty
-from .properties import RendermanPresetGroup, RendermanPreset, refresh_presets_libraries
+from .properties import RendermanPresetGroup, RendermanPreset, refresh_presets_libraries, scan_presets_libraries
 from . import icons
 from bpy.types import NodeTree
 
@@ -85,8 +85,7 @@ class PRMAN_OT_refresh_libraries(bpy.types.Operator):
     assign: BoolProperty(default=False)
 
     def invoke(self, context, event):
-        presets_library = util.get_addon_prefs().presets_library
-        refresh_presets_libraries(presets_library.path, presets_library)
+        scan_presets_libraries()
         return {'FINISHED'}
 
 # if the library isn't present copy it from rmantree to the path in addon prefs
@@ -28,49 +28,141 @@ from bpy.types import PropertyGroup
 import bpy.utils
 from .. import util
 from . import icons
-import json
+from . import library_index
+import threading
+import queue
 import os
 
 # update the tree structure from disk file
-def refresh_presets_libraries(disk_lib, preset_library):
-    dirs = os.listdir(disk_lib)
-    for dir in dirs:
-        cdir = os.path.join(disk_lib, dir)
-        # skip if not a dir
-        if not os.path.isdir(cdir):
-            continue
-        
-        is_asset = '.rma' in dir
+def _apply_library_entry(disk_lib, preset_library, entry):
+    presets = entry['presets']
+    sub_dirs = entry['sub_dirs']
+
+    for dir, info in presets.items():
+        preset = preset_library.presets.get(dir, None)
+        if not preset:
+            preset = preset_library.presets.add()
         path = os.path.join(disk_lib, dir)
+        preset.name = dir
+        preset.label = info['label']
+        preset.path = path
+        preset.json_path = os.path.join(path, 'asset.json')
+        preset.thumb_path = os.path.join(path, info['thumb_path']) if info['thumb_path'] else ''
 
-        if is_asset:
-            preset = preset_library.presets.get(dir, None)
-            if not preset:
-                preset = preset_library.presets.add()
-            
+    for dir in sub_dirs:
+        sub_group = preset_library.sub_groups.get(dir, None)
+        if not sub_group:
+            sub_group = preset_library.sub_groups.add()
+        sub_group.name = dir
+        sub_group.path = os.path.join(disk_lib, dir)
 
-            preset.name = dir
-            json_path = os.path.join(path, 'asset.json')
-            data = json.load(open(json_path))
-            preset.label = data['RenderManAsset']['label']
-            preset.path = path
-            preset.json_path = os.path.join(path, 'asset.json')
+    # remove back to front, so the indices stay valid
+    for i in reversed(range(len(preset_library.sub_groups))):
+        if preset_library.sub_groups[i].name not in sub_dirs:
+            preset_library.sub_groups.remove(i)
+    for i in reversed(range(len(preset_library.presets))):
+        if preset_library.presets[i].name not in presets:
+            preset_library.presets.remove(i)
 
-        else:
-            sub_group = preset_library.sub_groups.get(dir, None)
-            if not sub_group:
-                sub_group = preset_library.sub_groups.add()
-            sub_group.name = dir
-            sub_group.path = path
+def _get_group(head, disk_lib):
+    rel_path = os.path.relpath(disk_lib, head.path)
+    group = head
+    if rel_path == '.':
+        return group
+    for sub_path in rel_path.split(os.sep):
+        group = group.sub_groups.get(sub_path, None)
+        if group is None:
+            return None
+    return group
 
-            refresh_presets_libraries(cdir, sub_group)
+def refresh_presets_libraries(disk_lib, preset_library):
+    '''
+    Update preset_library and its sub groups from the directory disk_lib. Only the
+    directories that changed since the library was last indexed are read again.
+    '''
+    head = util.get_addon_prefs().presets_library
+    index = library_index.get_library_index(head.path)
+    for dir_path, entry in index.walk(disk_lib):
+        group = preset_library if dir_path == disk_lib else _get_group(preset_library, dir_path)
+        if group is not None:
+            _apply_library_entry(dir_path, group, entry)
+    index.save()
 
-    for i,sub_group in enumerate(preset_library.sub_groups):
-        if sub_group.name not in dirs:
-            preset_library.sub_groups.remove(i)
-    for i,preset in enumerate(preset_library.presets):
-        if preset.name not in dirs:
-            preset_library.presets.remove(i)
+# scan running in the background, as (library root, queue of results)
+__SCAN__ = dict()
+__SCANNED_LIBRARIES__ = set()
+
+def _scan_library_thread(index, results):
+    try:
+        for dir_path, entry in index.walk():
+            results.put((dir_path, entry))
+        index.save()
+    finally:
+        results.put(None)
+
+def _apply_scan_results():
+    results = __SCAN__.get('results', None)
+    if results is None:
+        return None
+    head = util.get_addon_prefs().presets_library
+    done = False
+    while True:
+        try:
+            item = results.get_nowait()
+        except queue.Empty:
+            break
+        if item is None:
+            done = True
+            break
+        dir_path, entry = item
+        if head.path != __SCAN__['root']:
+            # the library changed while we were scanning
+            continue
+        # parents are always scanned first, so the group exists by now
+        group = _get_group(head, dir_path)
+        if group is not None:
+            _apply_library_entry(dir_path, group, entry)
+
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            area.tag_redraw()
+
+    if done:
+        __SCAN__.clear()
+        return None
+    return 0.1
+
+def scan_presets_libraries():
+    '''
+    Refresh the whole library in a background thread. The preset groups are filled
+    from a timer as directories are scanned, so the browser stays responsive on big
+    or remote libraries.
+    '''
+    head = util.get_addon_prefs().presets_library
+    if not head.path or __SCAN__:
+        return
+    __SCANNED_LIBRARIES__.add(head.path)
+    results = queue.Queue()
+    __SCAN__['root'] = head.path
+    __SCAN__['results'] = results
+    __SCAN__['scanned_now'] = set()
+    index = library_index.get_library_index(head.path)
+    t = threading.Thread(target=_scan_library_thread, args=(index, results))
+    t.daemon = True
+    t.start()
+    bpy.app.timers.register(_apply_scan_results, first_interval=0.1)
+
+def _scan_group_now(head, group):
+    # while the background scan runs, read the directory of a group that is
+    # asked for right away, so the caller doesn't get an empty or stale group.
+    # Each directory is only read once per scan.
+    if not __SCAN__ or __SCAN__['root'] != head.path or group.path in __SCAN__['scanned_now']:
+        return
+    __SCAN__['scanned_now'].add(group.path)
+    index = library_index.get_library_index(head.path)
+    entry = index.scan_dir(group.path)
+    if entry is not None:
+        _apply_library_entry(group.path, group, entry)
 
 # This file holds the properties for the preset browser.  
 # They will be parsed from the json file
@@ -117,12 +209,16 @@ class RendermanPresetGroup(PropertyGroup):
     def get_from_path(cls, lib_path):
         ''' get from abs lib_path '''
         head = util.get_addon_prefs().presets_library
+        if head.path not in __SCANNED_LIBRARIES__:
+            # pick up changes made outside of this session
+            scan_presets_libraries()
         lib_path = os.path.relpath(lib_path, head.path)
         active = head
+        _scan_group_now(head, active)
         for sub_path in lib_path.split(os.sep):
             if sub_path in active.sub_groups.keys():
-                active = active.sub_groups[sub_path]            
-        refresh_presets_libraries(active.path, active)
+                active = active.sub_groups[sub_path]
+                _scan_group_now(head, active)
         return active
 
     # get the active library from the addon pref
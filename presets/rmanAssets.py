@@ -32,10 +32,13 @@ import os.path
 import sys
 import subprocess
 import re
+import ast
+import threading
 import xml.dom.minidom as mx
 import filecmp
 import distutils.version as dv
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from . import vstruct as vstruct
 
 
@@ -48,6 +51,16 @@ __lastJson = None
 #
 __loglevel = 0
 
+# maximum number of txmake or sho processes running at the same time.
+#
+MAX_TEXTURE_JOBS = max(1, (os.cpu_count() or 2) // 2)
+
+# texture header specs, keyed by the image's (real path, mtime, size). Single
+# underscore names, so they are not mangled when used in RmanAsset's methods.
+#
+_textureSpecsCache = {}
+_textureCacheLock = threading.Lock()
+
 
 ##
 # @brief      flatten nested sequence into a single sequence
@@ -316,6 +329,53 @@ def isHDRI(filename):
     return (os.path.splitext(filename)[1] in __hdrExtensions)
 
 
+##
+# @brief      Converts a value printed by sho to a python value, without
+#             evaluating it. Numbers and tuples of numbers are converted,
+#             anything else is returned as a string.
+#
+# @param      value  The string value
+#
+# @return     the python value
+#
+def parseHeaderValue(value):
+    value = value.strip()
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        pass
+    if '(' in value:
+        # space separated tuple: (1024 512)
+        try:
+            return ast.literal_eval(re.sub(r'\s+', ',', value))
+        except (ValueError, SyntaxError):
+            pass
+    return value
+
+
+##
+# @brief      Run a list of commands, a few at a time.
+#
+# @param      cmds  list of command lists
+#
+# @return     list of (returncode, stdout, stderr) in the same order as cmds
+#
+def runCommands(cmds):
+    def run(cmd):
+        p = subprocess.Popen(cmd, stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE,
+                             startupinfo=startupInfo(),
+                             universal_newlines=True)
+        out, err = p.communicate()
+        return (p.returncode, out, err)
+
+    if len(cmds) < 2:
+        return [run(cmd) for cmd in cmds]
+    with ThreadPoolExecutor(max_workers=min(MAX_TEXTURE_JOBS,
+                                            len(cmds))) as executor:
+        return list(executor.map(run, cmds))
+
+
 ##
 # @brief      Exception reporting class
 #
@@ -1636,17 +1696,18 @@ class RmanAsset:
                     '-compression', 'lossless',
                     '-newer',
                     'src', 'dst']
+        cmds = []
         for img in self._txmakeQueue:
-            cmd[-2] = externalPath(img)
             dirname, filename = os.path.split(img)
-            cmd[-1] = externalPath(os.path.join(assetdir,
-                                   os.path.splitext(filename)[0] + '.tex'))
+            dst = os.path.join(assetdir, os.path.splitext(filename)[0] + '.tex')
+            cmd[-2] = externalPath(img)
+            cmd[-1] = externalPath(dst)
             print ('> Converting to texture :\n    %s -> %s' %
                    (cmd[-2], cmd[-1]))
-            p = subprocess.Popen(cmd, stdout=subprocess.PIPE,
-                                 stderr=subprocess.PIPE,
-                                 startupinfo=startupInfo())
-            p.wait()
+            cmds.append(list(cmd))
+        for c, (ret, out, err) in zip(cmds, runCommands(cmds)):
+            if ret != 0:
+                print('> txmake failed for %s :\n%s' % (c[-2], err))
 
     ##
     # @brief      identify and process external files like textures.
@@ -1888,6 +1949,8 @@ class RmanAsset:
     ##
     # @brief      Gather infos from an image's header. We use sho for now, but
     #             hopefuly we will switch to OpenImage IO in the future.
+    #             Specs are cached by path, mtime and size, so an unchanged
+    #             image is only probed once per session, and is never read.
     #
     # @param      self  this object
     # @param      img   Full path to the image file
@@ -1895,37 +1958,30 @@ class RmanAsset:
     # @return     The spec dictionnary stored in the json file.
     #
     def getTextureHeader(self, img):
-        specs = {}
-        if os.path.exists(img):
-            rmantree = internalPath(envGet('RMANTREE'))
-            sho = os.path.join(rmantree, 'bin', app('sho'))
-            cmd = [externalPath(sho), '-info', externalPath(img)]
-            p = subprocess.Popen(cmd, stdout=subprocess.PIPE,
-                                 stderr=subprocess.PIPE,
-                                 startupinfo=startupInfo(),
-                                 bufsize=-1)
-            out, err = p.communicate()
-            # print out
-            # print err
-            toks = err.split('\n')
-            for tok in toks:
-                tok = re.sub('\s{2,50}', '\t', tok)
-                kv = tok.split('\t')
-                if len(kv) < 2:
-                    continue
-                try:
-                    specs[kv[0]] = eval(kv[1])
-                except:
-                    if '(' in kv[1]:
-                        kv[1] = re.sub('\s', ',', kv[1])
-                    try:
-                        specs[kv[0]] = eval(kv[1])
-                    except:
-                        specs[kv[0]] = kv[1]
-        else:
+        if not os.path.exists(img):
             err = 'Invalid image path : %s' % img
             raise RmanAssetError(err)
-        return specs
+        stat = os.stat(img)
+        key = (os.path.realpath(img), stat.st_mtime, stat.st_size)
+        with _textureCacheLock:
+            specs = _textureSpecsCache.get(key, None)
+        if specs is not None:
+            return dict(specs)
+
+        rmantree = internalPath(envGet('RMANTREE'))
+        sho = externalPath(os.path.join(rmantree, 'bin', app('sho')))
+        ret, out, err = runCommands([[sho, '-info', externalPath(img)]])[0]
+        specs = {}
+        for tok in err.split('\n'):
+            tok = re.sub(r'\s{2,50}', '\t', tok)
+            kv = tok.split('\t')
+            if len(kv) < 2:
+                continue
+            specs[kv[0]] = parseHeaderValue(kv[1])
+        if specs:
+            with _textureCacheLock:
+                _textureSpecsCache[key] = specs
+        return dict(specs)
 
     ##
     # @brief      Build the spec dict and stores it in the json struct.
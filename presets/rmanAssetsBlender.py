@@ -1325,6 +1325,7 @@ def createNodes(Asset):
                 # the nodeType should in general correspond to a maya node
                 # type.
                 if nodeType in g_PxrToBlenderNodes:
+                    nodes.ensure_node_type(g_PxrToBlenderNodes[nodeType])
                     created_node = nt.nodes.new(g_PxrToBlenderNodes[nodeType])
                     created_node.location[0] = -curr_x
                     curr_x = curr_x + 250
@@ -967,6 +967,16 @@ class RendermanSceneSettings(bpy.types.PropertyGroup):
         description="Spool Animation",
         default=False)
 
+    external_rib_workers: IntProperty(
+        name="RIB Workers",
+        description="Number of background Blender processes used to write the RIB files of an animation. The frame range is split across the workers. 1 writes every frame in this Blender session. Workers read the saved .blend file",
+        min=1, max=64, default=1)
+
+    external_rehash_static: BoolProperty(
+        name="Rehash Animated Geometry",
+        description="Hash the geometry of animated meshes every frame, so that they can still be written once into static archives and shared between frames. Meshes with no animation are always hashed once per animation",
+        default=False)
+
     enable_checkpoint: BoolProperty(
         name="Enable Checkpointing",
         description="Allows partial images to be output at specific intervals while the renderer continued to run.  The user may also set a point at which the render will terminate",
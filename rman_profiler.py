@@ -0,0 +1,219 @@
+import os
+import json
+import time
+import bpy
+from contextlib import contextmanager
+from .rman_sg_nodes.rman_sg_node import RmanSgNode
+from .rman_utils import string_utils
+from .rfb_logger import rfb_log
+
+# set to 'json' for a summary report, or to 'trace' for a Chrome trace
+# (chrome://tracing, Perfetto) of every translator call
+PROFILE_ENV_VAR = 'RFB_PROFILE_EXPORT'
+
+# translator methods that are timed
+PROFILED_METHODS = ['export', 'update', 'export_deform_sample']
+
+# RmanSgNode attributes reported as primvar element counts
+ELEMENT_COUNTS = ['npoints', 'npolys', 'nverts']
+
+# number of objects and translators listed in the log
+TOP_OFFENDERS = 10
+
+class RmanProfiler(object):
+    '''
+    Opt-in instrumentation of the scene translation. When the RFB_PROFILE_EXPORT
+    environment variable is set, the phases of RmanScene.export and every call to
+    a translator's export, update and export_deform_sample are timed.
+
+    Exclusive timings, call counts and primvar element counts are accumulated per
+    translator and per object. The slowest ones are logged when the export finishes, and the
+    full report can be written as JSON or as a Chrome trace.
+
+    Attributes:
+        rman_scene (RmanScene) - pointer back to the RmanScene being profiled
+        mode (str) - 'json' or 'trace', empty when profiling is off
+        events (list) - (name, category, start, duration, args) of every timed call
+        phases (dict) - phase name to its total time
+        translators (dict) - translator name to its totals
+        objects (dict) - (translator name, object name) to its totals
+    '''
+
+    def __init__(self, rman_scene):
+        self.rman_scene = rman_scene
+        self.mode = ''
+        self.events = []
+        self.phases = dict()
+        self.translators = dict()
+        self.objects = dict()
+        self._time_start = 0.0
+        self._wrapped = []
+        # time spent in nested translator calls, one entry per call in progress
+        self._child_times = []
+
+    @property
+    def enabled(self):
+        return self.mode != ''
+
+    def start(self):
+        self.mode = os.environ.get(PROFILE_ENV_VAR, '').lower()
+        if self.mode and self.mode not in ['json', 'trace']:
+            self.mode = 'json'
+        self.events = []
+        self.phases = dict()
+        self.translators = dict()
+        self.objects = dict()
+        self._child_times = []
+        if not self.enabled:
+            return
+        self._time_start = time.perf_counter()
+        seen = set()
+        for translator in self.rman_scene.rman_translators.values():
+            # the mesh and quadric translators are registered under several names
+            if id(translator) in seen:
+                continue
+            seen.add(id(translator))
+            for method in PROFILED_METHODS:
+                if hasattr(translator, method):
+                    self._wrap_method_(translator, method)
+
+    def stop(self):
+        for translator, method in self._wrapped:
+            # drop the instance attribute, the class method shows through again
+            delattr(translator, method)
+        self._wrapped = []
+        if self.enabled:
+            self.log_top_offenders()
+
+    @contextmanager
+    def phase(self, name):
+        '''
+        Time a phase of the export. Does nothing when profiling is off.
+        '''
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.phases[name] = self.phases.get(name, 0.0) + duration
+            self.events.append((name, 'phase', start, duration, dict()))
+
+    def _get_object_name_(self, args):
+        names = []
+        for arg in args[:2]:
+            if isinstance(arg, (bpy.types.ID, bpy.types.ParticleSystem)):
+                names.append(arg.name)
+        return '/'.join(names) if names else '<unknown>'
+
+    def _get_element_counts_(self, args, result):
+        rman_sg_node = result if isinstance(result, RmanSgNode) else None
+        if rman_sg_node is None:
+            for arg in args:
+                if isinstance(arg, RmanSgNode):
+                    rman_sg_node = arg
+                    break
+        counts = dict()
+        if rman_sg_node is None:
+            return counts
+        for attr in ELEMENT_COUNTS:
+            val = getattr(rman_sg_node, attr, -1)
+            if val > 0:
+                counts[attr] = val
+        return counts
+
+    def _add_totals_(self, totals, method, duration, counts):
+        totals['time'] = totals.get('time', 0.0) + duration
+        totals[method] = totals.get(method, 0) + 1
+        for k, v in counts.items():
+            totals[k] = totals.get(k, 0) + v
+
+    def _wrap_method_(self, translator, method):
+        func = getattr(translator, method)
+        translator_name = type(translator).__name__
+
+        def profiled(*args, **kwargs):
+            # translators call each other, ex: export calls update. Totals get the
+            # exclusive time of each call, and the element counts of the outermost
+            # call only, so that nothing is counted twice.
+            self._child_times.append(0.0)
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start
+                child_time = self._child_times.pop()
+                if self._child_times:
+                    self._child_times[-1] += duration
+            obj_name = self._get_object_name_(args)
+            counts = self._get_element_counts_(args, result) if not self._child_times else dict()
+            exclusive = duration - child_time
+            self._add_totals_(self.translators.setdefault(translator_name, dict()), method, exclusive, counts)
+            self._add_totals_(self.objects.setdefault((translator_name, obj_name), dict()), method, exclusive, counts)
+            event_args = dict(counts)
+            event_args['object'] = obj_name
+            self.events.append(('%s.%s' % (translator_name, method), translator_name, start, duration, event_args))
+            return result
+
+        setattr(translator, method, profiled)
+        self._wrapped.append((translator, method))
+
+    def log_top_offenders(self):
+        for name, duration in self.phases.items():
+            rfb_log().info("Export phase %s: %s" % (name, string_utils._format_time_(duration)))
+
+        translators = sorted(self.translators.items(), key=lambda x: x[1]['time'], reverse=True)
+        for name, totals in translators[:TOP_OFFENDERS]:
+            rfb_log().info("Translator %s: %s" % (name, self._format_totals_(totals)))
+
+        objects = sorted(self.objects.items(), key=lambda x: x[1]['time'], reverse=True)
+        for (translator_name, obj_name), totals in objects[:TOP_OFFENDERS]:
+            rfb_log().info("Object %s (%s): %s" % (obj_name, translator_name, self._format_totals_(totals)))
+
+    def _format_totals_(self, totals):
+        details = ['%s: %d' % (k, v) for k, v in sorted(totals.items()) if k != 'time']
+        return '%s (%s)' % (string_utils._format_time_(totals['time']), ', '.join(details))
+
+    def write_report(self, output_path):
+        '''
+        Write the report next to output_path, usually the RIB file.
+
+        Args:
+            output_path (str) - path the report file name is derived from
+
+        Returns:
+            (str) - the path of the report, or None if profiling is off
+        '''
+        if not self.enabled:
+            return None
+
+        if self.mode == 'trace':
+            report_path = '%s.trace.json' % os.path.splitext(output_path)[0]
+            trace_events = []
+            for name, cat, start, duration, args in self.events:
+                trace_events.append({'name': name, 'cat': cat, 'ph': 'X', 'pid': 0, 'tid': 0,
+                                    'ts': (start - self._time_start) * 1e6,
+                                    'dur': duration * 1e6,
+                                    'args': args})
+            report = {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+        else:
+            report_path = '%s.profile.json' % os.path.splitext(output_path)[0]
+            report = dict()
+            report['phases'] = self.phases
+            report['translators'] = self.translators
+            report['objects'] = [dict(translator=t, object=o, **totals) for (t, o), totals in self.objects.items()]
+
+        try:
+            report_dir = os.path.dirname(report_path)
+            if report_dir and not os.path.exists(report_dir):
+                os.makedirs(report_dir)
+            with open(report_path, 'w') as f:
+                json.dump(report, f, indent=1)
+        except OSError as e:
+            rfb_log().error("Could not write export profile %s: %s" % (report_path, str(e)))
+            return None
+
+        rfb_log().info("Wrote export profile: %s" % report_path)
+        return report_path
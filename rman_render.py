@@ -5,6 +5,7 @@ import bpy
 import sys
 from .rman_scene import RmanScene
 from. import rman_spool
+from. import rman_rib_workers
 from. import chatserver
 from .rfb_logger import rfb_log
 import socketserver
@@ -173,15 +174,20 @@ class RmanRender(object):
     def __del__(self):   
         self.rictl.PRManEnd()
 
+    def _get_dump_rib_path_(self):
+        if sys.platform == ("win32"):
+            return "C:/tmp/blender.rib"
+        return "/var/tmp/blender.rib"
+
     def _dump_rib_(self):
         if 'RFB_DUMP_RIB' in os.environ:
             rfb_log().debug("Writing to RIB...")
             rib_time_start = time.time()
-            if sys.platform == ("win32"):
-                self.sg_scene.Render("rib C:/tmp/blender.rib")
-            else:
-                self.sg_scene.Render("rib /var/tmp/blender.rib")     
+            self.sg_scene.Render("rib %s" % self._get_dump_rib_path_())
             rfb_log().debug("Finished writing RIB. Time: %s" % string_utils._format_time_(time.time() - rib_time_start))            
+        # there's no RIB file for these renders, the report goes where
+        # the RIB would have been dumped
+        self.rman_scene.profiler.write_report(self._get_dump_rib_path_())
 
     def _load_image_into_blender(self, render_output, bl_scene):
         render = bl_scene.render
@@ -238,20 +244,32 @@ class RmanRender(object):
         rm = bl_scene.renderman
 
         self.rman_running = True
-        if rm.external_animation:
+        if rm.external_animation and rm.external_rib_workers > 1 and rman_rib_workers.RmanRibWorkers.can_run():
+            workers = rman_rib_workers.RmanRibWorkers(self, depsgraph, rm.external_rib_workers)
+            workers.generate_rib()
+
+        elif rm.external_animation:
+            if rm.external_rib_workers > 1:
+                rfb_log().warning("Scene has unsaved changes. Writing RIB files in this session instead of using workers.")
             original_frame = bl_scene.frame_current
             rfb_log().debug("Writing to RIB...")             
-            for frame in range(bl_scene.frame_start, bl_scene.frame_end + 1):
-                bl_view_layer = depsgraph.view_layer
-                self.sg_scene = self.sgmngr.CreateScene() 
-                self.bl_engine.frame_set(frame, subframe=0.0)
-                self.rman_scene.export_for_final_render(depsgraph, self.sg_scene, bl_view_layer, is_external=True)
-                rib_output = string_utils.expand_string(rm.path_rib_output, 
-                                                        frame=frame, 
-                                                        asFilePath=True)                                                                            
-                self.sg_scene.Render("rib %s" % rib_output)   
-                self.sgmngr.DeleteScene(self.sg_scene)     
-
+            # static geometry is only written once for the whole animation
+            self.rman_scene.static_archives = dict()
+            try:
+                for frame in range(bl_scene.frame_start, bl_scene.frame_end + 1):
+                    bl_view_layer = depsgraph.view_layer
+                    self.sg_scene = self.sgmngr.CreateScene() 
+                    self.bl_engine.frame_set(frame, subframe=0.0)
+                    self.rman_scene.export_for_final_render(depsgraph, self.sg_scene, bl_view_layer, is_external=True)
+                    rib_output = string_utils.expand_string(rm.path_rib_output, 
+                                                            frame=frame, 
+                                                            asFilePath=True)                                                                            
+                    self.sg_scene.Render("rib %s" % rib_output)   
+                    self.rman_scene.profiler.write_report(rib_output)
+                    self.sgmngr.DeleteScene(self.sg_scene)     
+            finally:
+                # don't let later renders reuse this job's archives
+                self.rman_scene.static_archives = None
             self.bl_engine.frame_set(original_frame, subframe=0.0)
             
 
@@ -272,6 +290,7 @@ class RmanRender(object):
             self.sg_scene.Render("rib %s" % rib_output)     
             rfb_log().debug("Finished writing RIB. Time: %s" % string_utils._format_time_(time.time() - rib_time_start)) 
             rfb_log().info("Finished parsing scene. Total time: %s" % string_utils._format_time_(time.time() - time_start))
+            self.rman_scene.profiler.write_report(rib_output)
             self.sgmngr.DeleteScene(self.sg_scene)
 
         spooler = rman_spool.RmanSpool(self, self.rman_scene, depsgraph)
@@ -0,0 +1,251 @@
+import os
+import sys
+import json
+import time
+import queue
+import tempfile
+import threading
+import subprocess
+import bpy
+from .rman_utils import string_utils
+from .rfb_logger import rfb_log
+
+# prefix used by the worker processes to report the status of each frame
+# on stdout. Everything else printed by the workers is just logged.
+STATUS_PREFIX = 'RFB_RIB_STATUS'
+
+# tokens that are computed when the string expression is created. These are forwarded
+# to the workers so that paths expand the same way they would in this session.
+FORWARDED_TOKENS = ['jobid', 'date', 'time']
+
+class RmanRibWorkers(object):
+    '''
+    Generates the RIB files for an external animation render by splitting the frame
+    range across several background Blender processes, each running the add-on headless.
+
+    The RIB output path for each frame is expanded here, so path_rib_output tokens
+    resolve exactly as they would when exporting in this session. A frame that fails
+    to export is reported, but doesn't stop the rest of the batch.
+
+    Attributes:
+        rman_render (RmanRender) - pointer back to the current RmanRender object
+        depsgraph (bpy.types.Depsgraph) - the Blender dependency graph
+        bl_scene (bpy.types.Scene) - the current Blender scene object
+        num_workers (int) - the number of worker processes to launch
+    '''
+
+    def __init__(self, rman_render, depsgraph, num_workers):
+        self.rman_render = rman_render
+        self.depsgraph = depsgraph
+        self.bl_scene = depsgraph.scene_eval
+        self.num_workers = num_workers
+        self.procs = []
+
+    @staticmethod
+    def can_run():
+        # the workers load the .blend from disk, so it needs to
+        # be saved and up to date
+        return bpy.data.filepath != '' and not bpy.data.is_dirty
+
+    def _split_frames(self, frames):
+        # contiguous chunks, so that each worker steps through
+        # neighbouring frames like a serial export would
+        num_workers = max(1, min(self.num_workers, len(frames)))
+        chunk_size, remainder = divmod(len(frames), num_workers)
+        chunks = []
+        start = 0
+        for i in range(num_workers):
+            end = start + chunk_size + (1 if i < remainder else 0)
+            chunks.append(frames[start:end])
+            start = end
+        return chunks
+
+    def _write_job_file(self, tmp_dir, idx, frames):
+        rm = self.bl_scene.renderman
+        job = dict()
+        job['view_layer'] = self.depsgraph.view_layer.name
+        job['tokens'] = dict([(k, string_utils.get_var(k)) for k in FORWARDED_TOKENS])
+        job['frames'] = [(frame, string_utils.expand_string(rm.path_rib_output,
+                                                            frame=frame,
+                                                            asFilePath=True)) for frame in frames]
+        job_file = os.path.join(tmp_dir, 'rib_worker_%d.json' % idx)
+        with open(job_file, 'w') as f:
+            json.dump(job, f)
+        return job_file
+
+    def _launch_worker(self, job_file):
+        expr = "import importlib; importlib.import_module('%s.rman_rib_workers').worker_main(r'%s')" % (__package__, job_file)
+        cmd = [bpy.app.binary_path, '-b', bpy.data.filepath,
+                '--scene', self.bl_scene.name,
+                '--python-exit-code', '1',
+                '--python-expr', expr]
+        rfb_log().debug("Starting RIB worker: %s" % ' '.join(cmd))
+        return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                universal_newlines=True)
+
+    def _read_worker_output(self, idx, proc, msg_queue):
+        for line in iter(proc.stdout.readline, ''):
+            line = line.rstrip()
+            if line.startswith(STATUS_PREFIX):
+                tokens = line.split(' ', 3)
+                msg_queue.put((idx, int(tokens[1]), tokens[2], tokens[3] if len(tokens) > 3 else ''))
+            elif line:
+                rfb_log().debug("[RIB worker %d] %s" % (idx, line))
+        proc.stdout.close()
+        proc.wait()
+        msg_queue.put((idx, None, 'EXIT', str(proc.returncode)))
+
+    def _kill_workers(self):
+        for proc in self.procs:
+            if proc.poll() is None:
+                proc.kill()
+                # so the job files can be removed right after
+                proc.wait()
+
+    def generate_rib(self):
+        '''
+        Launch the workers and wait for them to finish.
+
+        Returns:
+            (list) - the frames that failed to export
+        '''
+        frames = list(range(self.bl_scene.frame_start, self.bl_scene.frame_end + 1))
+        if not frames:
+            return []
+        chunks = self._split_frames(frames)
+        total = len(frames)
+        pending = dict()
+        failed = []
+        done = 0
+        msg_queue = queue.Queue()
+
+        time_start = time.time()
+        rfb_log().info("Writing RIB for %d frames using %d workers..." % (total, len(chunks)))
+
+        with tempfile.TemporaryDirectory(prefix='rfb_rib_') as tmp_dir:
+            try:
+                for idx, chunk in enumerate(chunks):
+                    job_file = self._write_job_file(tmp_dir, idx, chunk)
+                    proc = self._launch_worker(job_file)
+                    self.procs.append(proc)
+                    pending[idx] = set(chunk)
+                    t = threading.Thread(target=self._read_worker_output, args=(idx, proc, msg_queue))
+                    t.daemon = True
+                    t.start()
+
+                running = len(chunks)
+                while running > 0:
+                    if self.rman_render.bl_engine.test_break():
+                        rfb_log().warning("RIB generation cancelled.")
+                        return sorted(failed + [f for p in pending.values() for f in p])
+
+                    try:
+                        idx, frame, status, msg = msg_queue.get(timeout=0.5)
+                    except queue.Empty:
+                        continue
+
+                    if status == 'EXIT':
+                        running -= 1
+                        # any frame the worker didn't get to is a failure
+                        for f in sorted(pending[idx]):
+                            rfb_log().error("RIB worker %d exited (%s) before exporting frame %d" % (idx, msg, f))
+                            failed.append(f)
+                        pending[idx] = set()
+                        continue
+
+                    pending[idx].discard(frame)
+                    done += 1
+                    if status == 'OK':
+                        rfb_log().debug("Wrote RIB for frame %d (%s)" % (frame, msg))
+                    else:
+                        rfb_log().error("Failed to write RIB for frame %d: %s" % (frame, msg))
+                        failed.append(frame)
+
+                    self.rman_render.bl_engine.update_progress(float(done) / float(total))
+                    self.rman_render.bl_engine.update_stats('RenderMan', 'Writing RIB: %d/%d frames' % (done, total))
+            finally:
+                # on cancel or on an error, don't leave workers running. The
+                # finished ones are already gone, so this is a no-op for them.
+                self._kill_workers()
+                self.procs = []
+
+        rfb_log().info("Finished writing RIB. Total time: %s" % string_utils._format_time_(time.time() - time_start))
+        if failed:
+            rfb_log().error("RIB generation failed for frames: %s" % ', '.join([str(f) for f in sorted(failed)]))
+
+        return sorted(failed)
+
+class _WorkerEngine(object):
+    '''
+    Stand-in for the RenderEngine in the worker processes. RmanScene only
+    needs it to change frames and report stats.
+    '''
+
+    def __init__(self, bl_scene):
+        self.bl_scene = bl_scene
+
+    def frame_set(self, frame, subframe=0.0):
+        self.bl_scene.frame_set(frame, subframe=subframe)
+
+    def update_stats(self, stats, info):
+        pass
+
+    def update_progress(self, progress):
+        pass
+
+    def tag_redraw(self):
+        pass
+
+    def test_break(self):
+        return False
+
+def _report_(frame, status, msg=''):
+    print('%s %d %s %s' % (STATUS_PREFIX, frame, status, msg))
+    sys.stdout.flush()
+
+def worker_main(job_file):
+    '''
+    Entry point for the worker processes. Exports each frame listed in the job
+    file to its RIB file, reporting the status of each frame on stdout.
+    '''
+    from .rman_render import RmanRender
+
+    with open(job_file) as f:
+        job = json.load(f)
+
+    bl_scene = bpy.context.scene
+    for k, v in job['tokens'].items():
+        string_utils.set_var(k, v)
+
+    rman_render = RmanRender.get_rman_render()
+    rman_render.bl_engine = _WorkerEngine(bl_scene)
+    rman_render.rman_running = True
+    # static geometry is only written once per worker, and shared
+    # with the other workers through the content hashed archive files
+    rman_render.rman_scene.static_archives = dict()
+
+    view_layer = bl_scene.view_layers.get(job['view_layer'], None)
+    if view_layer is None:
+        view_layer = bpy.context.view_layer
+
+    for frame, rib_output in job['frames']:
+        try:
+            time_start = time.time()
+            bl_scene.frame_set(frame, subframe=0.0)
+            depsgraph = view_layer.depsgraph
+            depsgraph.update()
+            rman_render.sg_scene = rman_render.sgmngr.CreateScene()
+            rman_render.rman_scene.export_for_final_render(depsgraph, rman_render.sg_scene, view_layer, is_external=True)
+            rman_render.sg_scene.Render("rib %s" % rib_output)
+            rman_render.rman_scene.profiler.write_report(rib_output)
+            rman_render.sgmngr.DeleteScene(rman_render.sg_scene)
+            rman_render.sg_scene = None
+            _report_(frame, 'OK', string_utils._format_time_(time.time() - time_start))
+        except Exception as e:
+            _report_(frame, 'FAILED', str(e).replace('\n', ' '))
+            if rman_render.sg_scene:
+                rman_render.sgmngr.DeleteScene(rman_render.sg_scene)
+                rman_render.sg_scene = None
+
+    rman_render.rman_scene.static_archives = None
+    rman_render.rman_running = False
@@ -25,12 +25,15 @@ from .rman_utils import texture_utils
 from .rman_utils import filepath_utils
 from .rman_utils import scene_utils
 from .rman_utils import prefs_utils
+from .rman_utils.light_link_utils import LightLinkResolver
 
 from .rfb_logger import rfb_log
 from .rman_sg_nodes.rman_sg_node import RmanSgNode
+from .rman_profiler import RmanProfiler
 
 import bpy
 import os
+import numpy as np
 
 class RmanScene(object):
     '''
@@ -58,10 +61,30 @@ class RmanScene(object):
         rman_translators (dict) - dictionary of all RmanTranslator(s)
         rman_particles (dict) - dictionary of all particle systems used
         rman_cameras (dict) - dictionary of all cameras in the scene
+        rman_instancers (dict) - dictionary of dupli instancers to their instances. Each instancer
+                            maps an instance's persistent_id to its group node and its matrix
+                            relative to the instancer
+        rman_light_filters (dict) - light filter object names to their RmanSgLightFilter, shared
+                            by all the lights using the filter
+        material_instances (dict) - reverse index of material db_name to the set of
+                            (object db_name, group db_name) instances using that material
+        instance_materials (dict) - the (object db_name, group db_name) instances to the set of
+                            material db_names they use
         obj_hash (dict) - dictionary of hashes to objects ( for object picking )
+        scene_objects (dict) - name of every object in the depsgraph to its db_name, used
+                            to find the objects that were deleted during interactive renders
+        light_links (LightLinkResolver) - grouping and light linking tables, built on first
+                            use and dropped whenever the scene may have changed
+        meta_families (dict) - metaball family name to its (metaball, owner object) pairs,
+                            built on first use and dropped like light_links
         motion_steps (set) - the full set of motion steps for the scene, including 
                             overrides from individual objects
+        static_archives (dict) - when not None, non-deforming geometry is written once into
+                            archives keyed by content hash. Maps content hashes, and the db_names
+                            of objects with no animation, to archive paths. It lives for the whole
+                            external render job (it is not cleared on reset)
         main_camera (RmanSgCamera) - pointer to the main scene camera
+        profiler (RmanProfiler) - times the export when profiling is turned on
     '''
 
     def __init__(self, rman_render=None):
@@ -87,12 +110,21 @@ class RmanScene(object):
         self.rman_translators = dict()
         self.rman_particles = dict()
         self.rman_cameras = dict()
+        self.rman_instancers = dict()
+        self.rman_light_filters = dict()
+        self.material_instances = dict()
+        self.instance_materials = dict()
         self.obj_hash = dict() 
+        self.light_links = None
+        self.meta_families = None
+        self.scene_objects = dict()
 
         self.motion_steps = set()
         self.main_camera = None
+        self.static_archives = None
 
         self.create_translators()     
+        self.profiler = RmanProfiler(self)
 
     def create_translators(self):
 
@@ -133,7 +165,14 @@ class RmanScene(object):
         self.rman_objects = dict()
         self.rman_particles = dict()
         self.rman_cameras = dict()        
+        self.rman_instancers = dict()
+        self.rman_light_filters = dict()
+        self.material_instances = dict()
+        self.instance_materials = dict()
         self.obj_hash = dict() 
+        self.light_links = None
+        self.meta_families = None
+        self.scene_objects = dict()
         self.motion_steps = set()       
 
     def export_for_final_render(self, depsgraph, sg_scene, bl_view_layer, is_external=False):
@@ -189,6 +228,14 @@ class RmanScene(object):
     def export(self):
 
         self.reset()
+        self.profiler.start()
+        try:
+            self._export_()
+        finally:
+            self.profiler.stop()
+
+    def _export_(self):
+        profiler = self.profiler
 
         # update variables
         string_utils.set_var('scene', self.bl_scene.name)
@@ -196,37 +243,45 @@ class RmanScene(object):
 
         self.bl_frame_current = self.bl_scene.frame_current
         rfb_log().debug("Calling txmake_all()")
-        texture_utils.get_txmanager().rman_scene = self  
-        texture_utils.get_txmanager().txmake_all(blocking=True)
+        with profiler.phase('txmake_all'):
+            texture_utils.get_txmanager().rman_scene = self  
+            texture_utils.get_txmanager().txmake_all(blocking=True)
 
         rfb_log().debug("Calling export_materials()")
-        #self.export_materials(bpy.data.materials)
-        self.export_materials([m for m in self.depsgraph.ids if isinstance(m, bpy.types.Material)])
+        with profiler.phase('export_materials'):
+            #self.export_materials(bpy.data.materials)
+            self.export_materials([m for m in self.depsgraph.ids if isinstance(m, bpy.types.Material)])
         rfb_log().debug("Calling export_data_blocks()")
-        self.export_data_blocks(bpy.data.objects)
-        #self.export_data_blocks([x for x in self.depsgraph.ids if isinstance(x, bpy.types.Object)])
-
-        self.export_searchpaths() 
-        self.export_global_options()     
-        self.export_hider()
-        self.export_integrator()
-        self.export_cameras([c for c in self.depsgraph.objects if isinstance(c.data, bpy.types.Camera)])
-        
-        if self.is_viewport_render:
-            # For now, when rendering into Blender's viewport, create 
-            # a simple Ci,a display
-            self.export_viewport_display()
-        else:
-            self.export_displays()
+        with profiler.phase('export_data_blocks'):
+            self.export_data_blocks(bpy.data.objects)
+            #self.export_data_blocks([x for x in self.depsgraph.ids if isinstance(x, bpy.types.Object)])
+
+        with profiler.phase('export_options'):
+            self.export_searchpaths() 
+            self.export_global_options()     
+            self.export_hider()
+            self.export_integrator()
+            self.export_cameras([c for c in self.depsgraph.objects if isinstance(c.data, bpy.types.Camera)])
+            
+            if self.is_viewport_render:
+                # For now, when rendering into Blender's viewport, create 
+                # a simple Ci,a display
+                self.export_viewport_display()
+            else:
+                self.export_displays()
 
 
-        self.export_samplefilters()
-        self.export_displayfilters()
+            self.export_samplefilters()
+            self.export_displayfilters()
 
         rfb_log().debug("Calling export_instances()")
-        self.export_instances()
+        with profiler.phase('export_instances'):
+            self.export_instances()
+        if self.is_interactive:
+            self._build_scene_objects_()
         rfb_log().debug("Calling export_motion_blur()")
-        self.export_motion_blur()
+        with profiler.phase('export_motion_blur'):
+            self.export_motion_blur()
         self.check_solo_light()
 
         self.export_viewport_stats()
@@ -267,8 +322,11 @@ class RmanScene(object):
                 rman_sg_node = None
                 if db_name in self.rman_objects:
                     continue
-                rman_sg_node = translator.export(ob, db_name)
-                translator.export_object_primvars(ob, rman_sg_node.sg_node)
+                if self._use_static_archive_(ob, rman_type):
+                    rman_sg_node = self.export_static_archive(ob, db_name, rman_type)
+                if not rman_sg_node:
+                    rman_sg_node = translator.export(ob, db_name)
+                    translator.export_object_primvars(ob, rman_sg_node.sg_node)
                 self.rman_objects[db_name] = rman_sg_node 
 
                 if rman_type in ['POLYGON_MESH', 'SUBDIVISION_MESH', 'POINTS']:
@@ -298,6 +356,76 @@ class RmanScene(object):
                     rman_sg_node.motion_steps = subframes
                     self.motion_steps.update(subframes)                            
 
+    def _use_static_archive_(self, ob, rman_type):
+        if not self.external_render or self.static_archives is None:
+            return False
+        if rman_type not in ['POLYGON_MESH', 'SUBDIVISION_MESH']:
+            return False
+        # particles are children of the mesh node, so keep
+        # these objects in the frame's RIB
+        if len(ob.particle_systems) > 0:
+            return False
+        # animated transforms live on the instance groups, so only
+        # deforming objects need their geometry written every frame
+        if object_utils._is_deforming_(ob):
+            return False
+        # animation on the object or its data can also change the geometry
+        # (animated modifier settings, drivers...). Those objects are only
+        # archived when their geometry is hashed again every frame.
+        return not self._is_animated_(ob) or self.bl_scene.renderman.external_rehash_static
+
+    def _is_animated_(self, ob):
+        return object_utils.is_transforming(ob) or \
+            getattr(ob.data, 'animation_data', None) is not None
+
+    def export_static_archive(self, ob, db_name, rman_type):
+        # geometry with no animation can't change during the job, so it is only
+        # hashed on the first frame. Animated objects are hashed every frame.
+        translator = self.rman_translators[rman_type]
+        hash_once = not self._is_animated_(ob)
+        archive_path = self.static_archives.get(db_name, None) if hash_once else None
+        if archive_path is None:
+            archive_path = ''
+            content_hash = translator.get_content_hash(ob)
+            if content_hash:
+                archive_path = self.static_archives.get(content_hash, None)
+                if archive_path is None:
+                    rib_output = string_utils.expand_string(self.bl_scene.renderman.path_rib_output,
+                                                            frame=self.bl_scene.frame_current,
+                                                            asFilePath=True)
+                    archive_dir = os.path.join(os.path.dirname(rib_output), 'static')
+                    archive_path = os.path.join(archive_dir, '%s.rib' % content_hash)
+                    if not os.path.exists(archive_path):
+                        # the archive may already exist from an earlier job or another worker
+                        os.makedirs(archive_dir, exist_ok=True)
+                        self._write_static_archive_(ob, db_name, translator, archive_path)
+                    self.static_archives[content_hash] = archive_path
+            if hash_once:
+                self.static_archives[db_name] = archive_path
+
+        if not archive_path:
+            return None
+
+        return self.rman_translators['DELAYED_LOAD_ARCHIVE'].export_static_archive(ob, db_name, archive_path)
+
+    def _write_static_archive_(self, ob, db_name, translator, archive_path):
+        rfb_log().debug("Writing static archive for %s: %s" % (db_name, archive_path))
+        sg_scene = self.sg_scene
+        archive_scene = self.rman_render.sgmngr.CreateScene()
+        try:
+            self.sg_scene = archive_scene
+            rman_sg_node = translator.export(ob, db_name)
+            translator.export_object_primvars(ob, rman_sg_node.sg_node)
+            archive_scene.Root().AddChild(rman_sg_node.sg_node)
+            # write to a temporary file first, so that readers never
+            # see a partially written archive
+            tmp_path = '%s.%d.tmp' % (archive_path, os.getpid())
+            archive_scene.Render("rib %s -archive" % tmp_path)
+            os.replace(tmp_path, archive_path)
+        finally:
+            self.sg_scene = sg_scene
+            self.rman_render.sgmngr.DeleteScene(archive_scene)
+
     def export_instances(self, obj_selected=None):
         objFound = False
         for ob_inst in self.depsgraph.object_instances:
@@ -366,6 +494,12 @@ class RmanScene(object):
                     # set a transform.
 
                     group.SetTransform( transform_utils.convert_matrix(ob_inst.matrix_world.copy()))
+                    if ob_inst.is_instance:
+                        # remember this instance on its instancer, so that transform
+                        # edits on the instancer don't need to search all instances
+                        rel_mtx = np.array(parent.matrix_world.inverted() @ ob_inst.matrix_world)
+                        instances = self.rman_instancers.setdefault(parent.name_full, dict())
+                        instances[tuple(ob_inst.persistent_id)] = (group_db_name, group, rel_mtx)
 
                 if rman_parent_node and parent.type == "EMPTY":                      
                     rman_parent_node.sg_node.AddChild(group)
@@ -377,20 +511,111 @@ class RmanScene(object):
                 if translator:
                     translator.export_object_attributes(ob, group)  
 
-                self.attach_material(ob, group)
+                self.attach_material(ob, group, rman_sg_node, group_db_name)
 
                 # add instance to the RmanSgNode
                 rman_sg_node.instances[group_db_name] = group      
 
-    def attach_material(self, ob, group):
+    def attach_material(self, ob, group, rman_sg_node=None, group_db_name=''):
+        mat_db_names = []
         for mat in object_utils._get_used_materials_(ob): 
             if not mat:
                 continue
             mat_db_name = object_utils.get_db_name(mat)
+            mat_db_names.append(mat_db_name)
             rman_sg_material = self.rman_materials.get(mat_db_name, None)
             if rman_sg_material and rman_sg_material.sg_node:
                 group.SetMaterial(rman_sg_material.sg_node)        
 
+        if rman_sg_node:
+            self.update_material_index(rman_sg_node, group_db_name, mat_db_names)
+
+    def get_light_link_resolver(self):
+        if self.light_links is None:
+            self.light_links = LightLinkResolver(self.bl_scene)
+        return self.light_links
+
+    def get_meta_families(self):
+        if self.meta_families is None:
+            self.meta_families = object_utils.get_meta_families()
+        return self.meta_families
+
+    def update_material_index(self, rman_sg_node, group_db_name, mat_db_names):
+        # keep the material -> instances reverse index up to date
+        # for this instance. Passing no materials removes the instance.
+        key = (rman_sg_node.db_name, group_db_name)
+        for mat_db_name in self.instance_materials.pop(key, set()):
+            instances = self.material_instances.get(mat_db_name, None)
+            if instances:
+                instances.discard(key)
+
+        if mat_db_names:
+            self.instance_materials[key] = set(mat_db_names)
+            for mat_db_name in mat_db_names:
+                self.material_instances.setdefault(mat_db_name, set()).add(key)
+
+    def _build_motion_plan_(self):
+        '''
+        Find everything that needs to be sampled for motion blur, so that each
+        subframe only has to visit these entries and not the whole scene.
+
+        Returns:
+            (dict) - with the following lists:
+                'transforms' - (original object, RmanSgNode, group) for transforming objects
+                'instances' - (parent name, instance name, persistent id) -> (RmanSgNode, group)
+                              for transforming dupli instances
+                'deforming' - (original object, RmanSgNode, translator) for deforming data blocks
+                'particles' - (original object, psys name, RmanSgParticles) for emitters
+        '''
+        plan = {'transforms': [], 'instances': dict(), 'deforming': [], 'particles': []}
+        visited = set()
+
+        for ob_inst in self.depsgraph.object_instances:            
+            if ob_inst.is_instance:
+                ob = ob_inst.instance_object.original  
+                parent = ob_inst.parent
+                group_db_name = "%s|%s|%d" % (parent.name_full, ob.name_full, ob_inst.persistent_id[0])
+            else:
+                ob = ob_inst.object.original
+                group_db_name = "%s" % (ob.name_full)
+
+            if ob.type not in ['MESH']:
+                continue
+            rman_type = object_utils._detect_primitive_(ob)
+            db_name = object_utils.get_db_name(ob, rman_type=rman_type)              
+            if db_name == '':
+                continue
+
+            rman_sg_node = self.rman_objects.get(db_name, None)
+
+            if object_utils.is_transforming(ob) and rman_sg_node and rman_sg_node.motion_steps:
+                group = rman_sg_node.instances.get(group_db_name, None)
+                if group:
+                    if ob_inst.is_instance:
+                        key = (parent.name_full, ob.name_full, ob_inst.persistent_id[0])
+                        plan['instances'][key] = (rman_sg_node, group)
+                    else:
+                        plan['transforms'].append((ob, rman_sg_node, group))
+
+            # the remaining entries are per data block, not per instance
+            if db_name in visited:
+                continue
+            visited.add(db_name)
+
+            for psys in ob.particle_systems:
+                if psys.settings.type == 'EMITTER' and psys.settings.render_type != 'OBJECT':
+                    psys_db_name = '%s|%s-EMITTER' % (ob.name_full, psys.name)
+                    rman_sg_particles_node = self.rman_particles.get(psys_db_name, None)
+                    if rman_sg_particles_node and rman_sg_particles_node.motion_steps:
+                        plan['particles'].append((ob, psys.name, rman_sg_particles_node))
+
+            if rman_sg_node and rman_sg_node.motion_steps and object_utils._is_deforming_(ob):
+                translator = self.rman_translators.get(rman_type, None)
+                if translator:
+                    plan['deforming'].append((ob, rman_sg_node, translator))
+
+        return plan
+
     def export_motion_blur(self):
 
         subframes = []
@@ -406,7 +631,14 @@ class RmanScene(object):
 
             motion_steps = sorted(list(self.motion_steps))
 
-            samp = 0
+            plan = self._build_motion_plan_()
+            if not (plan['transforms'] or plan['instances'] or plan['deforming'] or plan['particles']):
+                # nothing is moving
+                return
+            # instancers with transforming instances, so that the other instances
+            # can be skipped at every subframe
+            instancers = set([parent_name for (parent_name, ob_name, persistent_id) in plan['instances']])
+
             for seg in motion_steps:
                 if seg < 0.0:
                     self.rman_render.bl_engine.frame_set(origframe - 1, subframe=1.0 + seg)
@@ -414,63 +646,107 @@ class RmanScene(object):
                     self.rman_render.bl_engine.frame_set(origframe, subframe=seg)  
 
                 self.depsgraph.update()
-                for ob_inst in self.depsgraph.object_instances:            
-                    if ob_inst.is_instance:
-                        ob = ob_inst.instance_object.original  
-                        parent = ob_inst.parent
-                        group_db_name = "%s|%s|%d" % (parent.name_full, ob.name_full, ob_inst.persistent_id[0])
-                    else:
-                        ob = ob_inst.object
-                        group_db_name = "%s" % (ob.name_full)
 
-                    if ob.type not in ['MESH']:
-                        continue
-                    rman_type = object_utils._detect_primitive_(ob)
-                    db_name = object_utils.get_db_name(ob, rman_type=rman_type)              
-                    if db_name == '':
+                for ob, psys_name, rman_sg_particles_node in plan['particles']:
+                    if not seg in rman_sg_particles_node.motion_steps:
                         continue
+                    samp = rman_sg_particles_node.motion_steps.index(seg)
+                    ob_eval = ob.evaluated_get(self.depsgraph)
+                    psys = ob_eval.particle_systems[psys_name]
+                    self.rman_translators['PARTICLES'].export_deform_sample(rman_sg_particles_node, ob_eval, psys, subframes, samp)
 
-                    # deal with particles first
-                    for psys in ob.particle_systems:
-                        if psys.settings.type == 'HAIR' and psys.settings.render_type == 'PATH':
-                            hair_db_name = '%s|%s-HAIR' % (ob.name_full, psys.name)
-                            rman_sg_hair_node = self.rman_particles.get(hair_db_name, None)
-                            pass
-                        elif psys.settings.type == 'EMITTER' and psys.settings.render_type != 'OBJECT':
-                            psys_db_name = '%s|%s-EMITTER' % (ob.name_full, psys.name)
-                            rman_sg_particles_node = self.rman_particles.get(psys_db_name, None)
-                            if rman_sg_particles_node:
-                                if not seg in rman_sg_particles_node.motion_steps:
-                                    continue
-                                else:
-                                    samp = rman_sg_particles_node.motion_steps.index(seg)
-                                self.rman_translators['PARTICLES'].export_deform_sample(rman_sg_particles_node, ob, psys, subframes, samp)                     
-
-
-                    rman_sg_node = self.rman_objects.get(db_name, None)
-                    if not rman_sg_node:
-                        continue
-                    
+                for ob, rman_sg_node, group in plan['transforms']:
                     if not seg in rman_sg_node.motion_steps:
                         continue
-                    else:
-                        samp = rman_sg_node.motion_steps.index(seg)
-
-                    if object_utils.is_transforming(ob):
-                        group = rman_sg_node.instances.get(group_db_name, None)
-                        if group:
+                    samp = rman_sg_node.motion_steps.index(seg)
+                    ob_eval = ob.evaluated_get(self.depsgraph)
+                    group.SetTransformNumSamples(len(rman_sg_node.motion_steps))
+                    group.SetTransformSample( samp, transform_utils.convert_matrix(ob_eval.matrix_world), seg)
+
+                if plan['instances']:
+                    # dupli matrices are only available from the instance iterator. Only
+                    # the instances of the planned instancers are looked at, and the walk
+                    # stops once all of the planned instances were found.
+                    remaining = len(plan['instances'])
+                    for ob_inst in self.depsgraph.object_instances:
+                        if not ob_inst.is_instance:
+                            continue
+                        parent_name = ob_inst.parent.name_full
+                        if parent_name not in instancers:
+                            continue
+                        key = (parent_name, ob_inst.instance_object.original.name_full, ob_inst.persistent_id[0])
+                        entry = plan['instances'].get(key, None)
+                        if not entry:
+                            continue
+                        rman_sg_node, group = entry
+                        if seg in rman_sg_node.motion_steps:
+                            samp = rman_sg_node.motion_steps.index(seg)
                             group.SetTransformNumSamples(len(rman_sg_node.motion_steps))
                             group.SetTransformSample( samp, transform_utils.convert_matrix(ob_inst.matrix_world), seg)
+                        remaining -= 1
+                        if remaining == 0:
+                            break
 
-                    if object_utils._is_deforming_(ob):
-                        translator = self.rman_translators.get(rman_type, None)
-                        if translator:
-                            translator.export_deform_sample(rman_sg_node, ob, subframes, samp)
-
-                #samp += 1
+                for ob, rman_sg_node, translator in plan['deforming']:
+                    if not seg in rman_sg_node.motion_steps:
+                        continue
+                    samp = rman_sg_node.motion_steps.index(seg)
+                    translator.export_deform_sample(rman_sg_node, ob.evaluated_get(self.depsgraph), subframes, samp)
 
             self.rman_render.bl_engine.frame_set(origframe, subframe=0)    
 
+    def update_instancer_transforms(self, ob, refresh=False):
+        '''
+        Update the transforms of the instances of a dupli instancer.
+
+        Args:
+            ob (bpy.types.Object) - the instancer
+            refresh (bool) - the instancer's geometry changed, so the relative
+                             matrices cached for its instances are stale
+        '''
+        instances = self.rman_instancers.get(ob.name_full, None)
+        if not instances:
+            return
+
+        entries = list(instances.values())
+        groups = [group for (group_db_name, group, rel_mtx) in entries]
+
+        if ob.instance_type in ['VERTS', 'FACES'] and not refresh:
+            # instances are rigidly attached to the instancer, so their new world
+            # matrices are the instancer's matrix times their cached relative matrices
+            rel_mtxs = np.array([rel_mtx for (group_db_name, group, rel_mtx) in entries])
+            mtxs = np.array(ob.matrix_world) @ rel_mtxs
+        else:
+            # ex: particle instancing, where instances don't follow the instancer
+            # rigidly, or vertex/face duplis whose geometry was edited. The new matrices
+            # only come from the depsgraph, so this walks the object instances until
+            # all of the indexed ones were found. The index only saves building db names
+            # to find the groups. Relative matrices are cached again.
+            groups = []
+            mtxs = []
+            remaining = len(instances)
+            inv_mtx = ob.matrix_world.inverted()
+            for ob_inst in self.depsgraph.object_instances:
+                if not ob_inst.is_instance or ob_inst.parent != ob:
+                    continue
+                persistent_id = tuple(ob_inst.persistent_id)
+                entry = instances.get(persistent_id, None)
+                if not entry:
+                    continue
+                mtx = ob_inst.matrix_world.copy()
+                instances[persistent_id] = (entry[0], entry[1], np.array(inv_mtx @ mtx))
+                groups.append(entry[1])
+                mtxs.append(np.array(mtx))
+                remaining -= 1
+                if remaining == 0:
+                    break
+
+        if not groups:
+            return
+
+        for group, v in zip(groups, transform_utils.convert_matrices(mtxs)):
+            group.SetTransform(v)
+
     def check_solo_light(self):
         if self.bl_scene.renderman.solo_light:
             self.update_solo_light(self.context)
@@ -834,10 +1110,20 @@ class RmanScene(object):
         new_objs = []
         new_cams = []
         self.bl_scene = depsgraph.scene_eval
+        # groups, light links or metaballs may have been edited
+        self.light_links = None
+        self.meta_families = None
+        # objects can only be added or removed through their collections
+        ids_changed = False
+        stale_keys = set()
         for obj in depsgraph.updates:
             ob = obj.id
 
-            if isinstance(obj.id, bpy.types.Scene):
+            if isinstance(obj.id, bpy.types.Collection):
+                ids_changed = True
+
+            elif isinstance(obj.id, bpy.types.Scene):
+                ids_changed = True
                 if self.bl_frame_current != self.bl_scene.frame_current:
                     # frame changed, update any materials and lights that 
                     # are marked as frame sensitive
@@ -875,23 +1161,14 @@ class RmanScene(object):
                     if not rman_sg_material:
                         rman_sg_material = translator.export(mat, db_name)
                         self.rman_materials[db_name] = rman_sg_material
-                        # Not sure of a better method to do this.
-                        # There doesn't seem to be an API call to know what objects in the scene
-                        # have this specific material, so we loop thru all objs
-                        for ob_inst in self.depsgraph.object_instances:
-                            if ob_inst.is_instance:
-                                ob = ob_inst.instance_object.original
-                                group_db_name = "%s|%s|%d" % (parent.name_full, ob.name_full, ob_inst.persistent_id[0])
-                            else:
-                                ob = ob_inst.object
-                                group_db_name = "%s" % (ob.name_full)
-                            rman_type = object_utils._detect_primitive_(ob)
-                            obj_db_name = object_utils.get_db_name(ob, rman_type=rman_type)
+                        # rebind the instances that were waiting on this material
+                        for obj_db_name, group_db_name in self.material_instances.get(db_name, set()):
                             rman_sg_node = self.rman_objects.get(obj_db_name, None)
-                            if rman_sg_node:
-                                for m in object_utils._get_used_materials_(ob):
-                                    if m == mat:
-                                        rman_sg_node.instances[group_db_name].SetMaterial(rman_sg_material.sg_node)
+                            if not rman_sg_node:
+                                continue
+                            group = rman_sg_node.instances.get(group_db_name, None)
+                            if group:
+                                group.SetMaterial(rman_sg_material.sg_node)
 
                     else:
                         translator.update(mat, rman_sg_material)
@@ -900,9 +1177,20 @@ class RmanScene(object):
                 rman_type = object_utils._detect_primitive_(ob)
                 obj_key = object_utils.get_db_name(ob, rman_type=rman_type)                                
 
+                old_key = self.scene_objects.get(ob.name_full, None)
+                if old_key != obj_key:
+                    # new object, or its type changed
+                    if old_key:
+                        stale_keys.add(old_key)
+                    self.scene_objects[ob.name_full] = obj_key
+
                 if obj_key == "":
                     continue
 
+                if rman_type == 'LIGHT' and ob.data.renderman.renderman_type == 'FILTER':
+                    self.update_light_filter(ob, obj.is_updated_transform, obj.is_updated_geometry)
+                    continue
+
                 if obj_key not in self.rman_objects:
                     if ob.type == 'CAMERA' and not self.is_viewport_render:
                         new_cams.append(obj.id)
@@ -919,18 +1207,7 @@ class RmanScene(object):
                                     self.rman_translators['GROUP'].update_transform(ob, rman_sg_node)
                             else:                              
                                 # duplis case
-                                # loop thru all instances and compare the parent
-                                for ob_inst in self.depsgraph.object_instances:                                
-                                    if ob_inst.is_instance:
-                                        parent = ob_inst.parent   
-                                        if (ob == parent):     
-                                            group_db_name = "%s|%s|%d" % (parent.name_full, ob_inst.instance_object.original.name_full, ob_inst.persistent_id[0])
-
-                                            obinst_ob = ob_inst.instance_object.original
-                                            rman_type = object_utils._detect_primitive_(obinst_ob)
-                                            obj_db_name = object_utils.get_db_name(obinst_ob, rman_type=rman_type)
-                                            group = self.rman_objects[obj_db_name].instances[group_db_name]
-                                            group.SetTransform( transform_utils.convert_matrix(ob_inst.matrix_world.copy()))
+                                self.update_instancer_transforms(ob, refresh=obj.is_updated_geometry)
                         else:
                             group_db_name = "%s" % (ob.name_full)
                             rman_sg_node = self.rman_objects.get(obj_key, None)
@@ -944,6 +1221,9 @@ class RmanScene(object):
 
                 elif obj.is_updated_geometry:
                     with self.rman.SGManager.ScopedEdit(self.sg_scene):
+                        if obj.id.is_instancer and obj.id.type != 'EMPTY':
+                            # vertices or faces moved, the instances moved with them
+                            self.update_instancer_transforms(ob, refresh=True)
                         rman_sg_node = self.rman_objects[obj_key]
                         rman_type = object_utils._detect_primitive_(ob)
                         if rman_type == 'LIGHT':
@@ -958,14 +1238,9 @@ class RmanScene(object):
                                 continue
                             translator.update(ob, rman_sg_node)
                             group_db_name = "%s" % (ob.name_full)
-
-                            for mat in object_utils._get_used_materials_(ob): 
-                                if not mat:
-                                    continue
-                                mat_db_name = object_utils.get_db_name(mat)
-                                rman_sg_material = self.rman_materials.get(mat_db_name, None)
-                                if rman_sg_material:
-                                    rman_sg_node.instances[group_db_name].SetMaterial(rman_sg_material.sg_node)
+                            group = rman_sg_node.instances.get(group_db_name, None)
+                            if group:
+                                self.attach_material(ob, group, rman_sg_node, group_db_name)
 
                             if rman_type in ['POLYGON_MESH', 'SUBDIVISION_MESH', 'POINTS']:
                                 for psys in ob.particle_systems:
@@ -1001,18 +1276,71 @@ class RmanScene(object):
                 rfb_log().debug("Adding new cameras:")
                 self.export_cameras(new_cams)         
 
-        # now check for deleted objects        
-        scene_objects = ['%s' % object_utils.get_db_name(x, rman_type=object_utils._detect_primitive_(x)) for x in self.depsgraph.ids if isinstance(x, bpy.types.Object)]
+        # now check for deleted objects
+        if ids_changed or new_objs or new_cams or stale_keys:
+            self._delete_removed_objects_(stale_keys)
+
+    def _build_scene_objects_(self):
+        self.scene_objects = dict()
+        for ob in self.depsgraph.ids:
+            if isinstance(ob, bpy.types.Object):
+                self.scene_objects[ob.name_full] = object_utils.get_db_name(ob, rman_type=object_utils._detect_primitive_(ob))
+
+    def _delete_removed_objects_(self, stale_keys):
+        current_names = set([x.name_full for x in self.depsgraph.ids if isinstance(x, bpy.types.Object)])
+        removed_names = [nm for nm in self.scene_objects if nm not in current_names]
+        if not removed_names and not stale_keys:
+            return
+
+        # instancer groups and light filters are stored under the object name
+        candidates = set(stale_keys)
+        for nm in removed_names:
+            candidates.add(self.scene_objects.pop(nm))
+            candidates.add(nm)
+
+        # light data can be shared, so only delete keys no remaining object uses
+        live_keys = set(self.scene_objects.values())
+        live_keys.update(self.scene_objects.keys())
+
         with self.rman.SGManager.ScopedEdit(self.sg_scene):
-            for obj_key in list(self.rman_objects.keys()):
-                if obj_key not in scene_objects:
-                    rman_sg_node = self.rman_objects[obj_key]
-                    rfb_log().debug("Deleting object: %s" % obj_key)
-                    for k,v in rman_sg_node.instances.items():
-                        self.sg_scene.DeleteDagNode(v)
-                    self.sg_scene.DeleteDagNode(rman_sg_node.sg_node)
-                    self.rman_objects.pop(obj_key)
+            for obj_key in candidates:
+                if obj_key in live_keys:
+                    continue
+                # a removed instancer, which may not have an RmanSgNode of its own
+                self.rman_instancers.pop(obj_key, None)
+                rman_sg_lightfilter = self.rman_light_filters.pop(obj_key, None)
+                if rman_sg_lightfilter:
+                    self._delete_light_filter_(rman_sg_lightfilter)
+                if obj_key not in self.rman_objects:
+                    continue
+                rman_sg_node = self.rman_objects[obj_key]
+                rfb_log().debug("Deleting object: %s" % obj_key)
+                for k,v in rman_sg_node.instances.items():
+                    self.sg_scene.DeleteDagNode(v)
+                self._remove_instancer_entries_(rman_sg_node.instances)
+                for group_db_name in rman_sg_node.instances.keys():
+                    self.update_material_index(rman_sg_node, group_db_name, None)
+                self.sg_scene.DeleteDagNode(rman_sg_node.sg_node)
+                self.rman_objects.pop(obj_key)
         
+    def _delete_light_filter_(self, rman_sg_lightfilter):
+        # detach a deleted light filter from the lights that were using it
+        light_translator = self.rman_translators['LIGHT']
+        for db_name, light_name in rman_sg_lightfilter.lights.items():
+            rman_sg_light = self.rman_objects.get(db_name, None)
+            light_ob = bpy.data.objects.get(light_name, None)
+            if not rman_sg_light or not light_ob:
+                continue
+            rman_sg_light.sg_node.RemoveCoordinateSystem(rman_sg_lightfilter.coordsys)
+            light_translator.update_light_filters(light_ob, rman_sg_light)
+        self.sg_scene.DeleteDagNode(rman_sg_lightfilter.coordsys)
+
+    def _remove_instancer_entries_(self, deleted_instances):
+        if not deleted_instances:
+            return
+        for instances in self.rman_instancers.values():
+            for persistent_id in [k for k,v in instances.items() if v[0] in deleted_instances]:
+                instances.pop(persistent_id)
         
     def update_cropwindow(self, cropwindow=None):
         if cropwindow:
@@ -1063,6 +1391,28 @@ class RmanScene(object):
         with self.rman.SGManager.ScopedEdit(self.sg_scene):
             translator.update(ob, rman_sg_light)            
 
+    def update_light_filter(self, ob, update_transform=True, update_params=True):
+        rman_sg_lightfilter = self.rman_light_filters.get(ob.name_full, None)
+        if not rman_sg_lightfilter:
+            # not used by any light yet
+            return
+        light_translator = self.rman_translators["LIGHT"]
+        translator = light_translator.lightfilter_translator
+        with self.rman.SGManager.ScopedEdit(self.sg_scene):
+            if update_transform:
+                # lights find the filter through its coordinate system, they
+                # don't need to be touched
+                translator.update_transform(ob, rman_sg_lightfilter)
+            if update_params:
+                translator.update(ob, rman_sg_lightfilter)
+                for db_name, light_name in list(rman_sg_lightfilter.lights.items()):
+                    rman_sg_light = self.rman_objects.get(db_name, None)
+                    light_ob = bpy.data.objects.get(light_name, None)
+                    if not rman_sg_light or not light_ob:
+                        rman_sg_lightfilter.lights.pop(db_name)
+                        continue
+                    light_translator.update_light_filters(light_ob, rman_sg_light)
+
     def update_object_prim_attrs(self, ob):
         rman_type = object_utils._detect_primitive_(ob)
         db_name = object_utils.get_db_name(ob, rman_type=rman_type)
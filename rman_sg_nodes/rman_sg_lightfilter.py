@@ -0,0 +1,31 @@
+from .rman_sg_node import RmanSgNode
+
+class RmanSgLightFilter(RmanSgNode):
+    '''
+    A light filter shader, shared by every light that uses the filter.
+
+    Attributes:
+        coordsys (RixSGGroup) - the coordinate system placing the filter in the scene
+        lights (dict) - db_names of the lights using this filter, to their object names
+    '''
+
+    def __init__(self, rman_scene, sg_node, db_name):
+        super().__init__(rman_scene, sg_node, db_name)
+        self.coordsys = None
+        self.lights = dict()
+
+    @property
+    def coordsys(self):
+        return self.__coordsys
+
+    @coordsys.setter
+    def coordsys(self, coordsys):
+        self.__coordsys = coordsys
+
+    @property
+    def lights(self):
+        return self.__lights
+
+    @lights.setter
+    def lights(self, lights):
+        self.__lights = lights
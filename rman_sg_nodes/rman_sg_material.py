@@ -1,6 +1,41 @@
 from .rman_sg_node import RmanSgNode
 
 class RmanSgMaterial(RmanSgNode):
+    '''
+    Attributes:
+        shaders (dict) - the shaders of the node network, keyed by node. Each entry is the
+                        node's parameter fingerprint and its RixSGShader list, so unchanged
+                        nodes are not translated again
+        bxdf_keys (list) - the node keys making up the current bxdf list
+        displace_keys (list) - the node keys making up the current displacement list
+    '''
 
     def __init__(self, rman_scene, sg_node, db_name):
-        super().__init__(rman_scene, sg_node, db_name)
\ No newline at end of file
+        super().__init__(rman_scene, sg_node, db_name)
+        self.shaders = dict()
+        self.bxdf_keys = []
+        self.displace_keys = []
+
+    @property
+    def shaders(self):
+        return self.__shaders
+
+    @shaders.setter
+    def shaders(self, shaders):
+        self.__shaders = shaders
+
+    @property
+    def bxdf_keys(self):
+        return self.__bxdf_keys
+
+    @bxdf_keys.setter
+    def bxdf_keys(self, bxdf_keys):
+        self.__bxdf_keys = bxdf_keys
+
+    @property
+    def displace_keys(self):
+        return self.__displace_keys
+
+    @displace_keys.setter
+    def displace_keys(self, displace_keys):
+        self.__displace_keys = displace_keys
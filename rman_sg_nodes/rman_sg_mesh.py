@@ -10,6 +10,16 @@ class RmanSgMesh(RmanSgNode):
         self.nverts = -1
         self.is_subdiv = False
 
+        # content fingerprints of the last exported mesh,
+        # used to skip re-uploading unchanged geometry during IPR
+        self.topology_fingerprint = None
+        self.points_fingerprint = None
+        self.primvars_fingerprint = None
+
+        # material slot index to the mesh (or sub mesh) its faceset is bound to,
+        # for multi-material meshes
+        self.sg_sub_meshes = dict()
+
     @property
     def matrix_world(self):
         return self.__matrix_world
@@ -48,4 +58,36 @@ class RmanSgMesh(RmanSgNode):
 
     @is_subdiv.setter
     def is_subdiv(self, is_subdiv):
-        self.__is_subdiv = is_subdiv                                 
\ No newline at end of file
+        self.__is_subdiv = is_subdiv
+
+    @property
+    def topology_fingerprint(self):
+        return self.__topology_fingerprint
+
+    @topology_fingerprint.setter
+    def topology_fingerprint(self, topology_fingerprint):
+        self.__topology_fingerprint = topology_fingerprint
+
+    @property
+    def points_fingerprint(self):
+        return self.__points_fingerprint
+
+    @points_fingerprint.setter
+    def points_fingerprint(self, points_fingerprint):
+        self.__points_fingerprint = points_fingerprint
+
+    @property
+    def primvars_fingerprint(self):
+        return self.__primvars_fingerprint
+
+    @primvars_fingerprint.setter
+    def primvars_fingerprint(self, primvars_fingerprint):
+        self.__primvars_fingerprint = primvars_fingerprint
+
+    @property
+    def sg_sub_meshes(self):
+        return self.__sg_sub_meshes
+
+    @sg_sub_meshes.setter
+    def sg_sub_meshes(self, sg_sub_meshes):
+        self.__sg_sub_meshes = sg_sub_meshes
@@ -0,0 +1,110 @@
+from ..rfb_logger import rfb_log
+
+import xml.etree.ElementTree as ET
+import os
+import pickle
+import subprocess
+import tempfile
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# bump this when the cached data changes
+ARGS_CACHE_VERSION = 1
+
+def _call_osltoargs(rmantree, oslfile, args_file):
+    process_args = []
+    process_args.append( os.path.join(rmantree, 'bin', 'osltoargs') )
+    process_args.append(oslfile)
+    process_args.append('-o')
+    process_args.append(args_file)
+    try:
+        subprocess.check_output(process_args)
+        return True
+    except:
+        return False
+
+def load_args_cache(cache_file, rmantree):
+    try:
+        with open(cache_file, 'rb') as f:
+            cache = pickle.load(f)
+    except Exception:
+        return dict()
+    if cache.get('version', None) != ARGS_CACHE_VERSION or cache.get('rmantree', None) != rmantree:
+        return dict()
+    return cache.get('entries', dict())
+
+def save_args_cache(cache_file, rmantree, entries):
+    tmp_file = '%s.%d.tmp' % (cache_file, os.getpid())
+    try:
+        with open(tmp_file, 'wb') as f:
+            pickle.dump({'version': ARGS_CACHE_VERSION, 'rmantree': rmantree, 'entries': entries}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except Exception as e:
+        rfb_log().warning("Could not write the node args cache: %s" % str(e))
+
+def parse_args_file(arg_file, rmantree):
+    f,ext = os.path.splitext(arg_file)
+    if ext == '.args':
+        return ET.parse(arg_file).getroot()
+    # this is an OSL file. Use osltoargs to convert to an args file.
+    with tempfile.TemporaryDirectory(prefix='rfb_osltoargs_') as tmp_dir:
+        osltoargs = os.path.join(tmp_dir, os.path.basename(f) + '.args')
+        _call_osltoargs(rmantree, arg_file, osltoargs)
+        return ET.parse(osltoargs).getroot()
+
+def get_args_roots(args_files, cache_file, rmantree):
+    '''
+    Return the parsed root element of each .args file, and of the args converted
+    from each .oso file. The parsed elements are cached in cache_file, keyed by path,
+    mtime and size, so only new or modified files are parsed. osltoargs is run in parallel.
+
+    Args:
+        args_files (dict) - node name to .args or .oso file path
+        cache_file (str) - path of the cache
+        rmantree (str) - the RenderMan install. The cache is dropped when it changes.
+
+    Returns:
+        (dict) - node name to its root element, in the same order as args_files
+    '''
+    cache = load_args_cache(cache_file, rmantree)
+    entries = dict()
+    to_parse = []
+
+    for name, arg_file in args_files.items():
+        try:
+            stat = os.stat(arg_file)
+        except OSError:
+            continue
+        key = (stat.st_mtime, stat.st_size)
+        entry = cache.get(arg_file, None)
+        if entry and entry[0] == key:
+            entries[arg_file] = entry
+        else:
+            to_parse.append((arg_file, key))
+
+    def _parse(item):
+        arg_file, key = item
+        try:
+            return arg_file, (key, parse_args_file(arg_file, rmantree))
+        except Exception:
+            print("Error parsing " + arg_file)
+            traceback.print_exc()
+            return arg_file, None
+
+    if to_parse:
+        rfb_log().debug("Parsing %d modified args files" % len(to_parse))
+        with ThreadPoolExecutor(max_workers=max(1, os.cpu_count() or 1)) as executor:
+            for arg_file, entry in executor.map(_parse, to_parse):
+                if entry:
+                    entries[arg_file] = entry
+
+    if to_parse or len(entries) != len(cache):
+        save_args_cache(cache_file, rmantree, entries)
+
+    roots = dict()
+    for name, arg_file in args_files.items():
+        entry = entries.get(arg_file, None)
+        if entry:
+            roots[name] = entry[1]
+    return roots
@@ -0,0 +1,104 @@
+class LightLinkResolver(object):
+    '''
+    Tables for the grouping and light linking attributes of objects, built once
+    from the scene settings so that each instance is resolved with a few lookups.
+
+    Light links are named "lg_<light|group>>LIGHT>obj_<object|group>>OBJECT".
+    They are indexed by their object (or object group), and what each link
+    excludes or enables is resolved the first time it is needed.
+
+    Attributes:
+        bl_scene (bpy.types.Scene) - the Blender scene
+        object_groups (dict) - object name to the names of the object groups it belongs to
+        links (dict) - (obj_object|obj_group, name) to the light links that target it
+        scene_lights (list) - names of all lights in the scene
+        used_filters (set) - names of the light filters used by at least one light
+        link_subsets (dict) - light link name to its (exclude subset, light filter subset)
+    '''
+
+    def __init__(self, bl_scene):
+        self.bl_scene = bl_scene
+        rm = bl_scene.renderman
+
+        self.object_groups = dict()
+        for obj_group in rm.object_groups:
+            for member in obj_group.members.keys():
+                self.object_groups.setdefault(member, []).append(obj_group.name)
+
+        self.links = dict()
+        for ll in rm.ll:
+            strs = ll.name.split('>')
+            if len(strs) < 4:
+                continue
+            self.links.setdefault((strs[2], '>'.join(strs[3:])), []).append(ll)
+
+        self.scene_lights = []
+        self.used_filters = set()
+        for ob in bl_scene.objects:
+            if ob.type != 'LIGHT':
+                continue
+            self.scene_lights.append(ob.name)
+            self.used_filters.update(ob.data.renderman.light_filters.keys())
+
+        self.link_subsets = dict()
+
+    def get_groups(self, ob):
+        '''
+        Returns:
+            (list) - names of the object groups ob belongs to
+        '''
+        return self.object_groups.get(ob.name, [])
+
+    def _resolve_link_(self, link):
+        subsets = self.link_subsets.get(link.name, None)
+        if subsets is not None:
+            return subsets
+
+        exclude_subset = []
+        lightfilter_subset = []
+        if link.illuminate != 'DEFAULT':
+            strs = link.name.split('>')
+            rm = self.bl_scene.renderman
+            if strs[0] == 'lg_light':
+                light_names = [strs[1]]
+            elif strs[1] == 'All':
+                light_names = self.scene_lights
+            elif strs[1] in rm.light_groups:
+                light_names = rm.light_groups[strs[1]].members.keys()
+            else:
+                light_names = []
+
+            for light_name in light_names:
+                light_ob = self.bl_scene.objects.get(light_name, None)
+                if light_ob is None:
+                    continue
+                if light_ob.data.renderman.renderman_type == 'FILTER':
+                    # enable the filter, if it's used by a light
+                    if link.illuminate == 'ON' and light_name in self.used_filters:
+                        lightfilter_subset.append(light_name)
+                elif link.illuminate != 'ON':
+                    exclude_subset.append(light_name)
+
+        subsets = (exclude_subset, lightfilter_subset)
+        self.link_subsets[link.name] = subsets
+        return subsets
+
+    def get_subsets(self, ob):
+        '''
+        Get the lights excluded, and the light filters enabled, by the light links
+        of ob and of the object groups it belongs to.
+
+        Returns:
+            (list, list) - the exclude subset and the light filter subset
+        '''
+        lls = list(self.links.get(('obj_object', ob.name), []))
+        for group_name in self.get_groups(ob):
+            lls.extend(self.links.get(('obj_group', group_name), []))
+
+        exclude_subset = []
+        lightfilter_subset = []
+        for link in lls:
+            excludes, filters = self._resolve_link_(link)
+            exclude_subset.extend(excludes)
+            lightfilter_subset.extend(filters)
+        return exclude_subset, lightfilter_subset
@@ -1,4 +1,5 @@
 import bpy
+import numpy as np
 
 def get_db_name(ob, rman_type=''):
     db_name = ''    
@@ -39,6 +40,24 @@ def get_db_name(ob, rman_type=''):
 def get_meta_family(ob):
     return ob.name.split('.')[0]
 
+def get_meta_families():
+    '''
+    Index all metaballs by family. Maps each family name to the list of
+    (metaball data, owner object) pairs in it.
+    '''
+    owners = dict()
+    for ob in bpy.data.objects:
+        if ob.type == 'META' and ob.data.name_full not in owners:
+            owners[ob.data.name_full] = ob
+
+    families = dict()
+    for mball in bpy.data.metaballs:
+        parent = owners.get(mball.name_full, None)
+        if parent is None:
+            continue
+        families.setdefault(get_meta_family(parent), []).append((mball, parent))
+    return families
+
 def is_subd_last(ob):
     return ob.modifiers and \
         ob.modifiers[len(ob.modifiers) - 1].type == 'SUBSURF'
@@ -129,38 +148,169 @@ def _get_used_materials_(ob):
     if ob.type == 'MESH' and len(ob.data.materials) > 0:
         if len(ob.data.materials) == 1:
             return [ob.data.materials[0]]
-        mat_ids = []
         mesh = ob.data
-        num_materials = len(ob.data.materials)
-        for p in mesh.polygons:
-            if p.material_index not in mat_ids:
-                mat_ids.append(p.material_index)
-            if num_materials == len(mat_ids):
-                break
-        return [mesh.materials[i] for i in mat_ids]
+        material_ids = np.zeros(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get('material_index', material_ids)
+        mat_ids = np.unique(material_ids).tolist()
+        return [mesh.materials[i] for i in mat_ids if i < len(mesh.materials)]
     else:
         return [ob.active_material]     
 
+def _get_mesh_points_(mesh):
+    # return all of the points on the mesh as a flat float32 buffer
+    nvertices = len(mesh.vertices)
+    P = np.zeros(nvertices*3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', P)
+    return P
+
 def _get_mesh_(mesh, get_normals=False):
-    nverts = []
-    verts = []
-    P = []
-    N = []
-
-    for v in mesh.vertices:
-        P.extend(v.co)
-
-    for p in mesh.polygons:
-        nverts.append(p.loop_total)
-        verts.extend(p.vertices)
-        if get_normals:
-            if p.use_smooth:
-                for vi in p.vertices:
-                    N.extend(mesh.vertices[vi].normal)
-            else:
-                N.extend(list(p.normal) * p.loop_total)
+    '''
+    Bulk extract the topology, points and (optionally) normals of a mesh.
+
+    Everything is read with foreach_get into flat numpy buffers, so there are no
+    per-vertex or per-polygon Python objects involved. Normals are the split (loop) normals,
+    which gives vertex normals for smooth faces and the face normal for flat faces.
+
+    Returns:
+        (nverts, verts, P, N) - int32, int32, float32 and float32 numpy arrays. N is empty
+                                if get_normals is False.
+    '''
+    npolygons = len(mesh.polygons)
+    nloops = len(mesh.loops)
+
+    nverts = np.zeros(npolygons, dtype=np.int32)
+    mesh.polygons.foreach_get('loop_total', nverts)
+
+    verts = np.zeros(nloops, dtype=np.int32)
+    mesh.loops.foreach_get('vertex_index', verts)
+
+    P = _get_mesh_points_(mesh)
+    N = np.zeros(0, dtype=np.float32)
 
-    if len(verts) > 0:
-        P = P[:int(max(verts) + 1) * 3]
+    if get_normals and nloops > 0:
+        mesh.calc_normals_split()
+        N = np.zeros(nloops*3, dtype=np.float32)
+        mesh.loops.foreach_get('normal', N)
+
+    if nloops > 0:
+        P = P[:(int(verts.max()) + 1) * 3]
     # return the P's minus any unconnected
-    return (nverts, verts, P, N)      
\ No newline at end of file
+    return (nverts, verts, P, N)
+
+
+# requires facevertex interpolation
+def _get_mesh_uv_(mesh, name="", flipvmode='NONE'):
+    if not name:
+        uv_loop_layer = mesh.uv_layers.active
+    else:
+        uv_loop_layer = mesh.uv_layers.get(name, None)
+
+    if uv_loop_layer is None:
+        return None
+
+    uvs = np.zeros(len(uv_loop_layer.data)*2, dtype=np.float32)
+    uv_loop_layer.data.foreach_get('uv', uvs)
+
+    # renderman expects UVs flipped vertically from blender
+    # best to do this in pattern, provided here as additional option
+    v = uvs[1::2]
+    if flipvmode == 'UV':
+        uvs[1::2] = 1.0 - v
+    elif flipvmode == 'TILE':
+        uvs[1::2] = np.ceil(v) - v + np.floor(v)
+
+    return uvs
+
+# requires facevertex interpolation
+def _get_mesh_vcol_(mesh, name=""):
+    vcol_layer = mesh.vertex_colors[name] if name != "" \
+        else mesh.vertex_colors.active
+
+    if vcol_layer is None:
+        return None
+
+    # vertex colors are RGBA, drop the alpha
+    cols = np.zeros(len(vcol_layer.data)*4, dtype=np.float32)
+    vcol_layer.data.foreach_get('color', cols)
+
+    return cols.reshape(-1, 4)[:, :3]
+
+def _get_mesh_vgroup_weights_(mesh):
+    # gather every (vertex, group, weight) assignment on the mesh in one pass.
+    # Blender only stores the groups a vertex belongs to, so this is sparse.
+    # This has to stay a Python loop: the weights live in variable length
+    # MeshVertex.groups collections, and Blender has no bulk accessor for them
+    # (foreach_get only reads fixed size properties).
+    assignments = [(v.index, g.group, g.weight) for v in mesh.vertices for g in v.groups]
+    if not assignments:
+        return (np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32))
+    vidx, gidx, weights = zip(*assignments)
+    return (np.array(vidx, dtype=np.int32), np.array(gidx, dtype=np.int32), np.array(weights, dtype=np.float32))
+
+# requires per-vertex interpolation
+def _get_mesh_vgroup_(ob, mesh, name="", vgroup_weights=None):
+    vgroup = ob.vertex_groups[name] if name != "" else ob.vertex_groups.active
+
+    if vgroup is None:
+        return None
+
+    if vgroup_weights is None:
+        vgroup_weights = _get_mesh_vgroup_weights_(mesh)
+    (vidx, gidx, w) = vgroup_weights
+
+    # scatter the sparse assignments into a dense per-vertex array,
+    # vertices not in the group get a weight of 0
+    weights = np.zeros(len(mesh.vertices), dtype=np.float32)
+    in_group = (gidx == vgroup.index)
+    weights[vidx[in_group]] = w[in_group]
+
+    return weights
+
+def _get_mesh_primvars_(ob, mesh):
+    '''
+    Extract the UV, vertex color and vertex group primvars requested on the mesh
+    data's RenderMan settings. Each layer is read with a single buffer copy, and vertex
+    group assignments are only gathered once no matter how many groups are exported.
+
+    Returns:
+        (list) - of (primvar_type, name, values) tuples, where primvar_type is one of
+                 'UV', 'COLOR' or 'VERTEX_GROUP' and values is a numpy array
+    '''
+    rm = ob.data.renderman
+    primvars = []
+    vgroup_weights = None
+
+    flipvmode = 'NONE'
+    if hasattr(rm, 'export_flipv'):
+        flipvmode = rm.export_flipv
+
+    if rm.export_default_uv:
+        uvs = _get_mesh_uv_(mesh, flipvmode=flipvmode)
+        if uvs is not None and len(uvs) > 0:
+            primvars.append(('UV', 'st', uvs))
+
+    if rm.export_default_vcol:
+        vcols = _get_mesh_vcol_(mesh)
+        if vcols is not None and len(vcols) > 0:
+            primvars.append(('COLOR', 'Cs', vcols))
+
+    # custom prim vars
+    for p in rm.prim_vars:
+        if p.data_source == 'VERTEX_COLOR':
+            vcols = _get_mesh_vcol_(mesh, p.data_name)
+            if vcols is not None and len(vcols) > 0:
+                primvars.append(('COLOR', p.name, vcols))
+
+        elif p.data_source == 'UV_TEXTURE':
+            uvs = _get_mesh_uv_(mesh, p.data_name, flipvmode=flipvmode)
+            if uvs is not None and len(uvs) > 0:
+                primvars.append(('UV', p.name, uvs))
+
+        elif p.data_source == 'VERTEX_GROUP':
+            if vgroup_weights is None:
+                vgroup_weights = _get_mesh_vgroup_weights_(mesh)
+            weights = _get_mesh_vgroup_(ob, mesh, p.data_name, vgroup_weights=vgroup_weights)
+            if weights is not None and len(weights) > 0:
+                primvars.append(('VERTEX_GROUP', p.name, weights))
+
+    return primvars
@@ -3,6 +3,7 @@ import re
 import time
 import os
 import datetime
+import functools
 from collections import OrderedDict
 from ..rfb_logger import rfb_log
 from . import prefs_utils
@@ -74,6 +75,15 @@ PARSING_EXPR = re.compile(r'{([\w\:]*[\w\.]+)(\?[\w\d\._-]+)*'  # token
                           r'(:[^}]+)*}|'                        # formatter
                           r'\$\{?([A-Z0-9_]{3,})\}?')           # env var
 
+FILEPATH_COLON_EXPR = re.compile(r'((?<!^[A-Z])(?<!^[ ][A-Z]))\:')
+
+# parsed expressions, see _compile_template_()
+TEMPLATE_TOKEN = 0
+TEMPLATE_ENV = 1
+# number of parsed expressions kept. Expressions are usually expanded with
+# the same few templates, but per-frame or per-object strings are not.
+TEMPLATE_CACHE_SIZE = 1024
+
 
 class StringExpression(object):
 
@@ -133,6 +143,21 @@ class StringExpression(object):
         self.tokens['F3'] = '{:0>3d}'.format(iframe)
         self.tokens['F4'] = '{:0>4d}'.format(iframe)        
 
+    def _lookup_token_(self, toks, tok, default=None):
+        try:
+            return toks[tok]
+        except KeyError:
+            pass
+        try:
+            # forced lower-case version if first attempts failed.
+            return toks[tok.lower()]
+        except KeyError:
+            pass
+        # the token REALLY doesn't exist. There are no node attributes to
+        # look up in Blender, so use the default value if one was given
+        # (ex: '{layer?main}'), or an empty string.
+        return default if default is not None else ''
+
     # @time_this
     def expand(self, expr, objTokens={}, asFilePath=False):
         """handle the '<token>' format"""
@@ -141,114 +166,83 @@ class StringExpression(object):
         if '{' not in expr and '$' not in expr:
             return expr
 
-        toks = dict(self.tokens)
-        toks.update(objTokens)
-        # print toks
-        pos = 0
-        result = ''
-        for m in re.finditer(PARSING_EXPR, expr):
-            # print 'GROUPS: %s' % str(m.groups())
-            if m.group(1):
-                # Token case
-                tok = m.group(1)
-                tok_val = None
-                # print '  |__ TOKEN: %02d-%02d: %s' % (m.start(), m.end(), tok)
-                try:
-                    tok_val = toks[tok]
-                    # result += expr[pos:m.start()] + toks[tok]
-                except KeyError:
+        if objTokens:
+            toks = dict(self.tokens)
+            toks.update(objTokens)
+        else:
+            toks = self.tokens
+
+        result = []
+        for part in _compile_template_(expr):
+            if part.__class__ is str:
+                result.append(part)
+                continue
+            kind, tok, default, fmt, match = part
+            if kind == TEMPLATE_ENV:
+                result.append(os.environ.get(tok, match))
+                continue
+
+            tok_val = self._lookup_token_(toks, tok, default)
+            # optional formating
+            if fmt:
+                if isinstance(tok_val, str) and tok_val:
                     try:
-                        # forced lower-case version if first attempts failed.
-                        tok_val = toks[tok.lower()]
-                    except KeyError:
-                        # the token REALLY doesn't exist...
-                        try:
-                            # if it contains 'shape.' it may be a getAttr for an
-                            # attribute on the current shape.
-                            tok = tok.replace('shape.', '%s.' % toks['shape'])
-                        except KeyError:
-                            pass
-                        try:
-                            # if it contains 'shapepath.' it may be a getAttr for an
-                            # attribute on the current shape.
-                            tok = tok.replace('shapepath.', '%s.' % toks['shapepath'])
-                        except KeyError:
-                            pass
-                        try:
-                            # could be a getAttr node.attr ?
-                            tok_val = '' #mc.getAttr(tok)
-                        except ValueError as err:
-                            # the node or attribute desn't exist.
-                            if m.group(2):
-                                # a default value has been provided
-                                tok_val = m.group(2)[1:]
-                            else:
-                                # the node or/and attribute doesn't exist, pass
-                                # un-substituted: that's better for debugging.
-                                rfb_log().debug('%s  (maya plug = %r)', err, tok)
-                                tok_val = m.group(0)
-                        except TypeError as err:
-                            # invalid plug string, just append it. Tokens like
-                            # <udim> will be substituted by the renderer.
-                            tok_val = m.group(0)
-                            rfb_log().debug('%s  (maya plug = %r)', err, tok)
-                            # print '   un-processed token: %s' % m.group(0)
-                        else:
-                            pass 
-                            # getAttr(tok) succeeded: store the result
-                            """
-                            if mc.getAttr(tok, mi=True) is None:
-                                if mc.getAttr(tok, type=True) == 'float3':
-                                    # maya returns [(x, x, x)] and we just want (x, x, x)
-                                    tok_val = tok_val[0]
-                            else:
-                                rfb_log().warning('Array attribute lookups are '
-                                                  'not supported ! (%s)', tok)
-                                continue
-                            """
-                # optional formating
-                if m.group(3):
-                    if isinstance(tok_val, basestring) and tok_val:
-                        try:
-                            tok_val = eval(tok_val)
-                        except (NameError, SyntaxError, TypeError) as err:
-                            rfb_log().debug('Eval failed: %s  -> %r', err, tok_val)
-                            result += expr[pos:m.start()] +  tok_val
-                        else:
-                            result += expr[pos:m.start()] +  m.group(3)[1:] % tok_val
+                        tok_val = eval(tok_val)
+                    except (NameError, SyntaxError, TypeError) as err:
+                        rfb_log().debug('Eval failed: %s  -> %r', err, tok_val)
+                        result.append(tok_val)
                     else:
-                        result += expr[pos:m.start()] +  m.group(3)[1:] % tok_val
+                        result.append(fmt % tok_val)
                 else:
-                    result += '%s%s' % (expr[pos:m.start()], tok_val)
+                    result.append(fmt % tok_val)
             else:
-                # Environment variable case
-                tok = m.group(4)
-                # print '  |__ ENV VAR: %02d-%02d: %s' % (m.start(), m.end(), tok)
-                try:
-                    result += expr[pos: m.start()] + os.environ[tok]
-                except KeyError:
-                    result += expr[pos: m.start()] + m.group(0)
-
-            pos = m.end()
-        # append the end of the string. If no match (despite the presence of
-        # a < or $), sets result to the original expression.
-        result += expr[pos:]
-
-        
+                result.append('%s' % tok_val)
+        result = ''.join(result)
+
         if asFilePath:
             # If this is meant to be a file path, substitute : with _
             # Can not have ':' after the drive descriptor on windows. Allow
             # for a leading space before the drive letter
-            result = re.sub(r'((?<!^[A-Z])(?<!^[ ][A-Z]))\:', '_', result)
+            result = FILEPATH_COLON_EXPR.sub('_', result)
             result = result.replace(' ', '_')
 
+            # the directory may have been deleted since the last expansion,
+            # so don't remember which ones were created
             dirname = os.path.dirname(result)
-            if not os.path.exists(dirname):
+            if dirname:
                 os.makedirs(dirname, exist_ok=True)
     
         return result
 
 
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _compile_template_(expr):
+    """Parse an expression into a tuple of literal strings and
+    (kind, token, default, format, match) tuples. The most recently used
+    templates are cached, so common expressions are only parsed once."""
+    template = []
+    pos = 0
+    for m in PARSING_EXPR.finditer(expr):
+        if m.start() > pos:
+            template.append(expr[pos:m.start()])
+        if m.group(1):
+            # Token case
+            template.append((TEMPLATE_TOKEN, m.group(1),
+                             m.group(2)[1:] if m.group(2) else None,
+                             m.group(3)[1:] if m.group(3) else None,
+                             m.group(0)))
+        else:
+            # Environment variable case
+            template.append((TEMPLATE_ENV, m.group(4), None, None, m.group(0)))
+        pos = m.end()
+    # append the end of the string. If no match (despite the presence of
+    # a < or $), the template is just the original expression.
+    if pos < len(expr):
+        template.append(expr[pos:])
+
+    return tuple(template)
+
+
 def fixup_file_name(inputNm):
     result = inputNm
     # replace repeated underscores with one underscore
@@ -23,8 +23,15 @@ class RfBTxManager(object):
                                                   asFilePath=True)
         self.txmanager = txcore.TxManager(host_token_resolver_func=self.host_token_resolver_func, 
                                         fallback_path=fallback_path,
-                                        host_tex_done_func=self.done_callback)
+                                        host_tex_done_func=self.done_callback,
+                                        host_priority_func=self.priority_callback,
+                                        host_prefs_func=self.host_prefs_func)
         self.rman_scene = None
+        # (material/node group/light name, node name) of the textures in the current render
+        self.priority_nodes = set()
+        # texture id to the names of the materials, node groups or lights it was added for.
+        # Texture ids are only 'node.param', so the same id can come from several of them.
+        self.texture_owners = dict()
 
     @property
     def rman_scene(self):
@@ -34,6 +41,17 @@ class RfBTxManager(object):
     def rman_scene(self, rman_scene):
         self.__rman_scene = rman_scene            
 
+    def host_prefs_func(self):
+        # the texture cache settings are read before each txmake_all(), so
+        # changing them doesn't need a restart
+        addon_prefs = prefs_utils.get_addon_prefs()
+        cache_path = None
+        if addon_prefs.path_texture_cache != '':
+            cache_path = string_utils.expand_string(addon_prefs.path_texture_cache, 
+                                                    asFilePath=True)
+        return dict(cache_path=cache_path,
+                    cache_max_size=addon_prefs.texture_cache_size * 1024 ** 3)
+
     def host_token_resolver_func(self, outpath):
         if self.rman_scene:
             outpath = string_utils.expand_string(outpath, frame=self.rman_scene.bl_frame_current, asFilePath=True)
@@ -41,6 +59,47 @@ class RfBTxManager(object):
             outpath = string_utils.expand_string(outpath, asFilePath=True)
         return outpath
 
+    def _get_node_names_(self, owner, nt, node_names):
+        for node in nt.nodes:
+            node_names.add((owner, node.name))
+            if node.bl_idname == 'ShaderNodeGroup' and node.node_tree:
+                self._get_node_names_(node.node_tree.name, node.node_tree, node_names)
+
+    def _build_priority_nodes_(self):
+        # (owner, node name) of the lights, and of the nodes of the materials,
+        # in the current render. Built from the depsgraph, as the material
+        # instances aren't exported yet when txmake_all() is called.
+        self.priority_nodes = set()
+        if not self.rman_scene or not self.rman_scene.depsgraph:
+            return
+        try:
+            for id in self.rman_scene.depsgraph.ids:
+                if isinstance(id, bpy.types.Material):
+                    if id.node_tree:
+                        self._get_node_names_(id.name, id.node_tree, self.priority_nodes)
+                elif isinstance(id, bpy.types.Light):
+                    # light texture ids use the light name as the node name
+                    self.priority_nodes.add((id.name, id.name))
+        except ReferenceError:
+            # the depsgraph of a finished render
+            self.priority_nodes = set()
+
+    def priority_callback(self, node_ids):
+        # textures used by lights and by materials assigned to
+        # objects in the current render are converted first
+        for nodeID in node_ids:
+            node_name = nodeID.rsplit('.', 1)[0]
+            for owner in self.texture_owners.get(nodeID, []):
+                if (owner, node_name) in self.priority_nodes:
+                    return 1
+        return 0
+
+    def add_texture(self, owner, nodeID, input_image, **kwargs):
+        # add a texture to the txmanager, and remember which material, node group
+        # or light it was added for
+        self.texture_owners.setdefault(nodeID, set()).add(owner)
+        return self.txmanager.add_texture(nodeID, input_image, **kwargs)
+
     def done_callback(self, nodeID, txfile):
         for item in bpy.context.scene.rman_txmgr_list:
             if item.nodeID == nodeID:
@@ -79,6 +138,7 @@ class RfBTxManager(object):
         return self.txmanager.get_txfile_from_path(filepath)                
 
     def txmake_all(self, blocking=True):
+        self._build_priority_nodes_()
         self.txmanager.txmake_all(start_queue=True, blocking=blocking)                     
 
 def get_txmanager():
@@ -87,7 +147,21 @@ def get_txmanager():
         __RFB_TXMANAGER__ = RfBTxManager()
     return __RFB_TXMANAGER__    
 
-def update_texture(node, light=None):
+def _get_texture_owner_(node, light=None):
+    # name of the material, node group, light or world node belongs to
+    if light is not None:
+        return light.name
+    id_data = node.id_data
+    if isinstance(id_data, bpy.types.NodeTree) and bpy.data.node_groups.get(id_data.name) != id_data:
+        # the node tree of a material
+        for mat in bpy.data.materials:
+            if mat.node_tree == id_data:
+                return mat.name
+    return id_data.name
+
+def update_texture(node, light=None, owner=None):
+    if owner is None:
+        owner = _get_texture_owner_(node, light=light)
     if hasattr(node, 'bl_idname'):
         if node.bl_idname == "PxrPtexturePatternNode":
             return
@@ -97,13 +171,13 @@ def update_texture(node, light=None):
                     prop = input.default_value
                     nodeID = '%s.%s' % (node.name, input_name)
                     real_file = filepath_utils.get_real_path(prop)
-                    get_txmanager().txmanager.add_texture(nodeID, real_file)    
+                    get_txmanager().add_texture(owner, nodeID, real_file)    
                     bpy.ops.rman_txmgr_list.add_texture('EXEC_DEFAULT', filepath=real_file)                                                      
             return
         elif node.bl_idname == 'ShaderNodeGroup':
             nt = node.node_tree
             for node in nt.nodes:
-                update_texture(node, light=light)
+                update_texture(node, light=light, owner=nt.name)
             return
 
     if hasattr(node, 'prop_meta'):
@@ -129,7 +203,7 @@ def update_texture(node, light=None):
                         if node_name != '':       
                             nodeID = '%s.%s' %  (node_name, prop_name)
                             real_file = filepath_utils.get_real_path(prop)
-                            txfile = get_txmanager().txmanager.add_texture(nodeID, real_file, nodetype=node_type)    
+                            txfile = get_txmanager().add_texture(owner, nodeID, real_file, nodetype=node_type)    
                             bpy.ops.rman_txmgr_list.add_texture('EXEC_DEFAULT', filepath=real_file, nodeID=nodeID)
                             txmake_all(blocking=False)
                             get_txmanager().done_callback(nodeID, txfile)
@@ -149,7 +223,7 @@ def get_textures(id):
 
     nt = id.node_tree
     for node in nt.nodes:
-        update_texture(node)
+        update_texture(node, owner=id.name)
 
 def recursive_texture_set(ob):
     mat_set = []
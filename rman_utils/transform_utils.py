@@ -1,6 +1,9 @@
 import rman
+import numpy as np
 
 def convert_matrix(m):
+    if isinstance(m, np.ndarray) and m.ndim == 3:
+        return convert_matrices(m)
     v = [m[0][0], m[1][0], m[2][0], m[3][0],
         m[0][1], m[1][1], m[2][1], m[3][1],
         m[0][2], m[1][2], m[2][2], m[3][2],
@@ -8,6 +11,11 @@ def convert_matrix(m):
 
     return v    
 
+def convert_matrices(mtxs):
+    # batch version of convert_matrix. Takes an (N, 4, 4) array
+    # of Blender (row major) matrices and returns a list of N RenderMan matrices
+    return np.asarray(mtxs).transpose(0, 2, 1).reshape(-1, 16).tolist()
+
 def convert_matrix4x4(m):
     mtx = convert_matrix( m )
     rman_mtx = rman.Types.RtMatrix4x4( mtx[0],mtx[1],mtx[2],mtx[3],
@@ -21,17 +29,17 @@ def convert_ob_bounds(ob_bb):
     return (ob_bb[0][0], ob_bb[7][0], ob_bb[0][1],
             ob_bb[7][1], ob_bb[0][2], ob_bb[1][2])    
 
-def transform_points(transform_mtx, P):
-    transform_pts = []
-    mtx = convert_matrix( transform_mtx )
-    m = rman.Types.RtMatrix4x4( mtx[0],mtx[1],mtx[2],mtx[3],
-                                mtx[4],mtx[5],mtx[6],mtx[7],
-                                mtx[8],mtx[9],mtx[10],mtx[11],
-                                mtx[12],mtx[13],mtx[14],mtx[15])
-    for i in range(0, len(P), 3):
-        pt = m.pTransform( rman.Types.RtFloat3(P[i], P[i+1], P[i+2]) )
-        transform_pts.append(pt.x)
-        transform_pts.append(pt.y)
-        transform_pts.append(pt.z)
+def transform_points_array(transform_mtx, P):
+    # transform N points in one go. P can be a flat buffer of floats
+    # or an (N, 3) array. Returns an (N, 3) float32 array.
+    m = np.asarray(transform_mtx, dtype=np.float64)
+    P = np.asarray(P, dtype=np.float64).reshape(-1, 3)
+    pts = P @ m[:3, :3].T + m[:3, 3]
+    # same as pTransform, divide by w for non-affine matrices
+    w = P @ m[3, :3] + m[3, 3]
+    if not np.all(w == 1.0):
+        pts /= w[:, np.newaxis]
+    return pts.astype(np.float32)
 
-    return transform_pts 
\ No newline at end of file
+def transform_points(transform_mtx, P):
+    return transform_points_array(transform_mtx, P).ravel().tolist()
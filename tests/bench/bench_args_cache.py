@@ -0,0 +1,96 @@
+'''
+Benchmark of the node args cache in rman_utils.args_cache_utils.
+
+Times get_args_roots with no cache (every file is parsed, like a first
+startup), with a warm cache (a single pickle is loaded) and after one file
+was modified, against parsing every file with ElementTree like startup
+used to. The cache is written to a temporary directory.
+
+The .args files come from the directories given on the command line, or from
+$RMANTREE/lib/plugins, $RMANTREE/lib/shaders and the add-on's Args directory.
+.oso files are only included when RMANTREE is set, since they are converted
+with osltoargs.
+
+    python tests/bench/bench_args_cache.py [dir ...]
+'''
+
+import os
+import sys
+import shutil
+import tempfile
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import bench_env
+
+args_cache_utils = bench_env.import_module('rman_utils.args_cache_utils')
+
+def _find_args_files_(paths, rmantree):
+    # same lookup as util.args_files_in_path
+    exts = ('.args', '.oso') if rmantree else ('.args',)
+    args = {}
+    for path in paths:
+        for root, dirnames, filenames in os.walk(path):
+            for filename in filenames:
+                if filename.endswith(exts):
+                    args[filename.split('.')[0]] = os.path.join(root, filename)
+    return args
+
+def _parse_all_(args_files, rmantree):
+    # what startup did before the cache
+    return dict((name, args_cache_utils.parse_args_file(arg_file, rmantree))
+                for name, arg_file in args_files.items())
+
+def main():
+    rmantree = os.environ.get('RMANTREE', '')
+    if len(sys.argv) > 1:
+        paths = sys.argv[1:]
+    else:
+        paths = [os.path.join(bench_env.ROOT, 'Args')]
+        if rmantree:
+            paths = [os.path.join(rmantree, 'lib', 'plugins'),
+                     os.path.join(rmantree, 'lib', 'shaders')] + paths
+
+    args_files = _find_args_files_(paths, rmantree)
+    print('%d args files' % len(args_files))
+    if not args_files:
+        return
+
+    tmp_dir = tempfile.mkdtemp(prefix='rfb_bench_')
+    cache_file = os.path.join(tmp_dir, 'node_args_cache.pickle')
+
+    def _cold():
+        if os.path.exists(cache_file):
+            os.remove(cache_file)
+        args_cache_utils.get_args_roots(args_files, cache_file, rmantree)
+
+    # a copy of one of the files, touched before each call
+    modified = dict(args_files)
+    name, arg_file = next(iter(args_files.items()))
+    modified[name] = os.path.join(tmp_dir, os.path.basename(arg_file))
+    shutil.copy(arg_file, modified[name])
+    count = [0]
+
+    def _one_modified():
+        count[0] += 1
+        os.utime(modified[name], (count[0], count[0]))
+        args_cache_utils.get_args_roots(modified, cache_file, rmantree)
+
+    try:
+        before = bench_env.bench('parse every file', lambda: _parse_all_(args_files, rmantree), repeat=3)
+        bench_env.bench('get_args_roots, no cache', _cold, repeat=3)
+        args_cache_utils.get_args_roots(args_files, cache_file, rmantree)
+        after = bench_env.bench('get_args_roots, warm cache',
+                                lambda: args_cache_utils.get_args_roots(args_files, cache_file, rmantree))
+        bench_env.report_speedup('speedup', before, after)
+        args_cache_utils.get_args_roots(modified, cache_file, rmantree)
+        bench_env.bench('get_args_roots, one file modified', _one_modified)
+
+        roots = args_cache_utils.get_args_roots(args_files, cache_file, rmantree)
+        assert list(roots) == list(args_files), 'get_args_roots dropped some files'
+        assert all(ET.tostring(roots[n]) == ET.tostring(r)
+                   for n, r in _parse_all_(args_files, rmantree).items()), 'cached elements differ'
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+main()
@@ -0,0 +1,83 @@
+'''
+Helpers shared by the export benchmarks.
+
+The bench_*.py scripts time pure Python parts of the add-on and run with any
+Python 3 that has numpy:
+
+    python tests/bench/bench_string_expr.py
+
+The add-on modules import bpy and rman at the top, but the functions timed by
+these scripts don't use them. Outside of Blender, placeholder modules are
+installed so that the add-on modules can be imported.
+
+The blender_bench_*.py scripts need Blender and RenderMan. The add-on must be
+in one of Blender's add-on paths:
+
+    blender -b --factory-startup --python tests/bench/blender_bench_mesh.py
+'''
+
+import os
+import sys
+import time
+import types
+import importlib
+
+# root of the add-on
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# package name the add-on is imported as, outside of Blender
+PACKAGE = 'rfb_bench'
+
+def import_module(name):
+    '''
+    Import a module of the add-on outside of Blender.
+
+    Args:
+        name (str) - module path, relative to the add-on (ex: 'rman_utils.string_expr')
+    '''
+    for mod in ['bpy', 'rman']:
+        try:
+            importlib.import_module(mod)
+        except ImportError:
+            sys.modules[mod] = types.ModuleType(mod)
+    # the logger reads its level from the add-on prefs otherwise
+    os.environ.setdefault('RFB_LOG_LEVEL', 'WARNING')
+    if PACKAGE not in sys.modules:
+        pkg = types.ModuleType(PACKAGE)
+        pkg.__path__ = [ROOT]
+        sys.modules[PACKAGE] = pkg
+    return importlib.import_module('%s.%s' % (PACKAGE, name))
+
+def enable_addon():
+    '''
+    Enable the add-on in Blender.
+
+    Returns:
+        (str) - the package name of the add-on
+    '''
+    import addon_utils
+    for mod in addon_utils.modules():
+        if os.path.dirname(os.path.abspath(mod.__file__)) == ROOT:
+            addon_utils.enable(mod.__name__, default_set=True)
+            return mod.__name__
+    raise RuntimeError('%s is not in one of the Blender add-on paths' % ROOT)
+
+def bench(label, func, repeat=5, number=1):
+    '''
+    Run func number times per round, and print the best round.
+
+    Returns:
+        (float) - the best time of a single call, in seconds
+    '''
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        for j in range(number):
+            func()
+        elapsed = (time.perf_counter() - start) / number
+        best = elapsed if best is None else min(best, elapsed)
+    print('%-50s %12.3f ms' % (label, best * 1000.0))
+    return best
+
+def report_speedup(label, before, after):
+    print('%-50s %12.1fx' % (label, before / after if after else float('inf')))
@@ -0,0 +1,72 @@
+'''
+Benchmark of the string expression expansion in rman_utils.string_expr.
+
+Times the expansion of typical output path expressions with the template
+cache cleared before every call (every expression is parsed again) against
+the cached templates, and the expansion of file paths.
+
+    python tests/bench/bench_string_expr.py [number]
+'''
+
+import os
+import sys
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import bench_env
+
+string_expr = bench_env.import_module('rman_utils.string_expr')
+
+EXPRESSIONS = [
+    '{OUT}/images/{scene}.{layer}.{aov?beauty}.{F4}.{ext}',
+    '{OUT}/rib/{scene}/{F4}/{scene}_{F4}.rib',
+    '{OUT}/texture/{blend}/{jobid}_$HOME',
+    '{OUT}/{scene}_{version}_{take}_{date}_{time}.{F4}.exr',
+]
+
+def _make_string_expr_(out):
+    # skip __init__, it reads the scene and the add-on prefs
+    expr = string_expr.StringExpression.__new__(string_expr.StringExpression)
+    expr.tokens = {'OUT': out, 'blend': 'shot010', 'scene': 'Scene', 'layer': 'ViewLayer',
+                   'jobid': '201018120000', 'date': '20_10_18', 'time': '12-00-00',
+                   'ext': 'exr', 'aov': '', 'version': '001', 'take': '01'}
+    expr.set_frame_context(1)
+    return expr
+
+def _expand_all_(expr, number, clear_cache=False, objTokens={}):
+    for i in range(number):
+        for e in EXPRESSIONS:
+            if clear_cache:
+                string_expr._compile_template_.cache_clear()
+            expr.expand(e, objTokens=objTokens)
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    out = tempfile.mkdtemp(prefix='rfb_bench_')
+    try:
+        expr = _make_string_expr_(out)
+        print('%d expansions per round' % (number * len(EXPRESSIONS)))
+
+        before = bench_env.bench('expand (parsed every call)',
+                                 lambda: _expand_all_(expr, number, clear_cache=True))
+        string_expr._compile_template_.cache_clear()
+        after = bench_env.bench('expand (cached templates)', lambda: _expand_all_(expr, number))
+        bench_env.report_speedup('speedup', before, after)
+
+        bench_env.bench('expand with object tokens',
+                        lambda: _expand_all_(expr, number, objTokens={'aov': 'diffuse'}))
+
+        string_expr._compile_template_.cache_clear()
+        bench_env.bench('_compile_template_ (parse only)',
+                        lambda: [string_expr._compile_template_.__wrapped__(e)
+                                 for i in range(number) for e in EXPRESSIONS])
+
+        path = os.path.join(out, '{scene}', '{F4}', '{scene}_{F4}.rib')
+        bench_env.bench('expand asFilePath',
+                        lambda: [expr.expand(path, asFilePath=True) for i in range(number)])
+        print(string_expr._compile_template_.cache_info())
+    finally:
+        shutil.rmtree(out, ignore_errors=True)
+
+main()
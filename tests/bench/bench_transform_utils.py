@@ -0,0 +1,82 @@
+'''
+Benchmark of the batched transform helpers in rman_utils.transform_utils.
+
+Times transform_points_array and convert_matrices against the per-point and
+per-matrix loops they replaced. When the RenderMan Python bindings can be
+imported, the per-point reference uses RtMatrix4x4.pTransform like the old
+code did. Otherwise, it is the same loop in pure Python.
+
+    python tests/bench/bench_transform_utils.py [npoints]
+'''
+
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import bench_env
+
+transform_utils = bench_env.import_module('rman_utils.transform_utils')
+
+try:
+    import rman
+    HAS_RMAN = hasattr(rman, 'Types')
+except ImportError:
+    HAS_RMAN = False
+
+def _transform_points_loop_(transform_mtx, P):
+    # the per-point loop transform_points used to run, kept as the reference
+    transform_pts = []
+    if HAS_RMAN:
+        m = transform_utils.convert_matrix4x4(transform_mtx)
+        for i in range(0, len(P), 3):
+            pt = m.pTransform(rman.Types.RtFloat3(P[i], P[i+1], P[i+2]))
+            transform_pts.append(pt.x)
+            transform_pts.append(pt.y)
+            transform_pts.append(pt.z)
+        return transform_pts
+
+    m = transform_mtx
+    for i in range(0, len(P), 3):
+        x, y, z = P[i], P[i+1], P[i+2]
+        w = m[3][0]*x + m[3][1]*y + m[3][2]*z + m[3][3]
+        transform_pts.append((m[0][0]*x + m[0][1]*y + m[0][2]*z + m[0][3]) / w)
+        transform_pts.append((m[1][0]*x + m[1][1]*y + m[1][2]*z + m[1][3]) / w)
+        transform_pts.append((m[2][0]*x + m[2][1]*y + m[2][2]*z + m[2][3]) / w)
+    return transform_pts
+
+def main():
+    import numpy as np
+
+    npoints = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    rng = random.Random(0)
+    P = [rng.uniform(-10.0, 10.0) for i in range(npoints * 3)]
+    P_array = np.array(P, dtype=np.float32)
+    mtx = [[1.0, 0.0, 0.0, 2.0],
+           [0.0, 0.0, -1.0, 3.0],
+           [0.0, 1.0, 0.0, 4.0],
+           [0.0, 0.0, 0.0, 1.0]]
+
+    print('%d points, reference uses %s' % (npoints, 'pTransform' if HAS_RMAN else 'pure Python'))
+    before = bench_env.bench('per-point loop', lambda: _transform_points_loop_(mtx, P), repeat=3)
+    after = bench_env.bench('transform_points_array',
+                            lambda: transform_utils.transform_points_array(mtx, P_array))
+    bench_env.report_speedup('speedup', before, after)
+    bench_env.bench('transform_points (with tolist())',
+                    lambda: transform_utils.transform_points(mtx, P_array))
+
+    expected = np.array(_transform_points_loop_(mtx, P[:300]), dtype=np.float32).reshape(-1, 3)
+    result = transform_utils.transform_points_array(mtx, P_array[:300])
+    assert np.allclose(expected, result, atol=1e-4), 'transform_points_array does not match the reference'
+
+    nmatrices = max(npoints // 10, 1)
+    mtxs = np.array([mtx] * nmatrices, dtype=np.float64)
+    print('%d matrices' % nmatrices)
+    before = bench_env.bench('convert_matrix per matrix',
+                             lambda: [transform_utils.convert_matrix(m) for m in mtxs], repeat=3)
+    after = bench_env.bench('convert_matrices', lambda: transform_utils.convert_matrices(mtxs))
+    bench_env.report_speedup('speedup', before, after)
+
+    assert transform_utils.convert_matrices(mtxs[:1])[0] == transform_utils.convert_matrix(mtxs[0])
+
+main()
@@ -0,0 +1,67 @@
+'''
+Benchmark of the mesh extraction done by the mesh translator.
+
+Times object_utils._get_mesh_, which reads the topology, points and normals
+with foreach_get, against the per-vertex and per-polygon loop it replaced.
+
+    blender -b --factory-startup --python tests/bench/blender_bench_mesh.py -- [subdivisions]
+'''
+
+import os
+import sys
+import importlib
+import bpy
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import bench_env
+
+def _get_mesh_loop_(mesh, get_normals=False):
+    # the Python loop _get_mesh_ used to run, kept as the reference
+    nverts = []
+    verts = []
+    P = []
+    N = []
+
+    for v in mesh.vertices:
+        P.extend(v.co)
+
+    for p in mesh.polygons:
+        nverts.append(p.loop_total)
+        verts.extend(p.vertices)
+        if get_normals:
+            if p.use_smooth:
+                for vi in p.vertices:
+                    N.extend(mesh.vertices[vi].normal)
+            else:
+                N.extend(list(p.normal) * p.loop_total)
+
+    if len(verts) > 0:
+        P = P[:int(max(verts) + 1) * 3]
+    return (nverts, verts, P, N)
+
+def main():
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    subdivisions = int(argv[0]) if argv else 500
+
+    package = bench_env.enable_addon()
+    object_utils = importlib.import_module('%s.rman_utils.object_utils' % package)
+
+    bpy.ops.mesh.primitive_grid_add(x_subdivisions=subdivisions, y_subdivisions=subdivisions)
+    ob = bpy.context.active_object
+    mesh = ob.data
+    print('Mesh: %d vertices, %d polygons' % (len(mesh.vertices), len(mesh.polygons)))
+
+    for get_normals in [False, True]:
+        suffix = ' with normals' if get_normals else ''
+        before = bench_env.bench('python loop%s' % suffix,
+                                 lambda: _get_mesh_loop_(mesh, get_normals=get_normals), repeat=3)
+        after = bench_env.bench('_get_mesh_%s' % suffix,
+                                lambda: object_utils._get_mesh_(mesh, get_normals=get_normals))
+        bench_env.report_speedup('speedup%s' % suffix, before, after)
+
+    # the primvar conversion the translator does after the extraction
+    (nverts, verts, P, N) = object_utils._get_mesh_(mesh, get_normals=True)
+    bench_env.bench('tolist() of the buffers',
+                    lambda: (nverts.tolist(), verts.tolist(), P.reshape(-1, 3).tolist(), N.tolist()))
+
+main()
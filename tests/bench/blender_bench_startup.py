@@ -0,0 +1,70 @@
+'''
+Benchmark of the add-on startup.
+
+Starts a new Blender for each run and times enabling the add-on, with the
+node args cache removed (first startup) and with the cache in place. It also
+reports the number of pattern node types registered as stubs, and the time it
+takes to generate all of them, which is the work they save at startup.
+
+    blender -b --factory-startup --python tests/bench/blender_bench_startup.py -- [runs]
+'''
+
+import os
+import sys
+import time
+import subprocess
+import importlib
+import bpy
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import bench_env
+
+CHILD_FLAG = '--rfb-bench-child'
+
+def _child_():
+    # runs in the Blender started by _run_child_
+    start = time.perf_counter()
+    package = bench_env.enable_addon()
+    enable_time = time.perf_counter() - start
+
+    nodes = importlib.import_module('%s.nodes' % package)
+    nstubs = len(nodes.lazy_node_types)
+    start = time.perf_counter()
+    for typename in list(nodes.lazy_node_types):
+        nodes.ensure_node_type(typename)
+    stubs_time = time.perf_counter() - start
+    print('RFB_BENCH %f %d %d %f' % (enable_time, len(nodes.nodetypes), nstubs, stubs_time))
+
+def _run_child_(script, cold):
+    if cold:
+        cache_dir = bpy.utils.user_resource('CONFIG', path='renderman')
+        cache_file = os.path.join(cache_dir, 'node_args_cache.pickle')
+        if os.path.exists(cache_file):
+            os.remove(cache_file)
+    output = subprocess.check_output([bpy.app.binary_path, '-b', '--factory-startup',
+                                      '--python', script, '--', CHILD_FLAG],
+                                     universal_newlines=True)
+    for line in output.splitlines():
+        if line.startswith('RFB_BENCH '):
+            vals = line.split()[1:]
+            return (float(vals[0]), int(vals[1]), int(vals[2]), float(vals[3]))
+    raise RuntimeError('The add-on could not be enabled:\n%s' % output)
+
+def main():
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    if CHILD_FLAG in argv:
+        _child_()
+        return
+
+    runs = int(argv[0]) if argv else 3
+    script = os.path.abspath(__file__)
+    for label, cold in [('enable add-on, no args cache', True), ('enable add-on, warm args cache', False)]:
+        results = [_run_child_(script, cold) for i in range(runs)]
+        best = min(results)
+        print('%-50s %12.3f ms' % (label, best[0] * 1000.0))
+
+    enable_time, ntypes, nstubs, stubs_time = best
+    print('%d node types, %d registered as stubs' % (ntypes, nstubs))
+    print('%-50s %12.3f ms' % ('generate all stub types', stubs_time * 1000.0))
+
+main()
@@ -1,16 +1,10 @@
 from .rman_translator import RmanTranslator
 from ..rman_sg_nodes.rman_sg_blobby import RmanSgBlobby
 from ..rman_utils import object_utils
-from ..rman_utils import string_utils
-from mathutils import Matrix
+from ..rman_utils import transform_utils
 
 import bpy
-import math
-
-def get_mball_parent(mball):
-    for ob in bpy.data.objects:
-        if ob.data == mball:
-            return ob
+import numpy as np
 
 class RmanBlobbyTranslator(RmanTranslator):
 
@@ -40,51 +34,44 @@ class RmanBlobbyTranslator(RmanTranslator):
         # all as one family in RiBlobby
 
         family = object_utils.get_meta_family(ob)
-        master = bpy.data.objects[family]
+        fam_mballs = self.rman_scene.get_meta_families().get(family, [])
+
+        # element transforms, one batch per metaball
+        mtxs = []
+        for mball, parent in fam_mballs:
+            count = len(mball.elements)
+            if count == 0:
+                continue
+            co = np.zeros(count * 3, dtype=np.float32)
+            radius = np.zeros(count, dtype=np.float32)
+            mball.elements.foreach_get('co', co)
+            mball.elements.foreach_get('radius', radius)
 
-        fam_blobs = []
+            # Because all meta elements are stored in a single collection,
+            # these elements have a link to their parent MetaBall, but NOT the actual tree parent object.
+            # The family index gives us the parent that owns it.  We need the tree parent in order
+            # to get any world transforms that alter position of the metaball.
+            ploc, prot, psc = parent.matrix_world.decompose()
+            ro = np.array(prot.to_matrix())
 
-        for mball in bpy.data.metaballs:
-            fam_blobs.extend([el for el in mball.elements if get_mball_parent(
-                el.id_data).name.split('.')[0] == family])
+            # Translation(co) @ Scale(radius) @ rotation of the parent, for all elements
+            m = np.zeros((count, 4, 4))
+            m[:, :3, :3] = radius[:, None, None] * ro
+            m[:, :3, 3] = co.reshape(-1, 3)
+            m[:, 3, 3] = 1.0
+            mtxs.append(np.matmul(np.array(parent.matrix_world), m))
 
-        # transform
+        count = sum([len(m) for m in mtxs])
         tform = []
+        if mtxs:
+            tform = [v for mtx in transform_utils.convert_matrices(np.concatenate(mtxs)) for v in mtx]
 
         # opcodes
         op = []
-        count = len(fam_blobs)
         for i in range(count):
             op.append(1001)  # only blobby ellipsoids for now...
             op.append(i * 16)
 
-        for meta_el in fam_blobs:
-
-            # Because all meta elements are stored in a single collection,
-            # these elements have a link to their parent MetaBall, but NOT the actual tree parent object.
-            # So I have to go find the parent that owns it.  We need the tree parent in order
-            # to get any world transforms that alter position of the metaball.
-            parent = get_mball_parent(meta_el.id_data)
-
-            m = {}
-            loc = meta_el.co
-
-            # mballs that are only linked to the master by name have their own position,
-            # and have to be transformed relative to the master
-            ploc, prot, psc = parent.matrix_world.decompose()
-
-            m = Matrix.Translation(loc)
-
-            sc = Matrix(((meta_el.radius, 0, 0, 0),
-                        (0, meta_el.radius, 0, 0),
-                        (0, 0, meta_el.radius, 0),
-                        (0, 0, 0, 1)))
-
-            ro = prot.to_matrix().to_4x4()
-
-            m2 = m @ sc @ ro
-            tform = tform + string_utils.convert_val(parent.matrix_world @ m2)
-
         op.append(0)  # blob operation:add
         op.append(count)
         for n in range(count):
@@ -1,6 +1,7 @@
 from .rman_translator import RmanTranslator
 from ..rman_sg_nodes.rman_sg_dra import RmanSgDra
 from ..rman_utils import filepath_utils
+from ..rman_utils import transform_utils
 
 class RmanDraTranslator(RmanTranslator):
 
@@ -18,6 +19,24 @@ class RmanDraTranslator(RmanTranslator):
 
         return rman_sg_dra
 
+    def export_static_archive(self, ob, db_name, archive_path):
+        # reference an archive holding the object's already exported geometry
+        sg_node = self.rman_scene.sg_scene.CreateProcedural(db_name)
+        sg_node.Define("DelayedReadArchive", None)
+        rman_sg_dra = RmanSgDra(self.rman_scene, sg_node, db_name)
+
+        primvar = sg_node.GetPrimVars()
+        primvar.SetString(self.rman_scene.rman.Tokens.Rix.k_filename, archive_path)
+        # pad the bound by the displacement bound, like the mesh itself,
+        # or displaced geometry outside the cage would be culled
+        pad = ob.renderman.displacementbound
+        bounds = transform_utils.convert_ob_bounds(ob.bound_box)
+        bounds = [b + pad if i % 2 else b - pad for i, b in enumerate(bounds)]
+        primvar.SetFloatArray(self.rman_scene.rman.Tokens.Rix.k_bound, bounds, 6)
+        sg_node.SetPrimVars(primvar)
+
+        return rman_sg_dra
+
     def export_deform_sample(self, rman_sg_dra, ob, time_samples, time_sample):
         pass
 
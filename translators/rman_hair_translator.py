@@ -2,7 +2,7 @@ from .rman_translator import RmanTranslator
 from ..rman_utils import transform_utils
 from ..rman_utils import object_utils
 from ..rman_sg_nodes.rman_sg_hair import RmanSgHair
-from mathutils import Vector
+import numpy as np
 import math
 import bpy    
    
@@ -32,11 +32,10 @@ class RmanHairTranslator(RmanTranslator):
         for vertsArray, points, widthString, widths, scalpS, scalpT in curves:
             curves_sg = self.rman_scene.sg_scene.CreateCurves("%s-%d" % (psys.name, i))
             i += 1                
-            curves_sg.Define(self.rman_scene.rman.Tokens.Rix.k_cubic, "nonperiodic", "catmull-rom", len(vertsArray), int(len(points)/3))
+            curves_sg.Define(self.rman_scene.rman.Tokens.Rix.k_cubic, "nonperiodic", "catmull-rom", len(vertsArray), len(points))
             primvar = curves_sg.GetPrimVars()
 
-            pts = list( zip(*[iter(points)]*3 ) )
-            primvar.SetPointDetail(self.rman_scene.rman.Tokens.Rix.k_P, pts, "vertex")                
+            primvar.SetPointDetail(self.rman_scene.rman.Tokens.Rix.k_P, points.tolist(), "vertex")                
             primvar.SetIntegerDetail(self.rman_scene.rman.Tokens.Rix.k_Ri_nvertices, vertsArray, "uniform")
             primvar.SetIntegerDetail("index", range(len(vertsArray)), "uniform")
 
@@ -80,7 +79,6 @@ class RmanHairTranslator(RmanTranslator):
             hair_width = base_width
         else:
             widthString = self.rman_scene.rman.Tokens.Rix.k_width
-            hair_width = []
 
         num_parents = len(psys.particles)
         num_children = len(psys.child_particles)
@@ -88,20 +86,13 @@ class RmanHairTranslator(RmanTranslator):
         export_st = psys.settings.renderman.export_scalp_st and psys_modifier and len(
             ob.data.uv_layers) > 0
 
-        curve_sets = []
-
-        points = []
-
-        vertsArray = []
-        scalpS = []
-        scalpT = []
-        nverts = 0
-        no = 0
-        
-        for pindex in range(total_hair_count):
-            if psys.settings.child_type != 'NONE' and pindex < num_parents:
-                continue
-
+        # gather the keys of all strands first, and do everything
+        # else on the whole set of strands at once
+        co = []
+        strand_lengths = []
+        strand_pindices = []
+        first = num_parents if psys.settings.child_type != 'NONE' else 0
+        for pindex in range(first, total_hair_count):
             strand_points = []
             # walk through each strand
             for step in range(0, steps + 1):           
@@ -110,64 +101,72 @@ class RmanHairTranslator(RmanTranslator):
                 if pt.length_squared == 0:
                     # this strand ends prematurely                    
                     break
-                
-
-                # put points in object space
-                m = ob.matrix_world.inverted_safe()
-                pt = Vector(transform_utils.transform_points( m, pt))
-
-                strand_points.extend(pt)
-
-            if len(strand_points) > 1:
-                # double the first and last
-                strand_points = strand_points[:3] + \
-                    strand_points + strand_points[-3:]
-                vertsInStrand = len(strand_points) // 3
-
-                # catmull-rom requires at least 4 vertices
-                if vertsInStrand < 4:
-                    continue
-
-                # for varying width make the width array
-                if not conwidth:
-                    decr = (base_width - tip_width) / (vertsInStrand - 2)
-                    hair_width.extend([base_width] + [(base_width - decr * i)
-                                                    for i in range(vertsInStrand - 2)] +
-                                    [tip_width])
-
-                # add the last point again
-                points.extend(strand_points)
-                vertsArray.append(vertsInStrand)
-                nverts += vertsInStrand
-
-                # get the scalp S
-                if export_st:
-                    if pindex >= num_parents:
-                        particle = psys.particles[
-                            (pindex - num_parents) % num_parents]
-                    else:
-                        particle = psys.particles[pindex]
-                    st = psys.uv_on_emitter(psys_modifier, particle, pindex)
-                    scalpS.append(st[0])
-                    scalpT.append(st[1])
-
-            # if we get more than 100000 vertices, export ri.Curve and reset.  This
-            # is to avoid a maxint on the array length
-            if nverts > 100000:
-                curve_sets.append(
-                    (vertsArray, points, widthString, hair_width, scalpS, scalpT))
-
-                nverts = 0
-                points = []
-                vertsArray = []
-                if not conwidth:
-                    hair_width = []
-                scalpS = []
-                scalpT = []
-
-        if nverts > 0:
-            curve_sets.append((vertsArray, points, widthString,
-                            hair_width, scalpS, scalpT))
-
-        return curve_sets              
-            
\ No newline at end of file
+                strand_points.append(pt[:])
+
+            # catmull-rom requires at least 4 vertices, including the
+            # doubled first and last point
+            if len(strand_points) < 2:
+                continue
+            co.extend(strand_points)
+            strand_lengths.append(len(strand_points))
+            strand_pindices.append(pindex)
+
+        if not strand_lengths:
+            return []
+
+        # put points in object space
+        m = ob.matrix_world.inverted_safe()
+        P = transform_utils.transform_points_array(m, co)
+
+        # double the first and last point of each strand
+        strand_lengths = np.array(strand_lengths, dtype=np.int32)
+        strand_ends = np.cumsum(strand_lengths)
+        repeats = np.ones(len(P), dtype=np.int32)
+        repeats[strand_ends - strand_lengths] += 1
+        repeats[strand_ends - 1] += 1
+        P = np.repeat(P, repeats, axis=0)
+        vertsArray = strand_lengths + 2
+        vert_ends = np.cumsum(vertsArray)
+
+        # for varying width make the width array
+        if not conwidth:
+            vert_starts = vert_ends - vertsArray
+            local_idx = np.arange(len(P)) - np.repeat(vert_starts, vertsArray)
+            decr = np.repeat((base_width - tip_width) / (vertsArray - 2), vertsArray)
+            hair_width = base_width - decr * (local_idx - 1)
+            hair_width[vert_starts] = base_width
+            hair_width[vert_ends - 1] = tip_width
+
+        # get the scalp S
+        scalpS = []
+        scalpT = []
+        if export_st:
+            st = np.empty((len(strand_pindices), 2), dtype=np.float32)
+            for i, pindex in enumerate(strand_pindices):
+                if pindex >= num_parents:
+                    particle = psys.particles[
+                        (pindex - num_parents) % num_parents]
+                else:
+                    particle = psys.particles[pindex]
+                st[i] = psys.uv_on_emitter(psys_modifier, particle, pindex)[:2]
+            scalpS = st[:, 0]
+            scalpT = st[:, 1]
+
+        # if we get more than 100000 vertices, export ri.Curve and reset.  This
+        # is to avoid a maxint on the array length
+        curve_sets = []
+        start = 0
+        num_strands = len(vertsArray)
+        while start < num_strands:
+            vert_offset = vert_ends[start - 1] if start > 0 else 0
+            end = min(int(np.searchsorted(vert_ends, vert_offset + 100000, side='right')) + 1, num_strands)
+            vert_end = vert_ends[end - 1]
+            curve_sets.append((vertsArray[start:end].tolist(),
+                            P[vert_offset:vert_end],
+                            widthString,
+                            hair_width if conwidth else hair_width[vert_offset:vert_end].tolist(),
+                            scalpS[start:end].tolist() if export_st else [],
+                            scalpT[start:end].tolist() if export_st else []))
+            start = end
+
+        return curve_sets
@@ -42,6 +42,7 @@ class RmanLightTranslator(RmanTranslator):
     def __init__(self, rman_scene):
         super().__init__(rman_scene)
         self.bl_type = 'LIGHT'  
+        self.lightfilter_translator = RmanLightFilterTranslator(rman_scene=rman_scene)
 
     def export_object_primvars(self, ob, sg_node):
         pass
@@ -78,33 +79,35 @@ class RmanLightTranslator(RmanTranslator):
         self.update(ob, rman_sg_light)
         return rman_sg_light
 
-    def update(self, ob, rman_sg_light):
-
-        light = ob.data
-        rm = light.renderman  
-
-        group_name=get_light_group(ob, self.rman_scene.bl_scene)
+    def update_light_filters(self, ob, rman_sg_light):
+        '''
+        Attach the light filters to the light. The filters are exported once and
+        shared with any other light using them.
+        '''
+        rm = ob.data.renderman
         light_filters = []
 
-        lightfilter_translator = RmanLightFilterTranslator(rman_scene=self.rman_scene)
-        
         for lf in rm.light_filters:
-            if lf.filter_name in bpy.data.objects:
-                light_filter = bpy.data.objects[lf.filter_name]
-                light_filter_sg = None
-
-                light_filter_sg = lightfilter_translator.export(light_filter, "")
+            light_filter = bpy.data.objects.get(lf.filter_name, None)
+            if not light_filter:
+                continue
+            rman_sg_lightfilter = self.lightfilter_translator.export(light_filter, "")
+            rman_sg_lightfilter.lights[rman_sg_light.db_name] = ob.name_full
+            light_filters.append(rman_sg_lightfilter.sg_node)
+            rman_sg_light.sg_node.AddCoordinateSystem(rman_sg_lightfilter.coordsys)
+
+        if len(light_filters) > 0 or len(rm.light_filters) > 0:
+            # when the filters listed on the light were deleted, this
+            # sets an empty list to detach them
+            rman_sg_light.sg_node.SetLightFilter(light_filters)
 
-                if light_filter_sg:
-                    light_filters.append(light_filter_sg)
+    def update(self, ob, rman_sg_light):
 
-                    coordsys_name = "%s_coordsys" % light_filter.name
-                    coordsys = self.rman_scene.rman_objects.get(coordsys_name, None)
-                    if coordsys:
-                        rman_sg_light.sg_node.AddCoordinateSystem(coordsys)
+        light = ob.data
+        rm = light.renderman  
 
-        if len(light_filters) > 0:
-            rman_sg_light.sg_node.SetLightFilter(light_filters)
+        group_name=get_light_group(ob, self.rman_scene.bl_scene)
+        self.update_light_filters(ob, rman_sg_light)
         
         
         light_shader = rm.get_light_node()
@@ -1,11 +1,15 @@
 from .rman_translator import RmanTranslator
 from ..rman_utils import property_utils
 from ..rman_utils import transform_utils
-from ..rman_sg_nodes.rman_sg_node import RmanSgNode
+from ..rman_sg_nodes.rman_sg_lightfilter import RmanSgLightFilter
 import math
 import bpy                    
 
 class RmanLightFilterTranslator(RmanTranslator):
+    '''
+    Light filters are exported once and shared by all the lights using them. They
+    are cached in RmanScene.rman_light_filters, keyed by the filter object's name.
+    '''
 
     def __init__(self, rman_scene):
         super().__init__(rman_scene)
@@ -14,33 +18,34 @@ class RmanLightFilterTranslator(RmanTranslator):
     def export(self, ob, db_name):
 
         light_filter = ob
+        rman_sg_lightfilter = self.rman_scene.rman_light_filters.get(light_filter.name_full, None)
+        if rman_sg_lightfilter:
+            return rman_sg_lightfilter
 
-        light_filter_sg = None
+        coordsys_name = "%s_coordsys" % light_filter.name
+        coordsys = self.rman_scene.sg_scene.CreateGroup(coordsys_name)
+        self.rman_scene.sg_scene.Root().AddChild(coordsys)
 
-        if light_filter.data.name in self.rman_scene.rman_objects:
-            lightf_filter_sg = self.rman_scene.rman_objects[light_filter.name]
-        else:
+        rman_sg_lightfilter = RmanSgLightFilter(self.rman_scene, None, light_filter.name)
+        rman_sg_lightfilter.coordsys = coordsys
+        self.update(light_filter, rman_sg_lightfilter)
+        self.update_transform(light_filter, rman_sg_lightfilter)
 
-            filter_plugin = light_filter.data.renderman.get_light_node()  
+        self.rman_scene.rman_light_filters[light_filter.name_full] = rman_sg_lightfilter
+        return rman_sg_lightfilter
 
-            lightfilter_name = light_filter.data.renderman.get_light_node_name()
-            light_filter_sg = self.rman_scene.rman.SGManager.RixSGShader("LightFilter", lightfilter_name, light_filter.name)
-            rman_sg_node = RmanSgNode(self.rman_scene, light_filter_sg, "")
-            property_utils.property_group_to_rixparams(filter_plugin, rman_sg_node, light_filter_sg, light=ob.data)
-
-            coordsys_name = "%s_coordsys" % light_filter.name
-            rixparams = light_filter_sg.params
-            rixparams.SetString("coordsys", coordsys_name)
+    def update(self, ob, rman_sg_lightfilter):
+        light_filter = ob
+        filter_plugin = light_filter.data.renderman.get_light_node()  
 
-            self.rman_scene.rman_objects[light_filter.name] = light_filter_sg
-                        
-            coordsys = self.rman_scene.sg_scene.CreateGroup(coordsys_name)
-            m = transform_utils.convert_matrix( light_filter.matrix_world )
-            coordsys.SetTransform(m)
-            self.rman_scene.sg_scene.Root().AddChild(coordsys)
-            #light_sg.AddCoordinateSystem(coordsys)
+        lightfilter_name = light_filter.data.renderman.get_light_node_name()
+        light_filter_sg = self.rman_scene.rman.SGManager.RixSGShader("LightFilter", lightfilter_name, light_filter.name)
+        rman_sg_lightfilter.sg_node = light_filter_sg
+        property_utils.property_group_to_rixparams(filter_plugin, rman_sg_lightfilter, light_filter_sg, light=ob.data)
 
-            self.rman_scene.rman_objects[coordsys_name] = coordsys
+        rixparams = light_filter_sg.params
+        rixparams.SetString("coordsys", "%s_coordsys" % light_filter.name)
 
-        return light_filter_sg
-            
\ No newline at end of file
+    def update_transform(self, ob, rman_sg_lightfilter):
+        m = transform_utils.convert_matrix( ob.matrix_world )
+        rman_sg_lightfilter.coordsys.SetTransform(m)
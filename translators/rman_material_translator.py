@@ -6,6 +6,56 @@ from ..rfb_logger import rfb_log
 
 import bpy
 
+def _get_node_key_(node):
+    if type(node) == type(()):
+        shader, from_node, from_socket = node
+        return (shader, from_node.name, from_socket.identifier)
+    return node.name
+
+def _get_node_fingerprint_(node):
+    '''
+    Returns everything a node's shader parameters are built from, or None if
+    they depend on state outside of the node and have to be rebuilt every time.
+    '''
+    if type(node) == type(()):
+        # conversion nodes are a single reference, cheap to rebuild
+        return None
+    if not hasattr(node, 'renderman_node_type') or node.renderman_node_type == 'light':
+        return None
+    if node.bl_idname in ['PxrOSLPatternNode', 'PxrSeExprPatternNode'] or \
+            getattr(node, 'plugin_name', '') == 'PxrRamp':
+        # shader code, texts and ramps live outside of the node
+        return None
+
+    vals = [node.bl_idname]
+    for prop_name, meta in node.prop_meta.items():
+        if meta.get('options', '') == 'texture' or meta.get('widget', '') == 'assetIdInput':
+            # texture paths come from the texture manager
+            return None
+        if meta['renderman_type'] == 'page':
+            continue
+        val = getattr(node, prop_name, None)
+        if hasattr(val, '__len__') and not isinstance(val, str):
+            val = tuple(val)
+        vals.append((prop_name, val))
+
+    for socket in node.inputs:
+        if socket.is_linked:
+            link = socket.links[0]
+            if link.from_node.bl_idname == 'ShaderNodeGroup':
+                # references into a group depend on the group's contents
+                return None
+            vals.append((socket.identifier, link.from_node.name, link.from_socket.identifier))
+            meta = node.prop_meta.get(socket.name, dict())
+            if meta.get('type', '') == 'vstruct':
+                # vstruct connections are decided by the upstream node's values
+                # (e.g. PxrLayer's enable toggles), so they are part of ours
+                upstream = _get_node_fingerprint_(link.from_node)
+                if upstream is None:
+                    return None
+                vals.append(upstream)
+    return tuple(vals)
+
 class RmanMaterialTranslator(RmanTranslator):
 
     def __init__(self, rman_scene):
@@ -28,6 +78,9 @@ class RmanMaterialTranslator(RmanTranslator):
             succeed = self.export_shader_nodetree(mat, rman_sg_material, handle=rman_sg_material.db_name)
 
         if not succeed:
+            rman_sg_material.shaders = dict()
+            rman_sg_material.bxdf_keys = []
+            rman_sg_material.displace_keys = []
             succeed = self.export_simple_shader(mat, rman_sg_material, mat_handle=rman_sg_material.db_name)                
         
              
@@ -47,17 +100,18 @@ class RmanMaterialTranslator(RmanTranslator):
                 if out is None:
                     return False
 
+                shaders = dict()
+
                 # bxdf
                 socket = out.inputs[0]
                 if socket.is_linked:
-                    bxdfList = []
-                    for sub_node in property_utils.gather_nodes(socket.links[0].from_node):
-                        shader_sg_nodes = self.shader_node_sg(sub_node, rman_sg_material, mat_name=handle,
-                                    portal=portal)
-                        for s in shader_sg_nodes:
-                            bxdfList.append(s) 
-                    if bxdfList:
-                        rman_sg_material.sg_node.SetBxdf(bxdfList)         
+                    bxdfList, keys, changed = self.export_shader_list(socket.links[0].from_node, rman_sg_material, shaders,
+                                                                      mat_name=handle, portal=portal)
+                    if bxdfList and (changed or keys != rman_sg_material.bxdf_keys):
+                        rman_sg_material.sg_node.SetBxdf(bxdfList)
+                    rman_sg_material.bxdf_keys = keys
+                else:
+                    rman_sg_material.bxdf_keys = []
 
                 # light
                 if len(out.inputs) > 1:
@@ -75,14 +129,16 @@ class RmanMaterialTranslator(RmanTranslator):
                 if len(out.inputs) > 2:
                     socket = out.inputs[2]
                     if socket.is_linked:
-                        dispList = []
-                        for sub_node in property_utils.gather_nodes(socket.links[0].from_node):
-                            shader_sg_nodes = self.shader_node_sg(sub_node, rman_sg_material, mat_name=handle,
-                                        portal=portal)
-                            for s in shader_sg_nodes:
-                                dispList.append(s) 
-                        if dispList:
+                        dispList, keys, changed = self.export_shader_list(socket.links[0].from_node, rman_sg_material, shaders,
+                                                                          mat_name=handle, portal=portal)
+                        if dispList and (changed or keys != rman_sg_material.displace_keys):
                             rman_sg_material.sg_node.SetDisplace(dispList)  
+                        rman_sg_material.displace_keys = keys
+                    else:
+                        rman_sg_material.displace_keys = []
+
+                # drop the shaders of nodes that are no longer connected
+                rman_sg_material.shaders = shaders
 
                 return True                        
                     
@@ -92,6 +148,42 @@ class RmanMaterialTranslator(RmanTranslator):
 
         return False
 
+    def export_shader_list(self, from_node, rman_sg_material, shaders, mat_name, portal=False):
+        '''
+        Get the shaders for the network upstream of from_node. Nodes whose parameters
+        haven't changed since the last update re-use their shaders.
+
+        Args:
+            from_node (bpy.types.ShaderNode) - the node connected to the output
+            rman_sg_material (RmanSgMaterial) - the material being updated
+            shaders (dict) - collects the shaders in use, keyed by node
+            mat_name (str) - the material handle
+
+        Returns:
+            (list, list, bool) - the shaders, their node keys and whether any shader
+                                 was translated again
+        '''
+        sg_list = []
+        keys = []
+        changed = False
+        for sub_node in property_utils.gather_nodes(from_node):
+            key = _get_node_key_(sub_node)
+            fingerprint = _get_node_fingerprint_(sub_node)
+            cached = rman_sg_material.shaders.get(key, None)
+            if fingerprint is not None and cached and cached[0] == fingerprint:
+                shader_sg_nodes = cached[1]
+            else:
+                shader_sg_nodes = self.shader_node_sg(sub_node, rman_sg_material, mat_name=mat_name,
+                            portal=portal)
+                changed = True
+            shader_sg_nodes = [s for s in (shader_sg_nodes or []) if s]
+            if not shader_sg_nodes:
+                continue
+            shaders[key] = (fingerprint, shader_sg_nodes)
+            keys.append(key)
+            sg_list.extend(shader_sg_nodes)
+        return sg_list, keys, changed
+
     def export_simple_shader(self, mat, rman_sg_material, mat_handle=''):
         rm = mat.renderman
         # if rm.surface_shaders.active == '' or not rpass.surface_shaders: return
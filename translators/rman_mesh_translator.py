@@ -5,140 +5,86 @@ from ..rman_utils import string_utils
 
 import bpy
 import math
+import hashlib
+import numpy as np
 
 def _get_mats_faces_(nverts, material_ids):
 
     mats = {}
-    for face_id, num_verts in enumerate(nverts):
-        mat_id = material_ids[face_id]
-        if mat_id not in mats:
-            mats[mat_id] = []
-        mats[mat_id].append(face_id)
+    for mat_id in np.unique(material_ids):
+        mats[int(mat_id)] = np.flatnonzero(material_ids == mat_id).tolist()
     return mats
 
 def _is_multi_material_(ob, mesh):
     if type(mesh) != bpy.types.Mesh or len(ob.data.materials) < 2 \
             or len(mesh.polygons) == 0:
         return False
-    first_mat = mesh.polygons[0].material_index
-    for p in mesh.polygons:
-        if p.material_index != first_mat:
-            return True
-    return False
+    material_ids = _get_material_ids(ob, mesh)
+    return bool((material_ids != material_ids[0]).any())
 
 def _get_subd_creases_(mesh):
     creases = []
 
+    nedges = len(mesh.edges)
+    edge_creases = np.zeros(nedges, dtype=np.float32)
+    mesh.edges.foreach_get('crease', edge_creases)
+    edge_verts = np.zeros(nedges*2, dtype=np.int32)
+    mesh.edges.foreach_get('vertices', edge_verts)
+    edge_verts = edge_verts.reshape(-1, 2)
+
     # only do creases 1 edge at a time for now,
     # detecting chains might be tricky..
-    for e in mesh.edges:
-        if e.crease > 0.0:
-            creases.append((e.vertices[0], e.vertices[1],
-                            e.crease * e.crease * 10))
-            # squared, to match blender appareance better
-            #: range 0 - 10 (infinitely sharp)
+    for i in np.flatnonzero(edge_creases > 0.0):
+        c = float(edge_creases[i])
+        creases.append((int(edge_verts[i][0]), int(edge_verts[i][1]),
+                        c * c * 10))
+        # squared, to match blender appareance better
+        #: range 0 - 10 (infinitely sharp)
     return creases
 
-# requires facevertex interpolation
-def _get_mesh_uv_(mesh, name="", flipvmode='NONE'):
-    uvs = []
-    if not name:
-        uv_loop_layer = mesh.uv_layers.active
-    else:
-        # assuming uv loop layers and uv textures share identical indices
-        idx = mesh.uv_textures.keys().index(name)
-        uv_loop_layer = mesh.uv_layers[idx]
-
-    if uv_loop_layer is None:
-        return None
-
-    for uvloop in uv_loop_layer.data:
-        uvs.append(uvloop.uv.x)
-        # renderman expects UVs flipped vertically from blender
-        # best to do this in pattern, provided here as additional option
-        if flipvmode == 'UV':
-            uvs.append(1.0-uvloop.uv.y)
-        elif flipvmode == 'TILE':
-            uvs.append(math.ceil(uvloop.uv.y) - uvloop.uv.y + math.floor(uvloop.uv.y))
-        elif flipvmode == 'NONE':
-            uvs.append(uvloop.uv.y)
-
-    return uvs
-
-def _get_mesh_vcol_(mesh, name=""):
-    vcol_layer = mesh.vertex_colors[name] if name != "" \
-        else mesh.vertex_colors.active
-    cols = []
-
-    if vcol_layer is None:
-        return None
-
-    for vcloop in vcol_layer.data:
-        cols.extend(vcloop.color)
-
-    return cols    
-
-def _get_mesh_vgroup_(ob, mesh, name=""):
-    vgroup = ob.vertex_groups[name] if name != "" else ob.vertex_groups.active
-    weights = []
-
-    if vgroup is None:
-        return None
-
-    for v in mesh.vertices:
-        if len(v.groups) == 0:
-            weights.append(0.0)
-        else:
-            weights.extend([g.weight for g in v.groups
-                            if g.group == vgroup.index])
-
-    return weights
-
 def _get_material_ids(ob, geo):
         
-    material_ids = string_utils.convert_val([p.material_index for p in geo.polygons])
+    material_ids = np.zeros(len(geo.polygons), dtype=np.int32)
+    geo.polygons.foreach_get('material_index', material_ids)
     return material_ids
 
-def _get_primvars_(ob, geo, rixparams, interpolation=""):
-
-    rm = ob.data.renderman
+def _get_fingerprint_(*items):
+    # cheap content hash over raw buffers and settings, used to
+    # detect if a mesh really needs to be re-uploaded
+    m = hashlib.md5()
+    for item in items:
+        if isinstance(item, np.ndarray):
+            m.update(item.tobytes())
+        else:
+            m.update(str(item).encode('utf-8'))
+        m.update(b'|')
+    return m.hexdigest()
+
+def _get_mesh_fingerprints_(ob, mesh, prim_type, nverts, verts, P, N, primvars, is_multi_material):
+    topology_fingerprint = _get_fingerprint_(prim_type, nverts, verts)
+    points_fingerprint = _get_fingerprint_(P, N)
+    primvars_fingerprint = _get_fingerprint_(ob.data.renderman.interp_boundary,
+                                            ob.data.renderman.face_boundary,
+                                            [m.name if m else '' for m in ob.data.materials],
+                                            _get_material_ids(ob, mesh) if is_multi_material else '',
+                                            _get_subd_creases_(mesh) if prim_type == 'SUBDIVISION_MESH' else '',
+                                            *[v for pv in primvars for v in pv])
+    return (topology_fingerprint, points_fingerprint, primvars_fingerprint)
+
+def _get_primvars_(ob, geo, rixparams, interpolation="", primvars=None):
 
     interpolation = 'facevarying' if not interpolation else interpolation
 
-    if rm.export_default_uv:
-        flipvmode = 'NONE'
-        if hasattr(rm, 'export_flipv'):
-            flipvmode = rm.export_flipv
-        uvs = _get_mesh_uv_(geo, flipvmode=flipvmode)
-        if uvs and len(uvs) > 0:
-            #primvars["%s float[2] st" % interpolation] = uvs
-            rixparams.SetFloatArrayDetail("st", uvs, 2, interpolation)
-
-    if rm.export_default_vcol:
-        vcols = _get_mesh_vcol_(geo)
-        if vcols and len(vcols) > 0:
-            rixparams.SetColorDetail("Cs", string_utils.convert_val(vcols, type_hint="color"), interpolation)
-
-    # custom prim vars
-
-    for p in rm.prim_vars:
-        if p.data_source == 'VERTEX_COLOR':
-            vcols = _get_mesh_vcol_(geo, p.data_name)
-            if vcols and len(vcols) > 0:
-                rixparams.SetColorDetail(p.name, string_utils.convert_val(vcols, type_hint="color"), interpolation)
-
-        elif p.data_source == 'UV_TEXTURE':
-            flipvmode = 'NONE'
-            if hasattr(rm, 'export_flipv'):
-                flipvmode = rm.export_flipv
-            uvs = _get_mesh_uv_(geo, p.data_name, flipvmode=flipvmode)
-            if uvs and len(uvs) > 0:
-                rixparams.SetFloatArrayDetail(p.name, uvs, 2, interpolation)
-
-        elif p.data_source == 'VERTEX_GROUP':
-            weights = _get_mesh_vgroup_(ob, geo, p.data_name)
-            if weights and len(weights) > 0:
-                rixparams.SetFloatDetail(p.name, weights, "vertex")
+    if primvars is None:
+        primvars = object_utils._get_mesh_primvars_(ob, geo)
+
+    for primvar_type, name, values in primvars:
+        if primvar_type == 'UV':
+            rixparams.SetFloatArrayDetail(name, values.tolist(), 2, interpolation)
+        elif primvar_type == 'COLOR':
+            rixparams.SetColorDetail(name, values.tolist(), interpolation)
+        elif primvar_type == 'VERTEX_GROUP':
+            rixparams.SetFloatDetail(name, values.tolist(), "vertex")
 
 class RmanMeshTranslator(RmanTranslator):
 
@@ -159,25 +105,52 @@ class RmanMeshTranslator(RmanTranslator):
 
         return rman_sg_mesh
 
+    def get_content_hash(self, ob):
+        '''
+        Hash everything that ends up in the exported mesh, including the object level
+        primvars. Returns None if the mesh can't be written out on its own (ex: it's
+        empty or uses more than one material).
+        '''
+        mesh = ob.to_mesh()
+        prim_type = object_utils._detect_primitive_(ob)
+        get_normals = (prim_type == 'POLYGON_MESH')
+        (nverts, verts, P, N) = object_utils._get_mesh_(mesh, get_normals=get_normals)
+
+        if len(nverts) == 0 or _is_multi_material_(ob, mesh):
+            ob.to_mesh_clear()
+            return None
+
+        primvars = object_utils._get_mesh_primvars_(ob, mesh)
+        fingerprints = _get_mesh_fingerprints_(ob, mesh, prim_type, nverts, verts, P, N, primvars, False)
+        ob.to_mesh_clear()
+
+        rm = ob.renderman
+        return _get_fingerprint_(*fingerprints,
+                                rm.shading_override, rm.shadingrate, rm.watertight,
+                                rm.raytrace_override, rm.raytrace_tracedisplacements, rm.raytrace_autobias,
+                                rm.raytrace_bias, rm.raytrace_samplemotion, rm.displacementbound)
+
     def export_deform_sample(self, rman_sg_mesh, ob, time_samples, time_sample):
         mesh = None
         mesh = ob.to_mesh()
 
-        (nverts, verts, P, N) = object_utils._get_mesh_(mesh, get_normals=False)
+        # topology doesn't change between deformation samples, so we only
+        # need to pull the points from the mesh
+        P = object_utils._get_mesh_points_(mesh)
+        nm_pts = rman_sg_mesh.npoints
         
         # if this is empty continue:
-        if nverts == []:
+        if rman_sg_mesh.npolys < 1 or len(P) < nm_pts*3:
             ob.to_mesh_clear() 
             return None
 
-        nm_pts = int(len(P)/3)
-        rman_sg_mesh.sg_node.Define( len(nverts), nm_pts, len(verts) )
+        rman_sg_mesh.sg_node.Define( rman_sg_mesh.npolys, nm_pts, rman_sg_mesh.nverts )
         primvar = rman_sg_mesh.sg_node.GetPrimVars()
         
         if time_samples:        
             primvar.SetTimeSamples( time_samples )
 
-        pts = list( zip(*[iter(P)]*3 ) )
+        pts = P[:nm_pts*3].reshape(-1, 3).tolist()
         primvar.SetPointDetail(self.rman_scene.rman.Tokens.Rix.k_P, pts, "vertex", time_sample)
 
         rman_sg_mesh.sg_node.SetPrimVars(primvar)
@@ -185,6 +158,16 @@ class RmanMeshTranslator(RmanTranslator):
         ob.to_mesh_clear()         
 
 
+    def _set_sub_mesh_materials_(self, ob, rman_sg_mesh):
+        # bind the material of each slot of a multi-material mesh to its faceset
+        for mat_id, sg_sub_mesh in rman_sg_mesh.sg_sub_meshes.items():
+            mat = ob.data.materials[mat_id]
+            mat_handle = "material.%s" % mat.name
+            sg_material = None
+            if mat_handle in self.rman_scene.rman_materials:
+                sg_material = self.rman_scene.rman_materials[mat_handle]
+            sg_sub_mesh.SetMaterial(sg_material)
+
     def update(self, ob, rman_sg_mesh, input_mesh=None):
 
         mesh = input_mesh
@@ -197,24 +180,66 @@ class RmanMeshTranslator(RmanTranslator):
         (nverts, verts, P, N) = object_utils._get_mesh_(mesh, get_normals=get_normals)
         
         # if this is empty continue:
-        if nverts == []:
-            ob.to_mesh_clear()
+        if len(nverts) == 0:
+            if not input_mesh:
+                ob.to_mesh_clear()
             return None
 
         npolys = len(nverts) 
         npoints = int(len(P)/3)
         numnverts = len(verts)
 
+        primvars = object_utils._get_mesh_primvars_(ob, mesh)
+        is_multi_material = _is_multi_material_(ob, mesh)
+
+        # fingerprint what we are about to export. If nothing changed since the
+        # last update (ex: only a modifier display toggle or a material slot changed)
+        # skip the re-upload. If only the points moved, only send P (and N).
+        (topology_fingerprint, points_fingerprint, primvars_fingerprint) = \
+            _get_mesh_fingerprints_(ob, mesh, prim_type, nverts, verts, P, N, primvars, is_multi_material)
+
+        same_topology = (topology_fingerprint == rman_sg_mesh.topology_fingerprint and
+                        primvars_fingerprint == rman_sg_mesh.primvars_fingerprint)
+
+        if same_topology and points_fingerprint == rman_sg_mesh.points_fingerprint:
+            # the materials themselves may have been re-exported
+            self._set_sub_mesh_materials_(ob, rman_sg_mesh)
+            if not input_mesh:
+                ob.to_mesh_clear()
+            return None
+
+        rman_sg_mesh.topology_fingerprint = topology_fingerprint
+        rman_sg_mesh.points_fingerprint = points_fingerprint
+        rman_sg_mesh.primvars_fingerprint = primvars_fingerprint
+
+        if same_topology and not is_multi_material and not self.rman_scene.do_motion_blur:
+            # only the points changed, leave nvertices/vertices and
+            # the rest of the primvars alone
+            primvar = rman_sg_mesh.sg_node.GetPrimVars()
+            pts = P.reshape(-1, 3).tolist()
+            primvar.SetPointDetail(self.rman_scene.rman.Tokens.Rix.k_P, pts, "vertex")
+            if prim_type == "POLYGON_MESH":
+                primvar.SetNormalDetail(self.rman_scene.rman.Tokens.Rix.k_N, N.tolist(), "facevarying")
+            rman_sg_mesh.sg_node.SetPrimVars(primvar)
+            self._set_sub_mesh_materials_(ob, rman_sg_mesh)
+            if not input_mesh:
+                ob.to_mesh_clear()
+            return None
+
+        rman_sg_mesh.npolys = npolys
+        rman_sg_mesh.npoints = npoints
+        rman_sg_mesh.nverts = numnverts
+
         rman_sg_mesh.sg_node.Define( npolys, npoints, numnverts )
         primvar = rman_sg_mesh.sg_node.GetPrimVars()
         primvar.Clear()
 
-        pts = list( zip(*[iter(P)]*3 ) )
+        pts = P.reshape(-1, 3).tolist()
         primvar.SetPointDetail(self.rman_scene.rman.Tokens.Rix.k_P, pts, "vertex")
-        _get_primvars_(ob, mesh, primvar, "facevarying")   
+        _get_primvars_(ob, mesh, primvar, "facevarying", primvars=primvars)   
 
-        primvar.SetIntegerDetail(self.rman_scene.rman.Tokens.Rix.k_Ri_nvertices, nverts, "uniform")
-        primvar.SetIntegerDetail(self.rman_scene.rman.Tokens.Rix.k_Ri_vertices, verts, "facevarying")            
+        primvar.SetIntegerDetail(self.rman_scene.rman.Tokens.Rix.k_Ri_nvertices, nverts.tolist(), "uniform")
+        primvar.SetIntegerDetail(self.rman_scene.rman.Tokens.Rix.k_Ri_vertices, verts.tolist(), "facevarying")            
 
         if prim_type == "SUBDIVISION_MESH":
             rman_sg_mesh.is_subdiv = True
@@ -245,22 +270,17 @@ class RmanMeshTranslator(RmanTranslator):
         elif prim_type == "POLYGON_MESH":
             rman_sg_mesh.is_subdiv = False
             rman_sg_mesh.sg_node.SetScheme(None)
-            primvar.SetNormalDetail(self.rman_scene.rman.Tokens.Rix.k_N, N, "facevarying")            
+            primvar.SetNormalDetail(self.rman_scene.rman.Tokens.Rix.k_N, N.tolist(), "facevarying")            
 
-        if _is_multi_material_(ob, mesh):
+        rman_sg_mesh.sg_sub_meshes = dict()
+        if is_multi_material:
             material_ids = _get_material_ids(ob, mesh)
             for mat_id, faces in \
                 _get_mats_faces_(nverts, material_ids).items():
 
-                mat = ob.data.materials[mat_id]
-                mat_handle = "material.%s" % mat.name
-                sg_material = None
-                if mat_handle in self.rman_scene.rman_materials:
-                    sg_material = self.rman_scene.rman_materials[mat_handle]
-
                 if mat_id == 0:
                     primvar.SetIntegerArray(self.rman_scene.rman.Tokens.Rix.k_shade_faceset, faces, len(faces))
-                    rman_sg_mesh.sg_node.SetMaterial(sg_material)
+                    rman_sg_mesh.sg_sub_meshes[mat_id] = rman_sg_mesh.sg_node
                 else: 
                     sg_sub_mesh =  self.rman_scene.sg_scene.CreateMesh("")
                     pvars = sg_sub_mesh.GetPrimVars()
@@ -270,8 +290,9 @@ class RmanMeshTranslator(RmanTranslator):
                     pvars.Inherit(primvar)
                     pvars.SetIntegerArray(self.rman_scene.rman.Tokens.Rix.k_shade_faceset, faces, len(faces))
                     sg_sub_mesh.SetPrimVars(pvars)
-                    sg_sub_mesh.SetMaterial(sg_material)
                     rman_sg_mesh.sg_node.AddChild(sg_sub_mesh)                  
+                    rman_sg_mesh.sg_sub_meshes[mat_id] = sg_sub_mesh
+            self._set_sub_mesh_materials_(ob, rman_sg_mesh)
 
            
         #primvar.SetFloat(self.rman_scene.rman.Tokens.Rix.k_displacementbound_sphere, ob.renderman.displacementbound)
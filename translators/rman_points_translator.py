@@ -25,10 +25,10 @@ class RmanPointsTranslator(RmanTranslator):
         mesh = None
         mesh = ob.to_mesh()
 
-        (nverts, verts, P, N) = object_utils._get_mesh_(mesh, get_normals=False)
+        P = object_utils._get_mesh_points_(mesh)
         
         # if this is empty continue:
-        if nverts == []:
+        if len(P) == 0:
             ob.to_mesh_clear() 
             return None
 
@@ -41,7 +41,7 @@ class RmanPointsTranslator(RmanTranslator):
         if time_samples:        
             primvar.SetTimeSamples( time_samples )
 
-        pts = list( zip(*[iter(P)]*3 ) )
+        pts = P.reshape(-1, 3).tolist()
         primvar.SetPointDetail(self.rman_scene.rman.Tokens.Rix.k_P, pts, "vertex", time_sample)
 
         rman_sg_points.sg_node.SetPrimVars(primvar) 
@@ -54,7 +54,7 @@ class RmanPointsTranslator(RmanTranslator):
         if not mesh:
             mesh = ob.to_mesh()        
 
-        (nverts, verts, P, N) = object_utils._get_mesh_(mesh, get_normals=False)
+        P = object_utils._get_mesh_points_(mesh)
 
         npoints = int(len(P)/3)
         rman_sg_points.sg_node.Define(npoints)
@@ -63,7 +63,7 @@ class RmanPointsTranslator(RmanTranslator):
         primvar = rman_sg_points.sg_node.GetPrimVars()
         primvar.Clear()      
 
-        pts = list( zip(*[iter(P)]*3 ) )
+        pts = P.reshape(-1, 3).tolist()
         primvar.SetPointDetail(self.rman_scene.rman.Tokens.Rix.k_P, pts, "vertex")
 
         primvar.SetStringDetail("type", rm.primitive_point_type, "uniform")
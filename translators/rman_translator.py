@@ -78,13 +78,10 @@ class RmanTranslator(object):
             self.rman_scene.obj_hash[obj_id] = name
             attrs.SetInteger(self.rman_scene.rman.Tokens.Rix.k_identifier_id, obj_id)
 
-        obj_groups_str = "World"
-        obj_groups_str += "," + name
-        lpe_groups_str = "*"
-        for obj_group in self.rman_scene.bl_scene.renderman.object_groups:
-            if ob.name in obj_group.members.keys():
-                obj_groups_str += ',' + obj_group.name
-                lpe_groups_str += ',' + obj_group.name
+        light_links = self.rman_scene.get_light_link_resolver()
+        obj_groups = light_links.get_groups(ob)
+        obj_groups_str = ','.join(["World", name] + obj_groups)
+        lpe_groups_str = ','.join(["*"] + obj_groups)
 
         attrs.SetString(self.rman_scene.rman.Tokens.Rix.k_grouping_membership, obj_groups_str)
 
@@ -112,40 +109,7 @@ class RmanTranslator(object):
 
         
         # light linking
-        # get links this is a part of
-        ll_str = "obj_object>%s" % ob.name
-        lls = [ll for ll in self.rman_scene.bl_scene.renderman.ll if ll_str in ll.name]
-        # get links this is a group that is a part of
-        for group in self.rman_scene.bl_scene.renderman.object_groups:
-            if ob.name in group.members.keys():
-                ll_str = "obj_group>%s" % group.name
-                lls += [ll for ll in self.rman_scene.bl_scene.renderman.ll if ll_str in ll.name]
-
-        # for each light link do illuminates
-        exclude_subset = []
-        lightfilter_subset = []
-        for link in lls:
-            strs = link.name.split('>')
-
-            scene_lights = [l.name for l in self.rman_scene.bl_scene.objects if l.type == 'LIGHT']
-            light_names = [strs[1]] if strs[0] == "lg_light" else \
-                self.rman_scene.bl_scene.renderman.light_groups[strs[1]].members.keys()
-            if strs[0] == 'lg_group' and strs[1] == 'All':
-                light_names = scene_lights
-            for light_name in light_names:
-                if link.illuminate != "DEFAULT" and light_name in self.rman_scene.bl_scene.objects:
-                    light_ob = self.rman_scene.bl_scene.objects[light_name]
-                    light = light_ob.data
-                    if light.renderman.renderman_type == 'FILTER':
-                        # for each light this is a part of do enable light filter
-                        filter_name = light_name
-                        for light_nm in scene_lights:
-                            if filter_name in self.rman_scene.bl_scene.objects[light_nm].data.renderman.light_filters.keys():
-                                if link.illuminate == 'ON':
-                                    lightfilter_subset.append(filter_name)
-                    else:
-                        if not link.illuminate == 'ON':
-                            exclude_subset.append(light_name)
+        exclude_subset, lightfilter_subset = light_links.get_subsets(ob)
 
         if exclude_subset:
             attrs.SetString(self.rman_scene.rman.Tokens.Rix.k_lighting_excludesubset, ' '. join(exclude_subset) )
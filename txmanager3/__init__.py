@@ -41,7 +41,7 @@ import logging
 import traceback
 import os.path
 
-__all__ = ['core', 'ui', 'txparams', 'txfile']
+__all__ = ['core', 'ui', 'txparams', 'txfile', 'txcache', 'txstat']
 
 TX_MANAGER_VER = 1.0
 # possible file states
@@ -51,6 +51,8 @@ import threading
 import queue
 import platform
 import time
+import itertools
+from concurrent.futures import Future, wait, FIRST_COMPLETED
 from . import (
     txm_log,
     TxManagerError,
@@ -68,10 +70,13 @@ from . import (
     IMG_EXTENSIONS,
     TEX_EXTENSIONS)
 from .txfile import TxFile, _reset_rule_filecache
+from .txcache import TxCache
+from .txstat import StatCache
 
 # posix returns -SIGKILL and windows returns 1 (error)
 KILLED_SIGNALS = (1, -9)
-UNBLOCK_SEMAPHORE = threading.BoundedSemaphore()
+# memory we budget for each txmake process when choosing the number of workers.
+TXMAKE_WORKER_MEMORY = 1024 * 1024 * 1024
 
 
 def non_ascii(string):
@@ -146,124 +151,187 @@ class TxMakeOpts(object):
                                key, d)
 
 
-def tx_make_process(txmanager, queue, thread_idx):
+def tx_make_process(txmanager, work_queue, thread_idx):
     """Function executed by threads to convert images to textures with txmake.
 
+    Each task carries a Future that is resolved when the task is done, with a
+    dict holding the final item state and the conversion time in seconds.
+
     Args:
-    - queue (Queue.Queue): The task queue maintained by the main thread.
+    - work_queue (Queue.Queue): The task queue maintained by the main thread.
     """
     logger = txm_log()
     logger.debug('start')
-    while not queue.empty():
-        ui, txfile, txitem, args = queue.get()
-        infile = args[-2]
-        outfile = args[-1]
-
-        if txfile.is_rtxplugin:
-            queue.task_done()
-            return
+    while True:
+        try:
+            _, _, _, (ui, txfile, txitem, args, future) = work_queue.get_nowait()
+        except queue.Empty:
+            if unblock(txmanager, work_queue, thread_idx):
+                break
+            continue
+        if not future.set_running_or_notify_cancel():
+            # the task was flushed before we got to it.
+            work_queue.task_done()
+            continue
 
-        logger.debug('%r', args)
-        if not txfile.done_callback:
-            logger.warning('Unexpected done callback = %r: %s',
-                           txfile.done_callback, txfile.input_image)
-
-        txfile.set_item_state(txitem, STATE_PROCESSING)
-        txmanager.send_txmake_progress(txfile, txitem, txitem.state)
-        start_t = time.time()
-        err_msg = ''
-        win_os = (platform.system() == 'Windows')
-        sp_kwargs = {'stdin': subprocess.PIPE,
-                     'stdout': subprocess.PIPE,
-                     'stderr': subprocess.PIPE,
-                     'shell': False}
-        if win_os:
-            sp_kwargs['creationflags'] = subprocess.CREATE_NEW_PROCESS_GROUP
-            sp_kwargs['startupinfo'] = subprocess.STARTUPINFO()
-            sp_kwargs['startupinfo'].dwFlags |= subprocess.STARTF_USESHOWWINDOW
         try:
-            p = subprocess.Popen(args, **sp_kwargs)
+            result = tx_make_task(txmanager, thread_idx, txfile, txitem, args)
         except Exception as err:
-            logger.warning(' |_ failed to launch: %s\n    |_ args: %r',
-                           err, args)
-            txfile.set_item_state(txitem, STATE_ERROR)
-        else:
-            txmanager.subprocesses[thread_idx] = p
-            lo = p.stdout.readline()
-            le = p.stderr.readline()
-            while lo or le:
-                if lo:
-                    logger.debug(lo)
-                if le:
-                    logger.debug(le)
-                    err_msg += le
-                lo = p.stdout.readline()
-                le = p.stderr.readline()
-
-        time.sleep(1.0)
-        p.poll()    # get the return code
-
-        if os.path.exists(outfile):
-            stats = time.strftime(
-                '%Mm:%Ss', time.localtime(time.time() - start_t))
-            txfile.set_item_state(txitem, STATE_EXISTS)
-            logger.info('Converted in %s : %r', stats, outfile)
-
-            # check time stamp for future dated input files
-            # if time stamp is greater than "now", we
-            # give the outfile the same time stamp as the
-            # input outfile
-            now_time = time.time()
-            infile_time = os.path.getmtime(infile)
-            if infile_time > now_time:
-                logger.debug('Input file, %r, is from the future!', infile)
-                os.utime(outfile, (infile_time, infile_time))
-        else:
-            if p.returncode in KILLED_SIGNALS:
-                logger.debug('KILLED: %s', args)
-                txfile.set_item_state(txitem, STATE_IN_QUEUE)
-            else:
+            # always resolve the future, or txmake_all(blocking=True) would
+            # wait on it forever.
+            logger.error('Failed to process %r: %s', args[-2], err)
+            txmanager.subprocesses[thread_idx] = None
+            try:
                 txfile.set_item_state(txitem, STATE_ERROR)
-                txfile.error_msg += err_msg
-                logger.error('Failed to convert: %r', infile)
-                logger.error('  |__ args: %r', args)
-        txitem.update_file_size()
-        txfile.update_file_size()
-
-        # update txmanager and ui
-        txmanager.send_txmake_progress(txfile, txitem, txitem.state)
-        txmanager.subprocesses[thread_idx] = None
+                txmanager.send_txmake_progress(txfile, txitem, txitem.state)
+            except Exception as err:
+                logger.error('  |__ could not report the error: %s', err)
+            result = {'state': STATE_ERROR, 'time': 0.0}
 
         # mark task done in task queue
-        queue.task_done()
+        future.set_result(result)
+        work_queue.task_done()
 
     logger.debug('empty queue = done')
 
-    unblock(txmanager)
 
+def tx_make_task(txmanager, thread_idx, txfile, txitem, args):
+    """Convert one image, or fetch it from the texture cache.
+
+    Returns:
+        dict -- the final item 'state' and the conversion 'time'.
+    """
+    logger = txm_log()
+    infile = args[-2]
+    outfile = args[-1]
+
+    if txfile.is_rtxplugin:
+        return {'state': txitem.state, 'time': 0.0}
+
+    # hashing the source for the cache key reads the whole file, so it
+    # is done here rather than while queuing.
+    txitem.cache_key = None
+    if txmanager.cache:
+        # args are [txmake] + flags + [infile, outfile]
+        txitem.cache_key = txmanager.cache.get_key(infile, args[1:-2])
+        if txitem.cache_key and \
+                txmanager.cache.fetch(txitem.cache_key, outfile):
+            txmanager.stat_cache.invalidate(outfile)
+            txfile.set_item_state(txitem, STATE_EXISTS)
+            txitem.update_file_size()
+            txfile.update_file_size()
+            txmanager.send_txmake_progress(txfile, txitem, txitem.state)
+            logger.debug('%r found in cache', infile)
+            return {'state': txitem.state, 'time': 0.0}
+
+    logger.debug('%r', args)
+    if not txfile.done_callback:
+        logger.warning('Unexpected done callback = %r: %s',
+                       txfile.done_callback, txfile.input_image)
+
+    txfile.set_item_state(txitem, STATE_PROCESSING)
+    txmanager.send_txmake_progress(txfile, txitem, txitem.state)
+    start_t = time.time()
+    err_msg = ''
+    returncode = None
+    win_os = (platform.system() == 'Windows')
+    sp_kwargs = {'stdin': subprocess.PIPE,
+                 'stdout': subprocess.PIPE,
+                 'stderr': subprocess.PIPE,
+                 'universal_newlines': True,
+                 'shell': False}
+    if win_os:
+        sp_kwargs['creationflags'] = subprocess.CREATE_NEW_PROCESS_GROUP
+        sp_kwargs['startupinfo'] = subprocess.STARTUPINFO()
+        sp_kwargs['startupinfo'].dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    try:
+        if os.path.exists(outfile) and os.stat(outfile).st_nlink > 1:
+            # don't overwrite a texture hard-linked from the cache.
+            os.remove(outfile)
+        p = subprocess.Popen(args, **sp_kwargs)
+    except Exception as err:
+        logger.warning(' |_ failed to launch: %s\n    |_ args: %r',
+                       err, args)
+        txfile.set_item_state(txitem, STATE_ERROR)
+    else:
+        txmanager.subprocesses[thread_idx] = p
+        # communicate() drains both pipes concurrently, so txmake can't
+        # block on a full stderr pipe while we wait on stdout.
+        lo, le = p.communicate()
+        returncode = p.returncode
+        if lo:
+            logger.debug(lo)
+        if le:
+            logger.debug(le)
+            err_msg += le
+
+    elapsed = time.time() - start_t
+    if os.path.exists(outfile):
+        stats = time.strftime('%Mm:%Ss', time.localtime(elapsed))
+        txfile.set_item_state(txitem, STATE_EXISTS)
+        logger.info('Converted in %s : %r', stats, outfile)
+
+        # check time stamp for future dated input files
+        # if time stamp is greater than "now", we
+        # give the outfile the same time stamp as the
+        # input outfile
+        now_time = time.time()
+        infile_time = os.path.getmtime(infile)
+        if infile_time > now_time:
+            logger.debug('Input file, %r, is from the future!', infile)
+            os.utime(outfile, (infile_time, infile_time))
+
+        if txmanager.cache and txitem.cache_key:
+            txmanager.cache.store(txitem.cache_key, outfile)
+    elif txitem.state != STATE_ERROR:
+        if returncode in KILLED_SIGNALS:
+            logger.debug('KILLED: %s', args)
+            txfile.set_item_state(txitem, STATE_IN_QUEUE)
+        else:
+            txfile.set_item_state(txitem, STATE_ERROR)
+            txfile.error_msg += err_msg
+            logger.error('Failed to convert: %r', infile)
+            logger.error('  |__ args: %r', args)
+    txmanager.stat_cache.invalidate(outfile)
+    txitem.update_file_size()
+    txfile.update_file_size()
+
+    # update txmanager and ui
+    txmanager.send_txmake_progress(txfile, txitem, txitem.state)
+    txmanager.subprocesses[thread_idx] = None
+    txmanager.task_times.append((infile, elapsed))
+
+    return {'state': txitem.state, 'time': elapsed}
+
+
+def unblock(txmanager, work_queue, thread_idx):
+    """Release this worker's slot and set the queue_is_done event if this was
+    the last running worker. This will unblock anyone waiting on queue_is_done.
 
-def unblock(txmanager):
-    """Check if there are any txmanager worker threads alive and set the
-    queue_is_done event if this is the last one. This will unblock txmake_all()
-    if the blocking flag had been set.
+    The queue is checked again under the lock, so that a task queued while this
+    worker was exiting is either picked up here or gets a new worker from
+    TxManager._start_workers().
 
     Arguments:
         txmanager {TxManager} -- The main txmanager object.
+        work_queue {Queue.Queue} -- The task queue.
+        thread_idx {int} -- The worker's slot.
+
+    Returns:
+        bool -- True if the worker should exit.
     """
-    UNBLOCK_SEMAPHORE.acquire()
-    # avoid race condition where there are two final threads both finishing
-    # at exact same time - it's possible that the second one will get here
-    # before the first has finished exiting, so we'll still see two threads
-    # and queue_is_done won't get set, leading to a hang where txmake_all waits
-    # on queue_is_done. This sleep encourages that second to last thread to exit
-    time.sleep(0.1)
-    num_threads = 0
-    for thread in threading.enumerate():
-        if 'txmgr_worker_' in thread.name:
-            num_threads += 1
-    if num_threads <= 1:
-        txmanager.queue_is_done.set()
-    UNBLOCK_SEMAPHORE.release()
+    with txmanager.workers_lock:
+        if not work_queue.empty():
+            return False
+        txmanager.running_slots.discard(thread_idx)
+        is_last = not txmanager.running_slots
+        if is_last:
+            txmanager.queue_is_done.set()
+    if is_last and txmanager.cache:
+        txm_log().debug('texture cache: %d hits, %d misses',
+                        txmanager.cache.hits, txmanager.cache.misses)
+        txmanager.cache.save_index()
+    return True
 
 
 class TxManager(object):
@@ -277,7 +345,8 @@ class TxManager(object):
         - ui:         A TxManagerUI() instance that will be called on refreshes.
                       Default to None.
         - num_workers: The number of txmake processes that should be launched.
-                      Defaults to 2.
+                      Defaults to 0, which picks a number based on the core
+                      count and the available memory.
         - rmantree:   The full path to the renderman distribution. Used to locate txmake.
         - fallback_path: A fallback path if the current input texture dir is
                          writable.
@@ -287,18 +356,30 @@ class TxManager(object):
                               done converting textures.
         - host_token_resolver_func: Function the texture manager should use to resolve
                                     any host app sepcific tokens.
+        - cache_path: An optional directory where converted textures are cached
+                      by content, to be re-used across scenes and machines.
+        - cache_max_size: The maximum size of the cache in bytes. 0 means no
+                          limit.
+        - host_priority_func: Optional callback returning the priority of a
+                              TxFile given its node ids. Textures with a
+                              higher priority are converted first.
         """
         _reset_rule_filecache()
         self.log = txm_log()
         self.is_valid = len(kwargs) > 0
         self.ui = kwargs.get('ui', None)
-        self.num_workers = kwargs.get('num_workers', 2)
+        self.num_workers = kwargs.get('num_workers', 0)
         self.fallback_path = kwargs.get('fallback_path', None)
         self.fallback_always = kwargs.get('fallback_always', False)
         self.host_prefs_func = kwargs.get('host_prefs_func', None)
         self.host_tex_done_func = kwargs.get('host_tex_done_func', None)
         self.host_token_resolver_func = kwargs.get('host_token_resolver_func', None)
+        self.host_priority_func = kwargs.get('host_priority_func', None)
         self.tex_extensions = kwargs.get('texture_extensions', TEX_EXTENSIONS)
+        self.cache_path = kwargs.get('cache_path', None)
+        self.cache_max_size = kwargs.get('cache_max_size', 0)
+        self.cache = None
+        self.stat_cache = StatCache()
         self._id_to_txfile = dict()
         self._txfile_to_ids = dict()
         self._src_path_to_txfile = dict()
@@ -313,19 +394,28 @@ class TxManager(object):
 
         # read prefs
         self.read_host_prefs()
+        self._setup_cache()
 
         # setup queue
-        self.workQueue = queue.Queue()
+        # tasks are (priority, size, sequence, task) tuples, so that high
+        # priority and small textures come out first.
+        self.workQueue = queue.PriorityQueue()
+        self._task_counter = itertools.count()
         self.paused = False
         self.threads = []
         self.subprocesses = []
         self.queue_is_done = threading.Event()
+        self.workers_lock = threading.Lock()
+        self.running_slots = set()
+        # (input image, seconds) for each conversion since the last txmake_all()
+        self.task_times = []
         self.log.debug('TxManager initialized : %s', self)
 
     def read_host_prefs(self):
         """Execute the function provided by the host to return a dict overriding
         internal values.
-        This is used to set num_workers and fallback_path.
+        This is used to set num_workers, fallback_path, cache_path and
+        cache_max_size.
         """
         if self.host_prefs_func:
             for key, val in self.host_prefs_func().items():
@@ -333,6 +423,17 @@ class TxManager(object):
             self.log.debug('|_ num_workers = %r', self.num_workers)
             self.log.debug('|_ fallback_path = %r', self.fallback_path)
 
+    def _setup_cache(self):
+        """Create the texture cache, or drop it if the cache path was unset.
+        Call read_host_prefs() first: the host can change cache_path and
+        cache_max_size through host_prefs_func."""
+        if not self.cache_path:
+            self.cache = None
+        elif self.cache is None or self.cache.cache_dir != self.cache_path:
+            self.cache = TxCache(self.cache_path, max_size=self.cache_max_size)
+        else:
+            self.cache.max_size = self.cache_max_size
+
     def pickle(self):
         """Pickle the current state of TxMananger
 
@@ -621,6 +722,7 @@ class TxManager(object):
             if not os.path.exists(self.fallback_path):
                 try:
                     os.makedirs(self.fallback_path)
+                    self.stat_cache.forget_dir(self.fallback_path)
                 except OSError as err:
                     raise TxManagerError(
                         'Could not create Fallback path: %r -> %s' %
@@ -633,35 +735,61 @@ class TxManager(object):
             # update the output tex path
             txfile.repath_outputs(self.fallback_path)
 
+    def get_num_workers(self):
+        """Return the number of txmake processes to run. If num_workers is
+        not set, use half the cores, but no more than the available memory can
+        accommodate.
+
+        Returns:
+            int -- the number of workers
+        """
+        if self.num_workers:
+            return self.num_workers
+        num_workers = max(1, (os.cpu_count() or 2) // 2)
+        try:
+            avail_mem = os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+        except (AttributeError, ValueError, OSError):
+            # not available on this platform
+            return num_workers
+        return max(1, min(num_workers, avail_mem // TXMAKE_WORKER_MEMORY))
+
+    def _get_priority(self, txfile):
+        if not self.host_priority_func:
+            return 0
+        try:
+            return self.host_priority_func(self._txfile_to_ids.get(txfile, []))
+        except Exception as err:
+            self.log.warning('host_priority_func FAILED = %r', str(err))
+            return 0
+
     def _start_workers(self):
         self.log.debug('Go !')
         # launch our workers
-        numThreads = min(self.workQueue.qsize(), self.num_workers)
+        numThreads = min(self.workQueue.qsize(), self.get_num_workers())
         self.log.debug('  |_ creating %d workers', numThreads)
-        self.subprocesses = [None] * numThreads
-        for i in range(numThreads):
-            # make sure we don't create new threads if they are still alive.
-            try:
-                p = self.threads[i]
-            except:
-                pass
-            else:
-                if p.is_alive():
+        if len(self.subprocesses) < numThreads:
+            self.subprocesses.extend([None] * (numThreads - len(self.subprocesses)))
+        with self.workers_lock:
+            for i in range(numThreads):
+                # make sure we don't create new threads if the slot is still
+                # running. A worker only gives up its slot once the queue is
+                # empty, so it will pick up the new tasks.
+                if i in self.running_slots:
                     self.log.debug('  |_ txmgr_worker_%d is alive: skip...', i)
                     continue
+                # we need to create this thread now.
+                self.log.debug('  |_ create txmgr_worker_%d', i)
+                p = threading.Thread(target=tx_make_process,
+                                     args=(self, self.workQueue, i),
+                                     name='txmgr_worker_%d' % i)
+                # store threads in our pool
+                if i >= len(self.threads):
+                    self.threads.append(p)
                 else:
-                    p.join()
-            # we need to create this thread now.
-            self.log.debug('  |_ create txmgr_worker_%d', i)
-            p = threading.Thread(target=tx_make_process,
-                                 args=(self, self.workQueue, i),
-                                 name='txmgr_worker_%d' % i)
-            # store threads in our pool
-            if i >= len(self.threads):
-                self.threads.append(p)
-            else:
-                self.threads[i] = p
-            p.start()
+                    self.threads[i] = p
+                self.running_slots.add(i)
+                self.queue_is_done.clear()
+                p.start()
 
         self.log.debug('startWorkers done')
 
@@ -671,14 +799,32 @@ class TxManager(object):
         Keyword Arguments:
             start_queue {bool} -- Start the task queue (default: {True})
             blocking {bool} -- Block until the task queue is empty (default: {True})
+
+        Returns:
+            list -- a Future for each queued txmake task. Its result is a dict
+                    with the final item 'state' and the conversion 'time'.
         """
         self.log.debug('TxMakeAll starting...')
-        if blocking:
-            self.queue_is_done.clear()
+        futures = []
+        self.task_times = []
 
         # update prefs to get the number of workers and the fallback path.
         self.read_host_prefs()
+        self._setup_cache()
         numTasks = 0
+
+        # list the directories of all the candidate textures once, instead of
+        # stat'ing each file.
+        to_check = [txfile for txfile in self.txfile_list
+                    if txfile.state not in TXMAKE_SKIP_CONDITION]
+        dirs = set()
+        for txfile in to_check:
+            for img, item in txfile.tex_dict.items():
+                dirs.add(os.path.dirname(img))
+                dirs.add(os.path.dirname(item.outfile))
+        self.stat_cache.refresh(dirs)
+        hits, misses = self.stat_cache.hits, self.stat_cache.misses
+
         for txfile in self.txfile_list:
             # skip queued and processing txfiles
             if txfile.state in TXMAKE_SKIP_CONDITION:
@@ -686,7 +832,7 @@ class TxManager(object):
                                txfile.input_image, STATE_AS_STR[txfile.state])
                 continue
             # validate all output files
-            txfile.check_dirty()
+            txfile.check_dirty(stat_cache=self.stat_cache)
             if txfile.is_dirty():
                 # one or more textures need to be generated.
                 self.log.debug('  |_ %r is dirty', txfile.input_image)
@@ -700,6 +846,7 @@ class TxManager(object):
                 all_flags = self.txmakeopts.get_opts_as_list() + \
                     txfile.get_params().get_params_as_list()
 
+                txfile_tasks = []
                 for img, item in txfile.tex_dict.items():
 
                     # skip to the next if the texture is available.
@@ -709,7 +856,7 @@ class TxManager(object):
                         continue
 
                     # skip if the source file doesn't exist
-                    if not os.path.exists(item.infile):
+                    if not self.stat_cache.isfile(item.infile):
                         txfile.set_item_state(item, STATE_ERROR)
                         self.log.debug(
                             '     |_ source file %r is missing: skip...',
@@ -724,10 +871,26 @@ class TxManager(object):
                     # update state to queued
                     txfile.set_item_state(item, STATE_IN_QUEUE)
 
-                    self.log.debug('     |_ add to work queue: %r', img)
-                    self.workQueue.put([self.ui, txfile, item, argv])
+                    future = Future()
+                    txfile_tasks.append([self.ui, txfile, item, argv, future])
+                    futures.append(future)
                     numTasks += 1
 
+                # all the textures of a txfile are queued together and ordered
+                # by their total size, so that each txfile is done as early as
+                # possible and small textures don't wait on a huge one.
+                if txfile_tasks:
+                    priority = self._get_priority(txfile)
+                    size = 0
+                    for task in txfile_tasks:
+                        # served by the stat cache, which listed the source
+                        # directory when checking the txfile
+                        size += self.stat_cache.get_size(task[2].infile) or 0
+                    for task in txfile_tasks:
+                        self.log.debug('     |_ add to work queue: %r', task[3][-2])
+                        self.workQueue.put((-priority, size,
+                                            next(self._task_counter), task))
+
                 # add callbacks to notify nodes
                 if self.host_tex_done_func:
                     node_ids = self._txfile_to_ids[txfile]
@@ -737,32 +900,41 @@ class TxManager(object):
                                    self.host_tex_done_func)
 
         self.log.debug('  |_ %d tasks', numTasks)
-
+        if to_check:
+            self.log.info('Checked %d textures in %d directories: %d stat cache '
+                          'hits, %d misses', len(to_check), len(dirs),
+                          self.stat_cache.hits - hits,
+                          self.stat_cache.misses - misses)
         if start_queue and numTasks > 0:
             self.log.debug('  |_ Starting work queue processing')
             self._start_workers()
 
         # When the blocking flag is set, we wait until all tasks are done and
-        # output progress.
-        # Note: workeQueue.qsize() may already be empty at this point,
-        # because the work has been popped off the queue, but isn't actually
-        # done yet, so we still need to wait in this loop until queue_is_done
-        # has been set.
-        if blocking and numTasks:
+        # output progress. Each task resolves its future as soon as txmake
+        # returns, so we only wake up to report progress.
+        if blocking and start_queue and numTasks:
             self.log.info('Processing %d txmake tasks using %d workers...',
-                          numTasks, self.num_workers)
+                          numTasks, min(numTasks, self.get_num_workers()))
             ntasks = float(numTasks)
             t_start = time.time()
-            while not self.queue_is_done.is_set():
-                self.queue_is_done.wait(2.0)
-                # approximation: there is at least one thread still alive, so we
-                # add one to show that at least one worker is still active.
-                num_done = min(self.workQueue.qsize() + 1, numTasks)
-                percent = 100.0 - (float(num_done) / ntasks * 100.0)
-                print(('R90000%5d%%' % percent), file=sys.stderr)
-            self.log.info('%s texture conversions tasks done in %s !', numTasks,
+            pending = set(futures)
+            last_percent = -1
+            while pending:
+                _, pending = wait(pending, timeout=2.0,
+                                  return_when=FIRST_COMPLETED)
+                percent = int(100.0 - (float(len(pending)) / ntasks * 100.0))
+                if percent != last_percent:
+                    print(('R90000%5d%%' % percent), file=sys.stderr)
+                    last_percent = percent
+            txmake_time = sum([t for f, t in self.task_times])
+            self.log.info('%s texture conversions tasks done in %s (%s in txmake) !',
+                          numTasks,
+                          time.strftime('%Mm %Ss',
+                                        time.localtime(time.time() - t_start)),
                           time.strftime('%Mm %Ss',
-                                        time.localtime(time.time() - t_start)))
+                                        time.localtime(txmake_time)))
+
+        return futures
 
     def notify_host(self, txfile, force=False):
         if not self.host_tex_done_func:
@@ -778,8 +950,12 @@ class TxManager(object):
             txfile.emit_done_callback(force=force)
 
     def flush_queue(self):
-        while self.workQueue.qsize():
-            self.workQueue.get()
+        while True:
+            try:
+                task = self.workQueue.get_nowait()
+            except queue.Empty:
+                break
+            task[-1][-1].cancel()
             self.workQueue.task_done()
         # kill workers
         for process in self.subprocesses:
@@ -792,9 +968,11 @@ class TxManager(object):
                 self.log.info('Failed to kill %s: %s (it may happen)',
                               process.pid, err)
             else:
-                time.sleep(0.25)
                 self.log.info('Killed txmake with pid %s', process.pid)
-        time.sleep(0.25)
+        # wait for the workers to notice their txmake process is gone.
+        for thread in self.threads:
+            if thread.is_alive() and thread is not threading.current_thread():
+                thread.join(1.0)
 
     def all_textures_available(self):
         return self.workQueue.qsize() == 0
@@ -806,6 +984,7 @@ class TxManager(object):
         self._txfile_to_ids = dict()
         self._src_path_to_txfile = dict()
         self.paused = False
+        self.stat_cache.reset()
         _reset_rule_filecache()
 
     def file_size(self):
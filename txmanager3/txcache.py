@@ -0,0 +1,244 @@
+"""
+A content-addressed cache of converted textures, that can be shared across
+scenes and machines.
+"""
+
+# pylint: disable=invalid-name,W0703,missing-docstring
+import os
+import json
+import shutil
+import hashlib
+import platform
+import threading
+from . import txm_log
+
+# size of the chunks read when hashing source images.
+HASH_CHUNK_SIZE = 1024 * 1024
+CACHE_VERSION = 1
+
+
+class TxCache(object):
+    """A directory of textures keyed by the content hash of their source
+    image and the txmake flags used to convert them.
+
+    Textures are stored as <cache_dir>/<key[:2]>/<key>.tex and a hit is
+    resolved by hard-linking (or copying, if linking fails) the cached file to
+    the expected output path, so no conversion is needed.
+
+    Hashing source images is expensive, so each host keeps an index file in the
+    cache directory mapping a source path, mtime and size to its content hash.
+    Unchanged files are never hashed twice. The index is per host so that
+    machines sharing the cache never write to the same file.
+
+    The cached textures' mtime is bumped on every hit and, when max_size is
+    set, the least recently used textures are evicted once the cache grows
+    past it.
+    """
+
+    def __init__(self, cache_dir, max_size=0):
+        """
+        Arguments:
+            cache_dir {str} -- the cache directory. It will be created if needed.
+
+        Keyword Arguments:
+            max_size {int} -- the maximum cache size in bytes. 0 means no limit.
+        """
+        self.log = txm_log()
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.lock = threading.RLock()
+        self.index_file = os.path.join(
+            cache_dir, 'index_%s.json' % platform.node())
+        self.source_index = dict()
+        self.hits = 0
+        self.misses = 0
+        self._cache_size = None
+        self._index_dirty = False
+        if not os.path.exists(cache_dir):
+            try:
+                os.makedirs(cache_dir)
+            except OSError as err:
+                self.log.error('Could not create texture cache %r: %s',
+                               cache_dir, err)
+        self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.index_file, 'r') as fhdl:
+                data = json.load(fhdl)
+        except (OSError, ValueError):
+            return
+        if data.get('version', 0) != CACHE_VERSION:
+            return
+        self.source_index = data.get('sources', dict())
+
+    def save_index(self):
+        """Write the source hash index, if it has changed."""
+        with self.lock:
+            if not self._index_dirty:
+                return
+            tmp_file = '%s.%d.tmp' % (self.index_file, os.getpid())
+            try:
+                with open(tmp_file, 'w') as fhdl:
+                    json.dump({'version': CACHE_VERSION,
+                               'sources': self.source_index}, fhdl)
+                os.replace(tmp_file, self.index_file)
+            except OSError as err:
+                self.log.warning('Could not write texture cache index %r: %s',
+                                 self.index_file, err)
+            else:
+                self._index_dirty = False
+
+    def source_hash(self, infile):
+        """Return the content hash of a source image, re-using the index if
+        the file hasn't changed.
+
+        Arguments:
+            infile {str} -- path to the source image
+
+        Returns:
+            str -- the hex digest or None if the file can't be read
+        """
+        try:
+            stat = os.stat(infile)
+        except OSError:
+            return None
+        with self.lock:
+            entry = self.source_index.get(infile, None)
+            if entry and entry['mtime'] == stat.st_mtime and \
+                    entry['size'] == stat.st_size:
+                return entry['hash']
+
+        sha = hashlib.sha1()
+        try:
+            with open(infile, 'rb') as fhdl:
+                for chunk in iter(lambda: fhdl.read(HASH_CHUNK_SIZE), b''):
+                    sha.update(chunk)
+        except OSError as err:
+            self.log.warning('Could not hash %r: %s', infile, err)
+            return None
+        digest = sha.hexdigest()
+        with self.lock:
+            self.source_index[infile] = {'mtime': stat.st_mtime,
+                                         'size': stat.st_size,
+                                         'hash': digest}
+            self._index_dirty = True
+        return digest
+
+    def get_key(self, infile, flags):
+        """Return the cache key for a source image converted with the
+        given txmake flags.
+
+        Arguments:
+            infile {str} -- path to the source image
+            flags {list} -- txmake flags
+
+        Returns:
+            str -- the key or None if the source can't be hashed
+        """
+        digest = self.source_hash(infile)
+        if digest is None:
+            return None
+        sha = hashlib.sha1(digest.encode('utf-8'))
+        sha.update('\0'.join([str(f) for f in flags]).encode('utf-8'))
+        return sha.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + '.tex')
+
+    def _link_or_copy(self, src, dst):
+        if os.path.exists(dst):
+            os.remove(dst)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+
+    def fetch(self, key, outfile):
+        """Put the cached texture for key at outfile.
+
+        Returns:
+            bool -- True on a cache hit.
+        """
+        entry = self._entry_path(key)
+        if not os.path.isfile(entry):
+            self.misses += 1
+            return False
+        try:
+            self._link_or_copy(entry, outfile)
+        except OSError as err:
+            self.log.warning('Could not fetch %r from texture cache: %s',
+                             outfile, err)
+            self.misses += 1
+            return False
+        try:
+            # the mtime is our LRU clock.
+            os.utime(entry, None)
+        except OSError:
+            # read-only cache
+            pass
+        self.hits += 1
+        self.log.debug('cache hit: %r -> %r', entry, outfile)
+        return True
+
+    def store(self, key, outfile):
+        """Add a freshly converted texture to the cache."""
+        entry = self._entry_path(key)
+        if os.path.isfile(entry):
+            return
+        entry_dir = os.path.dirname(entry)
+        tmp_entry = '%s.%s.%d.tmp' % (entry, platform.node(), os.getpid())
+        try:
+            if not os.path.exists(entry_dir):
+                os.makedirs(entry_dir, exist_ok=True)
+            shutil.copy2(outfile, tmp_entry)
+            os.replace(tmp_entry, entry)
+            os.utime(entry, None)
+        except OSError as err:
+            self.log.warning('Could not add %r to texture cache: %s',
+                             outfile, err)
+            return
+        self.log.debug('cache store: %r -> %r', outfile, entry)
+        with self.lock:
+            if self._cache_size is not None:
+                self._cache_size += os.path.getsize(entry)
+            self.evict()
+
+    def _scan(self):
+        entries = []
+        for sub in os.scandir(self.cache_dir):
+            if not sub.is_dir():
+                continue
+            for f in os.scandir(sub.path):
+                if f.name.endswith('.tex'):
+                    stat = f.stat()
+                    entries.append((stat.st_mtime, stat.st_size, f.path))
+        return entries
+
+    def evict(self):
+        """Remove the least recently used textures until the cache is
+        smaller than max_size."""
+        if not self.max_size:
+            return
+        with self.lock:
+            if self._cache_size is not None and \
+                    self._cache_size <= self.max_size:
+                return
+            try:
+                entries = self._scan()
+            except OSError as err:
+                self.log.warning('Could not scan texture cache: %s', err)
+                return
+            cache_size = sum([size for _, size, _ in entries])
+            entries.sort()
+            for _, size, path in entries:
+                if cache_size <= self.max_size:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    # may already be evicted by another host.
+                    continue
+                cache_size -= size
+                self.log.debug('cache evict: %r', path)
+            self._cache_size = cache_size
@@ -83,6 +83,8 @@ class TxItem(object):
         self.state = STATE_IS_TEX if istex else STATE_UNKNOWN
         self.input_timestamp = os.path.getmtime(filepath)
         self.file_size = 0
+        # key of this texture in the TxCache, if any.
+        self.cache_key = None
         self.update_file_size()
 
     def __eq__(self, other):
@@ -195,9 +197,12 @@ class TxFile(object):
         # check the existence of the texture and update the state.
         self.check_dirty()
 
-    def _check_if_input_exists(self):
+    def _check_if_input_exists(self, stat_cache=None):
         """Check if the input image exists on disk.
 
+        Arguments:
+        - stat_cache {StatCache} -- optional cache of directory listings.
+
         Returns:
         - True if image exists, False otherwise
         """
@@ -218,7 +223,11 @@ class TxFile(object):
             resolved_path = self.input_image
             if self.host_token_resolver_func:
                 resolved_path = self.host_token_resolver_func(resolved_path)
-            if not os.path.exists(resolved_path):
+            if stat_cache:
+                exists = stat_cache.isfile(resolved_path)
+            else:
+                exists = os.path.exists(resolved_path)
+            if not exists:
                 self.state = STATE_INPUT_MISSING
                 self.dirty = False
                 return False
@@ -413,7 +422,7 @@ class TxFile(object):
         """
         return self.dirty
 
-    def check_dirty(self, force_check=False):
+    def check_dirty(self, force_check=False, stat_cache=None):
         """
         Check the file's state and returns True if it needs to be sent to the
         txmake queue.
@@ -428,6 +437,8 @@ class TxFile(object):
         Arguments:
             - force_check {bool} -- ignore the dirty member var and force a check
                                     of input files
+            - stat_cache {StatCache} -- optional cache of directory listings used
+                                        instead of stat'ing each file.
 
         """
 
@@ -445,7 +456,7 @@ class TxFile(object):
             return self.dirty
 
         # re-check if the input image is missing
-        if not self._check_if_input_exists():
+        if not self._check_if_input_exists(stat_cache=stat_cache):
             return False
         else:
             # input image exists now, check if tex_dict
@@ -475,7 +486,12 @@ class TxFile(object):
                     self.log.debug("dirty: reprocess %r", in_img)
                     continue
 
-                if not os.path.isfile(item.outfile):
+                if stat_cache:
+                    out_img_time = stat_cache.get_mtime(item.outfile)
+                else:
+                    out_img_time = os.path.getmtime(item.outfile) \
+                        if os.path.isfile(item.outfile) else None
+                if out_img_time is None:
                     item.state = STATE_MISSING
                     self.state = STATE_MISSING
                     self.dirty = True
@@ -486,8 +502,11 @@ class TxFile(object):
                     item.state = STATE_EXISTS
                     self.log.debug("clean: exist %r", in_img)
 
-                in_img_time = os.path.getmtime(in_img)
-                out_img_time = os.path.getmtime(item.outfile)
+                in_img_time = None
+                if stat_cache:
+                    in_img_time = stat_cache.get_mtime(in_img)
+                if in_img_time is None:
+                    in_img_time = os.path.getmtime(in_img)
                 now_time = time.time()
 
                 if in_img_time > out_img_time:
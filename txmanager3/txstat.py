@@ -0,0 +1,180 @@
+"""
+A session cache of directory listings used to check the state of many
+textures without listing their directories over and over.
+"""
+
+# pylint: disable=invalid-name,W0703,missing-docstring
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from . import txm_log
+
+# maximum number of directories scanned in parallel. Remote filesystems have
+# a high latency per call, so it pays to have several scans in flight.
+MAX_SCAN_THREADS = 16
+
+
+class StatCache(object):
+    """Caches the listing of directories containing textures.
+
+    Each directory is listed once with os.scandir, which tells files apart
+    without a stat call on most platforms. Only the files we are asked about
+    are stat'ed after that, once each, and every lookup is then served from
+    memory. On Windows the listing already holds the stat results, so they are
+    kept as is.
+
+    Directories that don't exist are remembered until the next refresh(), or
+    until invalidate() is called for a path inside them.
+    """
+
+    def __init__(self):
+        self.log = txm_log()
+        self.lock = threading.Lock()
+        # dirpath -> {name: (mtime, size), or None until it is stat'ed}
+        self._dirs = dict()
+        self._missing_dirs = set()
+        self.hits = 0
+        self.misses = 0
+
+    def _scan_dir(self, dirpath):
+        entries = dict()
+        try:
+            with os.scandir(dirpath) as it:
+                for entry in it:
+                    try:
+                        if not entry.is_file():
+                            continue
+                        if os.name == 'nt':
+                            st = entry.stat()
+                            entries[entry.name] = (st.st_mtime, st.st_size)
+                        else:
+                            entries[entry.name] = None
+                    except OSError:
+                        continue
+        except FileNotFoundError:
+            return None
+        except OSError as err:
+            self.log.debug('Failed to scan %r: %s', dirpath, err)
+            return None
+        return entries
+
+    def _store(self, dirpath, entries):
+        with self.lock:
+            if entries is None:
+                self._missing_dirs.add(dirpath)
+                self._dirs.pop(dirpath, None)
+            else:
+                self._missing_dirs.discard(dirpath)
+                self._dirs[dirpath] = entries
+
+    def refresh(self, dirs):
+        """Re-read the listing of the given directories, in parallel.
+        Directories found missing by an earlier refresh are checked again.
+
+        Arguments:
+            dirs {iterable} -- directory paths
+        """
+        dirs = list(set(dirs))
+        if not dirs:
+            return
+        if len(dirs) == 1:
+            self._store(dirs[0], self._scan_dir(dirs[0]))
+            return
+        num_threads = min(MAX_SCAN_THREADS, len(dirs))
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            for dirpath, entries in zip(dirs, executor.map(self._scan_dir, dirs)):
+                self._store(dirpath, entries)
+
+    def _get_entries(self, dirpath):
+        with self.lock:
+            if dirpath in self._missing_dirs:
+                self.hits += 1
+                return None
+            entries = self._dirs.get(dirpath, None)
+            if entries is not None:
+                self.hits += 1
+                return entries
+            self.misses += 1
+        entries = self._scan_dir(dirpath)
+        self._store(dirpath, entries)
+        return entries
+
+    def _get_stat(self, path):
+        dirpath, name = os.path.split(path)
+        entries = self._get_entries(dirpath)
+        if entries is None or name not in entries:
+            return None
+        result = entries[name]
+        if result is not None:
+            return result
+        # listed but not stat'ed yet
+        try:
+            st = os.stat(path)
+            result = (st.st_mtime, st.st_size)
+        except OSError:
+            result = None
+        with self.lock:
+            if result is None:
+                entries.pop(name, None)
+            else:
+                entries[name] = result
+        return result
+
+    def get_mtime(self, path):
+        """Return the mtime of a file or None if it doesn't exist.
+
+        Arguments:
+            path {str} -- path to a file
+        """
+        st = self._get_stat(path)
+        if st is None:
+            return None
+        return st[0]
+
+    def get_size(self, path):
+        """Return the size of a file or None if it doesn't exist.
+
+        Arguments:
+            path {str} -- path to a file
+        """
+        st = self._get_stat(path)
+        if st is None:
+            return None
+        return st[1]
+
+    def isfile(self, path):
+        """Check the directory listing only, the file isn't stat'ed."""
+        dirpath, name = os.path.split(path)
+        entries = self._get_entries(dirpath)
+        return entries is not None and name in entries
+
+    def invalidate(self, path):
+        """Update the cached entry of a file we just wrote or deleted."""
+        dirpath, name = os.path.split(path)
+        try:
+            st = os.stat(path)
+            result = (st.st_mtime, st.st_size)
+        except OSError:
+            result = None
+        with self.lock:
+            self._missing_dirs.discard(dirpath)
+            entries = self._dirs.get(dirpath, None)
+            if entries is None:
+                return
+            if result is None:
+                entries.pop(name, None)
+            else:
+                entries[name] = result
+
+    def forget_dir(self, dirpath):
+        """Drop a directory from the cache, e.g. after creating it."""
+        with self.lock:
+            self._missing_dirs.discard(dirpath)
+            self._dirs.pop(dirpath, None)
+
+    def reset(self):
+        with self.lock:
+            self._dirs = dict()
+            self._missing_dirs = set()
+            self.hits = 0
+            self.misses = 0
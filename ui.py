@@ -558,6 +558,8 @@ class RENDER_PT_renderman_spooling(PRManButtonsPanel, Panel):
         col.enabled = rm.external_animation
         col.prop(scene, "frame_start", text="Start")
         col.prop(scene, "frame_end", text="End")
+        col.prop(rm, "external_rib_workers")
+        col.prop(rm, "external_rehash_static")
 
         #col = layout.column()
         #col.enabled = rm.enable_external_rendering